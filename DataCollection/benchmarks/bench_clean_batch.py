@@ -0,0 +1,83 @@
+"""Benchmark : cleaner.merge_csv ligne à ligne contre le moteur par colonnes (clean_batch.py).
+
+Trois entrées : un export "brut" de scraper (message complet, commit_date, sans
+commit_day / commit_hour) rebâti depuis fake_datagenerator, la sortie telle quelle
+de fake_datagenerator (colonnes message_* déjà découpées) et le CSV nettoyé du
+dépôt. Chaque moteur écrit sa sortie ; on vérifie qu'elles sont identiques octet
+pour octet.
+
+    python DataCollection/benchmarks/bench_clean_batch.py --rows 1000000
+"""
+import argparse
+import csv
+import filecmp
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import cleaner  # noqa: E402
+import fake_datagenerator  # noqa: E402
+
+DATASET = Path(__file__).resolve().parents[2] / "data" / "commits_history_cleaned.csv"
+
+RAW_COLUMNS = ["repo_full_name", "branch", "sha", "parent_shas", "author_name", "commit_date", "message"]
+
+
+def write_raw(path: Path, rows: int, seed: int) -> None:
+    """Commits générés, remis au format des sorties de scrapers."""
+    with path.open("w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(RAW_COLUMNS)
+        for df in fake_datagenerator.generate_commit_chunks(rows, seed=seed):
+            for repo, branch, sha, parents, author, day, hour, kind, arg, text in zip(
+                df["repo_full_name"], df["branch"], df["sha"], df["parent_shas"], df["author_name"],
+                df["commit_day"], df["commit_hour"], df["message_type"], df["message_argument"], df["message_message"],
+            ):
+                if arg:
+                    message = f"{kind}({arg}): {text}"
+                elif kind:
+                    message = f"{kind}: {text}"
+                else:
+                    message = text
+                commit_date = f"{day} {int(hour):02d}:{len(sha) % 60:02d}:00+00:00"
+                writer.writerow([repo, branch, sha, parents, author, commit_date, message])
+
+
+def run(inputs: list[Path], output: Path, engine: str) -> float:
+    t0 = time.perf_counter()
+    cleaner.merge_csv(inputs, output, engine=engine)
+    return time.perf_counter() - t0
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    identical = True
+    with tempfile.TemporaryDirectory() as tmp:
+        raw = Path(tmp) / "raw.csv"
+        write_raw(raw, args.rows, args.seed)
+        generated = Path(tmp) / "generated.csv"
+        fake_datagenerator.export_stream(fake_datagenerator.generate_commit_chunks(args.rows, seed=args.seed), generated)
+        for name, inputs, rows in [("raw", [raw], args.rows), ("generated", [generated], args.rows),
+                                   ("cleaned", [DATASET], None)]:
+            t_row = run(inputs, Path(tmp) / "row.csv", "row")
+            t_batch = run(inputs, Path(tmp) / "batch.csv", "batch")
+            same = filecmp.cmp(Path(tmp) / "row.csv", Path(tmp) / "batch.csv", shallow=False)
+            identical = identical and same
+            label = f"{name} ({rows} rows)" if rows else f"{name} ({DATASET.name})"
+            print(f"{label}")
+            print(f"  row   : {t_row:8.3f}s")
+            print(f"  batch : {t_batch:8.3f}s  (x{t_row / t_batch:.1f})  identical: {same}")
+    if not identical:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""Microbenchmark : normalisation du cleaner avant/après (regex précompilées, cache, fast path ASCII).
+
+    python DataCollection/benchmarks/bench_cleaner.py --rows 200000
+"""
+import argparse
+import csv
+import os
+import re
+import sys
+import time
+import unicodedata
+from pathlib import Path
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import cleaner  # noqa: E402
+
+DATASET = Path(__file__).resolve().parents[2] / "data" / "commits_history_cleaned.csv"
+
+
+# --- Implémentation d'origine (référence) ---
+
+def legacy_split_message(msg):
+    if msg is None:
+        return None, None, None
+    msg = legacy_normalize_text(str(msg).strip())
+    if msg == "":
+        return None, None, None
+    before = None
+    between = None
+    after = msg
+    before_match = re.match(r"^(.*?)\s*\(", msg)
+    if before_match:
+        before = legacy_normalize_text(before_match.group(1).strip().lower())
+        between_match = re.search(r"\((.*?)\)", msg)
+        if between_match:
+            between = legacy_normalize_text(between_match.group(1).strip().lower())
+            after_part = msg[between_match.end():].strip()
+            if ":" in after_part:
+                after = legacy_normalize_text(after_part.split(":", 1)[1].strip())
+            else:
+                after = legacy_normalize_text(after_part)
+    if ":" in msg and after == msg:
+        after = legacy_normalize_text(msg.split(":", 1)[1].strip())
+    return before, between, after
+
+
+def legacy_normalize_text(value):
+    if value == "":
+        return ""
+    normalized = unicodedata.normalize("NFKD", value)
+    return "".join(ch for ch in normalized if not unicodedata.combining(ch))
+
+
+def raw_rows(n: int) -> list[dict]:
+    """Lignes "brutes" (message complet, sans colonnes message_*) rebâties depuis le CSV nettoyé."""
+    with DATASET.open("r", newline="", encoding="utf-8") as f:
+        base = []
+        for row in csv.DictReader(f):
+            kind, arg, text = row.pop("message_type"), row.pop("message_argument"), row.pop("message_message")
+            if arg:
+                row["message"] = f"{kind}({arg}): {text}"
+            elif kind:
+                row["message"] = f"{kind}: {text}"
+            else:
+                row["message"] = text
+            base.append(row)
+    return [dict(base[i % len(base)]) for i in range(n)]
+
+
+def run(rows: list[dict]) -> tuple[float, list[dict]]:
+    t0 = time.perf_counter()
+    out = [cleaner.normalize_row(r) for r in rows]
+    return time.perf_counter() - t0, out
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=100_000)
+    args = parser.parse_args()
+
+    rows = raw_rows(args.rows)
+
+    fast = (cleaner.split_message, cleaner.normalize_text)
+    cleaner.split_message, cleaner.normalize_text = legacy_split_message, legacy_normalize_text
+    try:
+        t_before, out_before = run(rows)
+    finally:
+        cleaner.split_message, cleaner.normalize_text = fast
+    t_after, out_after = run(rows)
+
+    print(f"dataset: {DATASET.name} replicated to {len(rows)} rows")
+    print(f"before : {t_before:7.3f}s  {len(rows) / t_before:12,.0f} rows/s")
+    print(f"after  : {t_after:7.3f}s  {len(rows) / t_after:12,.0f} rows/s  (x{t_before / t_after:.1f})")
+    print(f"identical rows: {out_before == out_after}")
+    if out_before != out_after:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
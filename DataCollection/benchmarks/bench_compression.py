@@ -0,0 +1,79 @@
+"""Benchmark : CSV de commits bruts, gzip, zstd et zstd avec dictionnaire (compression.py).
+
+Deux écritures par format : l'export d'un bloc (fake_datagenerator.export_stream)
+et une suite de petits appends comme ceux de commit_store (une trame / un membre
+par append), là où le dictionnaire entraîné compte le plus. Chaque fichier est
+relu et comparé à l'original.
+
+    python DataCollection/benchmarks/bench_compression.py --rows 200000 --append-rows 50
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import compression  # noqa: E402
+import fake_datagenerator  # noqa: E402
+
+
+def write_appends(source: Path, output: Path, append_rows: int) -> None:
+    with compression.open_text(source) as f:
+        header = f.readline()
+        lines = f.readlines()
+    with compression.open_text(output, "w") as f:
+        f.write(header)
+    for i in range(0, len(lines), append_rows):
+        with compression.open_text(output, "a") as f:
+            f.writelines(lines[i:i + append_rows])
+
+
+def measure(label: str, source: Path, output: Path, write) -> bool:
+    t0 = time.perf_counter()
+    write(output)
+    t_write = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    with compression.open_binary(output) as f:
+        data = f.read()
+    t_read = time.perf_counter() - t0
+    same = data == source.read_bytes()
+    print(f"  {label:<10} {output.stat().st_size / 1e6:8.2f} MB  write {t_write:6.2f}s  "
+          f"read {t_read:6.2f}s  identical: {same}")
+    return same
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=200_000)
+    parser.add_argument("--append-rows", type=int, default=50, help="Rows per append in the append run.")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    compression.require_zstd()
+    identical = True
+    with tempfile.TemporaryDirectory() as tmp:
+        source = Path(tmp) / "commits.csv"
+        fake_datagenerator.export_stream(fake_datagenerator.generate_commit_chunks(args.rows, seed=args.seed), source)
+        compression.DICTIONARY = Path(tmp) / "commits.zdict"
+        formats = [("csv", ".csv"), ("gzip", ".csv.gz"), ("zstd", ".csv.zst"), ("zstd+dict", ".csv.zst")]
+
+        for name, write in [
+            ("export", lambda out: compression.convert(source, out)),
+            (f"appends of {args.append_rows} rows", lambda out: write_appends(source, out, args.append_rows)),
+        ]:
+            print(f"{name} ({args.rows} rows)")
+            for label, ext in formats:
+                if label == "zstd+dict" and not compression.DICTIONARY.exists():
+                    compression.train_dictionary([source], compression.DICTIONARY)
+                elif label != "zstd+dict" and compression.DICTIONARY.exists():
+                    compression.DICTIONARY.unlink()
+                identical = measure(label, source, Path(tmp) / f"{label}{ext}", write) and identical
+    if not identical:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
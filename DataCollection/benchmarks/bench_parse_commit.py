@@ -0,0 +1,133 @@
+"""Benchmark : parse_commit (ligne par ligne) vs commits_frame (vectorisé).
+
+    python DataCollection/benchmarks/bench_parse_commit.py --commits 100000
+"""
+import argparse
+import io
+import os
+import random
+import sys
+import time
+from typing import Any, Dict
+
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from commit_batch import commits_frame  # noqa: E402
+from commit_store import normalize_types  # noqa: E402
+
+
+def parse_commit(row: Dict[str, Any], repo_full_name: str, branch: str) -> Dict[str, Any]:
+    """Référence ligne par ligne (un pd.to_datetime par commit), ancien parsing des scrapers."""
+    commit = row.get("commit") or {}
+    author_user = row.get("author") or {}      # compte GitHub (peut être None)
+    committer_user = row.get("committer") or {}
+    parents = row.get("parents") or []
+    is_merge = (len(parents) > 1)
+
+    author_block = commit.get("author") or {}
+    committer_block = commit.get("committer") or {}
+
+    author_date = author_block.get("date")
+    committer_date = committer_block.get("date")
+    commit_date = author_date or committer_date
+
+    commit_day = None
+    commit_hour = None
+    if commit_date:
+        try:
+            commit_day = commit_date.split("T")[0]
+        except Exception:
+            pass
+        try:
+            dt = pd.to_datetime(commit_date, utc=True, errors="coerce")
+            if not pd.isna(dt):
+                commit_hour = int(dt.hour)
+        except Exception:
+            pass
+
+    return {
+        "repo_full_name": repo_full_name,
+        "branch": branch,
+        "sha": row.get("sha"),  # <-- crucial pour dedup
+        "html_url": row.get("html_url"),
+        "message": commit.get("message"),
+
+        # Qui ?
+        "author_login": author_user.get("login"),
+        "author_name": author_block.get("name"),
+        "author_email": author_block.get("email"),
+        "committer_login": committer_user.get("login"),
+        "committer_name": committer_block.get("name"),
+        "committer_email": committer_block.get("email"),
+
+        # Quand ?
+        "author_date": author_date,
+        "committer_date": committer_date,
+        "commit_date": commit_date,
+        "commit_day": commit_day,
+        "commit_hour": commit_hour,
+
+        "is_merge": is_merge,
+    }
+
+
+def fake_page(rng: random.Random, n: int):
+    page = []
+    for _ in range(n):
+        date = (f"2025-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}"
+                f"T{rng.randint(0, 23):02d}:{rng.randint(0, 59):02d}:00Z")
+        page.append({
+            "sha": "%040x" % rng.getrandbits(160),
+            "html_url": "https://github.com/owner/repo/commit/x",
+            "commit": {
+                "message": rng.choice(["feat(ui): add chart", "fix: typo", "Merge branch 'dev'"]),
+                "author": {"name": rng.choice(["Alice", "Bob"]), "email": "a@b.c", "date": date},
+                "committer": {"name": "GitHub", "email": "noreply@github.com", "date": date},
+            },
+            "author": {"login": rng.choice(["alice", "bob"])},
+            "committer": {"login": "web-flow"},
+            "parents": [{"sha": "p1"}] * rng.choice([1, 1, 1, 2]),
+        })
+    return page
+
+
+def as_csv(df: pd.DataFrame) -> str:
+    buf = io.StringIO()
+    normalize_types(df.copy()).to_csv(buf, index=False)
+    return buf.getvalue()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--commits", type=int, default=20_000)
+    parser.add_argument("--page-size", type=int, default=100)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    pages = [fake_page(rng, args.page_size) for _ in range(max(1, args.commits // args.page_size))]
+    n = sum(len(p) for p in pages)
+
+    t0 = time.perf_counter()
+    per_row = pd.concat([pd.DataFrame([parse_commit(c, "owner/repo", "main") for c in p]) for p in pages],
+                        ignore_index=True)
+    t_row = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    batch = pd.concat([commits_frame(p, repo_full_name="owner/repo", branch="main") for p in pages],
+                      ignore_index=True)
+    t_batch = time.perf_counter() - t0
+
+    same = as_csv(per_row) == as_csv(batch)
+    print(f"commits      : {n} ({len(pages)} pages of {args.page_size})")
+    print(f"parse_commit : {t_row:8.3f}s  {n / t_row:12,.0f} rows/s")
+    print(f"commits_frame: {t_batch:8.3f}s  {n / t_batch:12,.0f} rows/s  (x{t_row / t_batch:.1f})")
+    print(f"same CSV output: {same}")
+    if not same:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,156 @@
+"""Benchmark de bout en bout de la collecte, contre un faux GitHub local (github_replay.py).
+
+Chaque étape tourne dans un interpréteur neuf (GITHUB_API_URL pointé sur le serveur,
+sorties dans un dossier temporaire) : scrap_github, scrap_git_project,
+build_commits_graphql (mode REST) puis cleaner.merge_csv sur les sorties brutes.
+Pour chaque étape : requêtes reçues par le serveur, temps total, lignes écrites,
+lignes/s et pic de mémoire (RSS) du processus. Le rapport est du JSON.
+
+    python DataCollection/benchmarks/bench_pipeline.py --rows 20000 --latency-ms 10 -o bench.json
+"""
+import argparse
+import csv
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Any, Dict, List
+
+from github_replay import Fixtures, ReplayServer
+
+HERE = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+# Ouvre la session sans la vérification mise en cache sur disque, puis fait le GET /user
+# comme au lancement réel ; dates élargies pour couvrir toutes les données générées.
+SETUP = """
+import credentials
+m.START_DATE, m.END_DATE = "2000-01-01T00:00:00Z", "2100-01-01T00:00:00Z"
+m.SESSION = credentials.github_session(check=False)
+credentials.validate_token(m.SESSION, *credentials.load_credentials(), cache_path=None)
+"""
+
+STAGES = {
+    "scrap_github": ("import scrap_github as m" + SETUP +
+                     "m.REPO_FULL_NAME, m.OUT_CSV = {repo!r}, {out!r}\n"
+                     "m.main(full=True, cache_path=None)\n"),
+    "scrap_git_project": ("import scrap_git_project as m" + SETUP +
+                          "m.REPO_FULL_NAME, m.OUT_CSV = {repo!r}, {out!r}\n"
+                          "m.main(workers={workers}, full=True, cache_path=None)\n"),
+    "build_commits_graphql": ("import build_commits_graphql as m" + SETUP +
+                              "m.OUT_CSV, m.AUTHOR_LOGIN = {out!r}, None\n"
+                              "m.main_commits_history(full=True, cache_path=None, use_graphql=False)\n"),
+    "cleaner": ("import cleaner\nfrom pathlib import Path\n"
+                "cleaner.merge_csv([Path(p) for p in {inputs!r}], Path({out!r}))\n"),
+}
+
+
+def count_rows(path: str) -> int:
+    if not os.path.exists(path):
+        return 0
+    with open(path, "r", newline="", encoding="utf-8") as f:
+        return max(0, sum(1 for _ in csv.reader(f)) - 1)
+
+
+def run_stage(name: str, code: str, workdir: str, env: Dict[str, str], server: ReplayServer,
+              out: str) -> Dict[str, Any]:
+    before = server.stats()
+    log_path = os.path.join(workdir, f"{name}.log")
+    start = time.perf_counter()
+    with open(log_path, "w", encoding="utf-8") as log:
+        proc = subprocess.Popen([sys.executable, "-c", code], cwd=workdir, env=env,
+                                stdout=log, stderr=subprocess.STDOUT)
+        # wait4 : code de sortie + rusage de ce seul processus (ru_maxrss en Kio sous Linux)
+        _, status, usage = os.wait4(proc.pid, 0)
+        proc.returncode = os.waitstatus_to_exitcode(status)
+    wall = time.perf_counter() - start
+    after = server.stats()
+    rows = count_rows(out)
+    maxrss = usage.ru_maxrss / (1024 * 1024 if sys.platform == "darwin" else 1024)
+    result = {
+        "stage": name,
+        "exit_code": proc.returncode,
+        "requests": after["requests"] - before["requests"],
+        "bytes": after["bytes"] - before["bytes"],
+        "rate_limited": after["rate_limited"] - before["rate_limited"],
+        "wall_seconds": round(wall, 3),
+        "rows": rows,
+        "rows_per_second": round(rows / wall, 1) if wall > 0 else None,
+        "peak_rss_mb": round(maxrss, 1),
+    }
+    if proc.returncode != 0:
+        with open(log_path, "r", encoding="utf-8") as log:
+            result["log_tail"] = log.read()[-2000:]
+    return result
+
+
+def run(args: argparse.Namespace) -> Dict[str, Any]:
+    t = time.perf_counter()
+    fixtures = Fixtures(args.rows, seed=args.seed, repos=args.repos, branches=args.branches)
+    fixtures_seconds = time.perf_counter() - t
+    # repo le plus actif pour les scrapers mono-repo
+    repo = max(fixtures.commits, key=lambda r: len(fixtures.commits[r]))
+
+    server = ReplayServer(fixtures, latency_ms=args.latency_ms, jitter_ms=args.jitter_ms,
+                          rate_limit=args.rate_limit, rate_window=args.rate_window)
+    server.start()
+    env = dict(os.environ, GITHUB_API_URL=server.url, GITHUB_TOKEN="bench-token", GITHUB_LOGIN="bench-user",
+               PYTHONPATH=os.pathsep.join([HERE, os.environ.get("PYTHONPATH", "")]).rstrip(os.pathsep))
+
+    stages: List[Dict[str, Any]] = []
+    try:
+        with tempfile.TemporaryDirectory(prefix="bench_pipeline_") as workdir:
+            outs = {name: os.path.join(workdir, "data", f"{name}.csv") for name in STAGES}
+            os.makedirs(os.path.join(workdir, "data"))
+            for name, template in STAGES.items():
+                if args.stages and name not in args.stages:
+                    continue
+                code = template.format(repo=repo, out=outs[name], workers=args.workers,
+                                       inputs=[outs["scrap_github"], outs["build_commits_graphql"]])
+                stages.append(run_stage(name, code, workdir, env, server, outs[name]))
+                print(f"{name:22s} {stages[-1]['requests']:6d} req  {stages[-1]['wall_seconds']:8.2f} s  "
+                      f"{stages[-1]['rows']:8d} rows  {stages[-1]['peak_rss_mb']:7.1f} MB", file=sys.stderr)
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    return {
+        "python": platform.python_version(),
+        "config": {k: v for k, v in vars(args).items() if k != "output"},
+        "fixtures": {"repos": len(fixtures.repos), "commits": args.rows, "repo": repo,
+                     "build_seconds": round(fixtures_seconds, 3)},
+        "stages": stages,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="End-to-end benchmark of the collection pipeline.")
+    parser.add_argument("--rows", type=int, default=20000, help="Synthetic commits served by the fake API.")
+    parser.add_argument("--repos", type=int, default=3)
+    parser.add_argument("--branches", type=int, default=4)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--latency-ms", type=float, default=10.0)
+    parser.add_argument("--jitter-ms", type=float, default=0.0)
+    parser.add_argument("--rate-limit", type=int, default=5000)
+    parser.add_argument("--rate-window", type=int, default=3600)
+    parser.add_argument("--workers", type=int, default=1, help="scrap_git_project workers.")
+    parser.add_argument("--stages", nargs="*", choices=list(STAGES), help="Subset of stages (default: all).")
+    parser.add_argument("-o", "--output", help="Write the JSON report here (default: stdout).")
+    args = parser.parse_args()
+
+    report = run(args)
+    failed = any(s["exit_code"] != 0 for s in report["stages"])
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
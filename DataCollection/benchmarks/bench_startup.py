@@ -0,0 +1,57 @@
+"""Benchmark : temps d'import des scrapers (sans .secrets.py, sans réseau).
+
+L'import ne doit plus lire les identifiants, appeler GET /user ni charger pandas.
+Chaque module est importé dans un interpréteur neuf ; on garde le meilleur de
+`--repeat` essais et on échoue si un import dépasse `--max-seconds` ou charge pandas.
+
+    python DataCollection/benchmarks/bench_startup.py --repeat 5
+"""
+import argparse
+import os
+import subprocess
+import sys
+
+HERE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+
+MODULES = ["scrap_github", "scrap_git_project", "build_commits_graphql"]
+
+PROBE = """
+import sys, time
+t = time.perf_counter()
+import {module}
+print(time.perf_counter() - t, "pandas" in sys.modules)
+"""
+
+
+def import_time(module: str) -> tuple:
+    env = dict(os.environ, PYTHONDONTWRITEBYTECODE="1")
+    env.pop("GITHUB_TOKEN", None)
+    env.pop("GITHUB_LOGIN", None)
+    out = subprocess.run([sys.executable, "-c", PROBE.format(module=module)], cwd=HERE, env=env,
+                         stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True, timeout=60)
+    if out.returncode != 0:
+        raise SystemExit(f"import {module} failed:\n{out.stderr}")
+    seconds, pandas_loaded = out.stdout.split()
+    return float(seconds), pandas_loaded == "True"
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--max-seconds", type=float, default=0.5)
+    args = parser.parse_args()
+
+    failed = False
+    for module in MODULES:
+        runs = [import_time(module) for _ in range(args.repeat)]
+        best = min(seconds for seconds, _ in runs)
+        pandas_loaded = any(loaded for _, loaded in runs)
+        ok = best <= args.max_seconds and not pandas_loaded
+        failed |= not ok
+        print(f"{module:24s} import {best * 1000:7.1f} ms  pandas={pandas_loaded}  {'ok' if ok else 'FAIL'}")
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,371 @@
+"""Serveur local qui imite les endpoints REST de GitHub utilisés par les scrapers.
+
+Les données viennent du générateur synthétique (fake_datagenerator.generate_commit_chunks) :
+chaque repo généré a ses branches, et /commits?sha=<branche> rend les ancêtres
+de la tête de branche, du plus récent au plus ancien, comme GitHub.
+
+Endpoints : /user, /user/repos, /repos/<o>/<n>, /repos/<o>/<n>/branches,
+/repos/<o>/<n>/commits[/<ref>], /repos/<o>/<n>/compare/<base>...<head>.
+Pagination par `page` / `per_page` avec en-têtes `Link`, en-têtes X-RateLimit-*
+(réponse 403 quand le budget de la fenêtre est épuisé) et latence configurable.
+
+POST /graphql comprend les requêtes de build_commits_graphql : `user(login:)`,
+têtes de branche par défaut et `history` aliasés (r0, r1, … / h0, h1, …) avec
+pagination par curseur, filtre since/until/author, et erreurs partielles
+(`data.<alias>` à null + `errors`) pour un repo inconnu.
+
+    python DataCollection/benchmarks/github_replay.py --rows 20000 --port 8765
+    GITHUB_API_URL=http://127.0.0.1:8765 GITHUB_TOKEN=x GITHUB_LOGIN=x python DataCollection/scrap_github.py
+"""
+import argparse
+import bisect
+import json
+import os
+import random
+import re
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional
+from urllib.parse import parse_qs, unquote, urlencode, urlparse
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from fake_datagenerator import generate_commit_chunks  # noqa: E402
+
+LOGIN = "bench-user"
+DEFAULT_PER_PAGE = 30
+MAX_PER_PAGE = 100
+
+REPO_PATH = re.compile(r"^/repos/([^/]+/[^/]+)(?:/(branches|commits|compare)(?:/(.+))?)?$")
+
+# champs aliasés des requêtes GraphQL de build_commits_graphql
+GRAPHQL_REPO = re.compile(r"(\w+): repository\(owner: \$(\w+), name: \$(\w+)\)")
+GRAPHQL_USER = re.compile(r"user\(login: \$(\w+)\)")
+GRAPHQL_HISTORY = re.compile(r"history\(([^)]*)\)")
+
+
+class Fixtures:
+    """Repos, branches et commits au format REST, construits depuis le générateur."""
+
+    def __init__(self, rows: int, seed: int = 42, repos: int = 3, branches: int = 4):
+        self.repos: Dict[str, Dict[str, Any]] = {}
+        self.commits: Dict[str, Dict[str, Dict[str, Any]]] = {}   # repo -> sha -> commit REST
+        self.order: Dict[str, Dict[str, int]] = {}                # repo -> sha -> rang chronologique
+        self.heads: Dict[str, Dict[str, str]] = {}                # repo -> branche -> SHA de tête
+        self.logins: set = set()
+        self._ancestors: Dict[tuple, List[str]] = {}
+        self._dates: Dict[tuple, List[str]] = {}
+
+        i = 0
+        for df in generate_commit_chunks(rows, seed=seed, repos=repos, branches=branches):
+            for row in df.itertuples(index=False):
+                self._add(row, i)
+                i += 1
+        for k, full_name in enumerate(self.commits):
+            self.repos[full_name] = {
+                "full_name": full_name,
+                "name": full_name.split("/", 1)[1],
+                "private": k % 2 == 1,
+                "language": ["Python", "TypeScript", "Go"][k % 3],
+                "stargazers_count": 10 * k,
+                "forks_count": k,
+                "default_branch": "main",
+            }
+
+    def _add(self, row, i: int) -> None:
+        repo = row.repo_full_name
+        message = row.message_message
+        if row.message_type:
+            scope = f"({row.message_argument})" if row.message_argument else ""
+            message = f"{row.message_type}{scope}: {message}"
+        # le générateur donne jour + heure ; minutes/secondes croissantes pour garder l'ordre
+        date = f"{row.commit_day}T{int(row.commit_hour):02d}:{(i // 60) % 60:02d}:{i % 60:02d}Z"
+        login = row.author_name.lower().replace(" ", "-")
+        person = {"name": row.author_name, "email": f"{login}@example.com", "date": date}
+        self.commits.setdefault(repo, {})[row.sha] = {
+            "sha": row.sha,
+            "html_url": f"https://github.com/{repo}/commit/{row.sha}",
+            "commit": {"message": message, "author": person, "committer": person},
+            "author": {"login": login},
+            "committer": {"login": login},
+            "parents": [{"sha": p} for p in row.parent_shas.split(";") if p],
+        }
+        self.logins.add(login)
+        self.order.setdefault(repo, {})[row.sha] = i
+        self.heads.setdefault(repo, {})[row.branch] = row.sha
+
+    def ancestors(self, repo: str, sha: str) -> List[str]:
+        """SHA atteignables depuis `sha`, du plus récent au plus ancien."""
+        key = (repo, sha)
+        if key not in self._ancestors:
+            commits = self.commits[repo]
+            seen = {sha}
+            stack = [sha]
+            while stack:
+                for p in commits[stack.pop()]["parents"]:
+                    if p["sha"] not in seen and p["sha"] in commits:
+                        seen.add(p["sha"])
+                        stack.append(p["sha"])
+            self._ancestors[key] = sorted(seen, key=self.order[repo].get, reverse=True)
+            # dates croissantes (ordre inverse de la liste) pour filtrer since/until par dichotomie
+            self._dates[key] = [commits[s]["commit"]["committer"]["date"] for s in reversed(self._ancestors[key])]
+        return self._ancestors[key]
+
+    def history(self, repo: str, sha: str, since: str = "", until: Optional[str] = None) -> List[str]:
+        """Ancêtres de `sha` dont la date est dans [since, until], du plus récent au plus ancien."""
+        shas = self.ancestors(repo, sha)
+        dates = self._dates[(repo, sha)]
+        lo = bisect.bisect_left(dates, since)
+        hi = bisect.bisect_right(dates, until) if until else len(dates)
+        n = len(dates)
+        return shas[n - hi:n - lo]
+
+    def resolve(self, repo: str, ref: Optional[str]) -> Optional[str]:
+        ref = ref or self.repos[repo]["default_branch"]
+        if ref in self.heads[repo]:
+            return self.heads[repo][ref]
+        return ref if ref in self.commits[repo] else None
+
+
+class ReplayServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, fixtures: Fixtures, port: int = 0, latency_ms: float = 0.0, jitter_ms: float = 0.0,
+                 rate_limit: int = 5000, rate_window: int = 3600):
+        super().__init__(("127.0.0.1", port), ReplayHandler)
+        self.fixtures = fixtures
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.rate_limit = rate_limit
+        self.rate_window = rate_window
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.bytes_sent = 0
+        self.rate_limited = 0
+        self.remaining = rate_limit
+        self.reset = int(time.time()) + rate_window
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+    def stats(self) -> Dict[str, int]:
+        with self.lock:
+            return {"requests": self.requests, "bytes": self.bytes_sent, "rate_limited": self.rate_limited}
+
+    def take_budget(self) -> Optional[int]:
+        """Compte une requête ; rend le budget restant, ou None si la fenêtre est épuisée."""
+        with self.lock:
+            self.requests += 1
+            now = time.time()
+            if now >= self.reset:
+                self.remaining = self.rate_limit
+                self.reset = int(now) + self.rate_window
+            if self.remaining <= 0:
+                self.rate_limited += 1
+                return None
+            self.remaining -= 1
+            return self.remaining
+
+    def start(self) -> threading.Thread:
+        thread = threading.Thread(target=self.serve_forever, daemon=True)
+        thread.start()
+        return thread
+
+
+class ReplayHandler(BaseHTTPRequestHandler):
+    server: ReplayServer
+
+    def log_message(self, *args) -> None:
+        pass
+
+    def do_GET(self) -> None:
+        srv = self.server
+        if srv.latency_ms or srv.jitter_ms:
+            time.sleep((srv.latency_ms + random.uniform(0, srv.jitter_ms)) / 1000)
+        remaining = srv.take_budget()
+        if remaining is None:
+            return self.send(403, {"message": "API rate limit exceeded"}, remaining=0)
+
+        url = urlparse(self.path)
+        query = {k: v[-1] for k, v in parse_qs(url.query).items()}
+        fx = srv.fixtures
+
+        if url.path == "/user":
+            return self.send(200, {"login": LOGIN, "id": 1}, remaining=remaining)
+        if url.path == "/user/repos":
+            return self.send_page(list(fx.repos.values()), url.path, query, remaining)
+
+        m = REPO_PATH.match(url.path)
+        if not m or m.group(1) not in fx.repos:
+            return self.send(404, {"message": "Not Found"}, remaining=remaining)
+        repo, kind, rest = m.group(1), m.group(2), unquote(m.group(3) or "")
+
+        if kind is None:
+            return self.send(200, fx.repos[repo], remaining=remaining)
+        if kind == "branches":
+            branches = [{"name": b, "commit": {"sha": sha}} for b, sha in fx.heads[repo].items()]
+            return self.send_page(branches, url.path, query, remaining)
+        if kind == "commits" and rest:
+            sha = fx.resolve(repo, rest)
+            if sha is None:
+                return self.send(404, {"message": "No commit found"}, remaining=remaining)
+            if "sha" in (self.headers.get("Accept") or ""):
+                return self.send_raw(200, sha.encode("ascii"), "text/plain", remaining)
+            return self.send(200, fx.commits[repo][sha], remaining=remaining)
+        if kind == "commits":
+            head = fx.resolve(repo, query.get("sha"))
+            if head is None:
+                return self.send(404, {"message": "No commit found"}, remaining=remaining)
+            shas = fx.history(repo, head, query.get("since", ""), query.get("until"))
+            author = query.get("author")
+            if author:
+                shas = [sha for sha in shas if fx.commits[repo][sha]["author"]["login"] == author]
+            return self.send_page(shas, url.path, query, remaining, lookup=fx.commits[repo])
+        if kind == "compare" and "..." in rest:
+            base, head = (fx.resolve(repo, ref) for ref in rest.split("...", 1))
+            if base is None or head is None:
+                return self.send(404, {"message": "Not Found"}, remaining=remaining)
+            in_base = set(fx.ancestors(repo, base))
+            head_ancestors = fx.ancestors(repo, head)
+            unique = [fx.commits[repo][sha] for sha in reversed(head_ancestors) if sha not in in_base]
+            merge_base = next((sha for sha in head_ancestors if sha in in_base), None)
+            return self.send_page(unique, url.path, query, remaining, envelope={
+                "status": "diverged" if len(in_base) > 1 else "ahead",
+                "ahead_by": len(unique),
+                "merge_base_commit": fx.commits[repo][merge_base] if merge_base else None,
+            })
+        return self.send(404, {"message": "Not Found"}, remaining=remaining)
+
+    def do_POST(self) -> None:
+        srv = self.server
+        body = json.loads(self.rfile.read(int(self.headers.get("Content-Length") or 0)) or b"{}")
+        if srv.latency_ms or srv.jitter_ms:
+            time.sleep((srv.latency_ms + random.uniform(0, srv.jitter_ms)) / 1000)
+        remaining = srv.take_budget()
+        if remaining is None:
+            return self.send(403, {"message": "API rate limit exceeded"}, remaining=0)
+        if urlparse(self.path).path != "/graphql":
+            return self.send(404, {"message": "Not Found"}, remaining=remaining)
+        data, errors = self.graphql(body.get("query") or "", body.get("variables") or {})
+        payload: Dict[str, Any] = {"data": data}
+        if errors:
+            payload["errors"] = errors
+        self.send(200, payload, remaining=remaining)
+
+    def graphql(self, query: str, variables: Dict[str, Any]):
+        fx = self.server.fixtures
+        data: Dict[str, Any] = {}
+        errors: List[Dict[str, Any]] = []
+        m = GRAPHQL_USER.search(query)
+        if m:
+            login = variables.get(m.group(1))
+            data["user"] = {"id": f"U_{login}"} if login in fx.logins else None
+        fields = list(GRAPHQL_REPO.finditer(query))
+        for m, nxt in zip(fields, fields[1:] + [None]):
+            alias = m.group(1)
+            repo = f"{variables.get(m.group(2))}/{variables.get(m.group(3))}"
+            if repo not in fx.repos:
+                data[alias] = None
+                errors.append({"type": "NOT_FOUND", "path": [alias],
+                               "message": f"Could not resolve to a Repository with the name '{repo}'."})
+                continue
+            head = fx.resolve(repo, None)
+            target: Dict[str, Any] = {"oid": head}
+            history = GRAPHQL_HISTORY.search(query, m.end(), nxt.start() if nxt else len(query))
+            if history:
+                args = {}
+                for arg in history.group(1).split(","):
+                    name, value = (x.strip() for x in arg.split(":", 1))
+                    args[name] = variables.get(value[1:]) if value.startswith("$") else value
+                target = {"history": self.history_page(repo, head, args)}
+            data[alias] = {"defaultBranchRef": {"target": target}}
+        return data, errors
+
+    def history_page(self, repo: str, head: str, args: Dict[str, Any]) -> Dict[str, Any]:
+        fx = self.server.fixtures
+        shas = fx.history(repo, head, args.get("since") or "", args.get("until"))
+        author = (args.get("author") or {}).get("id")
+        if author:
+            shas = [sha for sha in shas if f"U_{fx.commits[repo][sha]['author']['login']}" == author]
+        start = int(args.get("after") or 0)
+        end = start + min(MAX_PER_PAGE, int(args.get("first") or MAX_PER_PAGE))
+        nodes = []
+        for sha in shas[start:end]:
+            c = fx.commits[repo][sha]
+            nodes.append({
+                "oid": sha,
+                "message": c["commit"]["message"],
+                "author": {"name": c["commit"]["author"]["name"], "date": c["commit"]["author"]["date"],
+                           "user": {"login": c["author"]["login"]} if c.get("author") else None},
+                "committer": {"date": c["commit"]["committer"]["date"]},
+                "parents": {"totalCount": len(c["parents"])},
+            })
+        # curseur opaque côté client : ici, l'indice du prochain commit
+        return {"pageInfo": {"hasNextPage": end < len(shas), "endCursor": str(end)}, "nodes": nodes}
+
+    def send_page(self, items: List[Any], path: str, query: Dict[str, str], remaining: int,
+                  envelope: Optional[Dict[str, Any]] = None, lookup: Optional[Dict[str, Any]] = None) -> None:
+        per_page = max(1, min(MAX_PER_PAGE, int(query.get("per_page", DEFAULT_PER_PAGE))))
+        page = max(1, int(query.get("page", 1)))
+        last = max(1, -(-len(items) // per_page))
+        chunk = items[(page - 1) * per_page:page * per_page]
+        if lookup is not None:
+            chunk = [lookup[k] for k in chunk]
+        links = []
+        if page < last:
+            base = f"{self.server.url}{path}?"
+            links.append(f'<{base}{urlencode(dict(query, page=page + 1))}>; rel="next"')
+            links.append(f'<{base}{urlencode(dict(query, page=last))}>; rel="last"')
+        body = dict(envelope, commits=chunk) if envelope is not None else chunk
+        self.send(200, body, remaining=remaining, link=", ".join(links) or None)
+
+    def send(self, status: int, body: Any, remaining: int, link: Optional[str] = None) -> None:
+        self.send_raw(status, json.dumps(body).encode("utf-8"), "application/json", remaining, link)
+
+    def send_raw(self, status: int, payload: bytes, content_type: str, remaining: int,
+                 link: Optional[str] = None) -> None:
+        srv = self.server
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(payload)))
+        self.send_header("X-RateLimit-Limit", str(srv.rate_limit))
+        self.send_header("X-RateLimit-Remaining", str(remaining))
+        self.send_header("X-RateLimit-Reset", str(srv.reset))
+        if link:
+            self.send_header("Link", link)
+        self.end_headers()
+        self.wfile.write(payload)
+        with srv.lock:
+            srv.bytes_sent += len(payload)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Local stand-in for the GitHub REST API, fed by the fake generator.")
+    parser.add_argument("--rows", type=int, default=20000, help="Synthetic commits across all repos.")
+    parser.add_argument("--repos", type=int, default=3)
+    parser.add_argument("--branches", type=int, default=4)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="Delay added to every response.")
+    parser.add_argument("--jitter-ms", type=float, default=0.0, help="Extra random delay (0..jitter).")
+    parser.add_argument("--rate-limit", type=int, default=5000, help="Requests allowed per window.")
+    parser.add_argument("--rate-window", type=int, default=3600, help="Rate-limit window in seconds.")
+    args = parser.parse_args()
+
+    fixtures = Fixtures(args.rows, seed=args.seed, repos=args.repos, branches=args.branches)
+    server = ReplayServer(fixtures, port=args.port, latency_ms=args.latency_ms, jitter_ms=args.jitter_ms,
+                          rate_limit=args.rate_limit, rate_window=args.rate_window)
+    print(f"Serving {args.rows} commits in {len(fixtures.repos)} repos on {server.url} (Ctrl+C to stop)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
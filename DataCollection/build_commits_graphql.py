@@ -1,35 +1,20 @@
 # ----------------- CONFIG -----------------
-import os
 import sys
-import time
-import importlib.util
+import argparse
 import requests
-import pandas as pd
-from typing import List, Dict, Any, Optional
-
-# Load credentials from environment
-secrets_path = os.path.join(os.path.dirname(__file__), ".secrets.py")
-spec = importlib.util.spec_from_file_location("project_secrets", secrets_path)
-project_secrets = importlib.util.module_from_spec(spec)
-spec.loader.exec_module(project_secrets)
-GITHUB_TOKEN =  getattr(project_secrets, "GITHUB_TOKEN", None)
-GITHUB_LOGIN =  getattr(project_secrets, "GITHUB_LOGIN", None)
-
-# Test if the github token works by making a simple API call
-if GITHUB_TOKEN and GITHUB_LOGIN:
-    headers = {
-        "Authorization": f"Bearer {GITHUB_TOKEN}",
-        "Accept": "application/vnd.github.v3+json",
-        "User-Agent": GITHUB_LOGIN,
-    }
-    response = requests.get("https://api.github.com/user", headers=headers)
-    if response.status_code != 200:
-        print("Error: Invalid GITHUB_TOKEN or GITHUB_LOGIN.")
-        sys.exit(1)
-else:
-    print("Error: GITHUB_TOKEN and GITHUB_LOGIN must be set in .secrets.py.")
-    sys.exit(1)
-    
+from typing import TYPE_CHECKING, List, Dict, Any, Iterator, Optional, Set, Tuple
+from urllib.parse import quote
+
+import credentials
+import github_api
+import metrics
+from commit_batch import commits_frame
+from fork_index import ShaIndex
+from scrape_state import ScrapeState, newest_commit_date, state_path_for
+
+if TYPE_CHECKING:
+    import pandas as pd
+
 # ----------------- Scraping (historique de commits 2023+ via REST) -----------------
 
 OUT_CSV = "data/commits_history.csv"
@@ -45,174 +30,372 @@ AUTHOR_LOGIN = "Samuel-Chapuis"  # ou None
 
 PER_PAGE = 100
 MAX_PAGES = 200   # sécurité pour gros dépôts
-RATE_LIMIT_THRESHOLD = 10
-SLEEP_ON_RATE_LIMIT = 10
+USE_GRAPHQL = True   # False => une requête REST /commits par page de 100 commits et par repo
+GRAPHQL_URL = github_api.GRAPHQL_URL
+GRAPHQL_BATCH = 10   # repos interrogés dans une même requête GraphQL (alias r0, r1, …)
+HTTP_CACHE_PATH = "data/http_cache.sqlite"   # None pour désactiver le cache ETag
 
-SESSION = requests.Session()
-SESSION.headers.update({
-    "Authorization": f"Bearer {GITHUB_TOKEN}",
-    "Accept": "application/vnd.github.v3+json",
-    "User-Agent": GITHUB_LOGIN or "commits-history-scraper",
-})
+# Identifiants chargés et token vérifié au premier appel réseau (cf. credentials), pas à l'import
+SESSION: Optional[requests.Session] = None
+
+def get_session() -> requests.Session:
+    global SESSION
+    if SESSION is None:
+        SESSION = credentials.github_session()
+    return SESSION
 
 def github_get_all(url: str, params: Optional[Dict[str, Any]] = None,
                    max_pages: int = MAX_PAGES) -> List[Dict[str, Any]]:
-    out: List[Dict[str, Any]] = []
-    page = 1
-    params = dict(params or {})
-    params.setdefault("per_page", PER_PAGE)
-    while url and page <= max_pages:
-        r = SESSION.get(url, params=params if page == 1 else None, timeout=60)
-        remaining = int(r.headers.get("X-RateLimit-Remaining", "1000"))
-        reset = int(r.headers.get("X-RateLimit-Reset", "0"))
-        if remaining <= RATE_LIMIT_THRESHOLD:
-            wait = max(SLEEP_ON_RATE_LIMIT, reset - int(time.time()) + 1)
-            print(f"[rate-limit] remaining={remaining}, sleeping {wait}s…")
-            time.sleep(wait)
-            continue
-        if r.status_code != 200:
-            print(f"[warn] GET {url} page {page} -> {r.status_code}; {r.text[:200]}")
-            break
-        data = r.json()
-        if isinstance(data, list):
-            out.extend(data)
-        else:
-            out.append(data)
-        # parse Link header
-        link = r.headers.get("Link", "")
-        next_url = None
-        if link:
-            for part in link.split(","):
-                if 'rel="next"' in part:
-                    next_url = part.split(";")[0].strip().lstrip("<").rstrip(">")
-        url = next_url
-        page += 1
-    return out
+    # pagination, rate limit partagé et cache ETag : cf. github_api
+    return github_api.github_get_all(get_session(), url, params=params, max_pages=max_pages)
 
 def fetch_accessible_repos() -> List[Dict[str, Any]]:
-    url = "https://api.github.com/user/repos"
+    url = f"{github_api.API_URL}/user/repos"
     params = {"affiliation": "owner,collaborator,organization_member", "per_page": PER_PAGE}
     return github_get_all(url, params=params, max_pages=50)
 
-def fetch_repo_commits(full_name: str) -> List[Dict[str, Any]]:
-    url = f"https://api.github.com/repos/{full_name}/commits"
-    params = {"since": START_DATE, "until": END_DATE}
+def fetch_head_sha(full_name: str, ref: str) -> Optional[str]:
+    # media type "sha" : la réponse est juste le SHA (requête très légère)
+    url = f"{github_api.API_URL}/repos/{full_name}/commits/{ref}"
+    sha = github_api.get_text(get_session(), url, accept="application/vnd.github.sha")
+    return sha.strip() if sha is not None else None
+
+def fetch_repo_commits(full_name: str, since: str = START_DATE) -> List[Dict[str, Any]]:
+    url = f"{github_api.API_URL}/repos/{full_name}/commits"
+    params = {"since": since, "until": END_DATE}
     if AUTHOR_LOGIN:
         params["author"] = AUTHOR_LOGIN  # filtre côté serveur (par login GitHub)
     return github_get_all(url, params=params, max_pages=MAX_PAGES)
 
-def parse_commit(row: Dict[str, Any], repo_meta: Dict[str, Any]) -> Dict[str, Any]:
-    commit = row.get("commit") or {}
-    author = row.get("author") or {}       # compte GitHub (peut être None si mail non associé)
-    committer = row.get("committer") or {}
-    parents = row.get("parents") or []
-    is_merge = (len(parents) > 1)
-    # prefer author date if present, otherwise committer date
-    author_date = (commit.get("author") or {}).get("date")
-    committer_date = (commit.get("committer") or {}).get("date")
-    commit_date = author_date or committer_date
-    commit_day = None
-    commit_hour = None
-    if commit_date:
-        # commit_date is usually ISO 8601 like '2024-12-23T22:32:14Z' or with offset
-        try:
-            commit_day = commit_date.split("T")[0]
-        except Exception:
-            commit_day = None
-        # derive hour (0-23) in UTC from the timestamp if possible
+def fetch_fork_bases(repos: List[Dict[str, Any]]) -> Dict[str, str]:
+    """fork -> repo accessible dont il descend (parent, sinon source du réseau)."""
+    accessible = {r["full_name"] for r in repos}
+    bases = {}
+    for r in repos:
+        if not r.get("fork"):
+            continue
+        # /user/repos ne donne pas le parent d'un fork : une requête par fork
+        detail = next(iter(github_get_all(f"{github_api.API_URL}/repos/{r['full_name']}", max_pages=1)), {})
+        for key in ("parent", "source"):
+            base = (detail.get(key) or {}).get("full_name")
+            if base in accessible and base != r["full_name"]:
+                bases[r["full_name"]] = base
+                break
+    return bases
+
+def compare_commits(base_repo: Dict[str, Any], base: str, head: str) -> Optional[Tuple[List[Dict[str, Any]], int]]:
+    """Commits de `head` absents de `base` ("owner:branche", même réseau de forks) et behind_by ; None si échec."""
+    url = f"{github_api.API_URL}/repos/{base_repo['full_name']}/compare/{quote(base, safe=':')}...{quote(head, safe=':')}"
+    commits: List[Dict[str, Any]] = []
+    behind_by = None
+    for page in github_api.iter_pages(get_session(), url, params={"per_page": PER_PAGE}, max_pages=MAX_PAGES):
+        if "commits" not in page:
+            return None
+        behind_by = page.get("behind_by", 0) if behind_by is None else behind_by
+        commits.extend(page["commits"])
+    return (commits, behind_by) if behind_by is not None else None
+
+def fetch_fork_divergence(base_repo: Dict[str, Any], fork: Dict[str, Any], since: str,
+                          need_base_only: bool) -> Optional[Tuple[List[Dict[str, Any]], Set[str]]]:
+    """(commits propres du fork dans la fenêtre, SHA de la base absents du fork) ; None si la comparaison échoue.
+
+    Les commits de la base absents du fork ne sont demandés (seconde comparaison,
+    dans l'autre sens) que si l'historique de la base est en mémoire pour ce run.
+    """
+    def ref(r: Dict[str, Any]) -> str:
+        return f"{r['full_name'].split('/', 1)[0]}:{r.get('default_branch') or 'HEAD'}"
+
+    ahead = compare_commits(base_repo, ref(base_repo), ref(fork))
+    if ahead is None:
+        return None
+    commits, behind_by = ahead
+    base_only: Set[str] = set()
+    if need_base_only and behind_by:
+        behind = compare_commits(base_repo, ref(fork), ref(base_repo))
+        if behind is None:
+            return None
+        base_only = {c.get("sha") for c in behind[0]}
+
+    def keep(c: Dict[str, Any]) -> bool:
+        # compare ne filtre ni par date ni par auteur : mêmes filtres que /commits
+        commit = c.get("commit") or {}
+        date = (commit.get("committer") or {}).get("date") or (commit.get("author") or {}).get("date") or ""
+        if not since <= date <= END_DATE:
+            return False
+        return not AUTHOR_LOGIN or (c.get("author") or {}).get("login") == AUTHOR_LOGIN
+
+    # compare liste du plus ancien au plus récent, /commits l'inverse
+    return [c for c in reversed(commits) if keep(c)], base_only
+
+def rest_fetch_histories(jobs: List[Tuple[Dict[str, Any], str]]) -> Iterator[Tuple[Dict[str, Any], Optional[List[Dict[str, Any]]]]]:
+    for r, since in jobs:
         try:
-            # try to parse using pandas for robustness
-            parsed_dt = pd.to_datetime(commit_date, utc=True)
-            if not pd.isna(parsed_dt):
-                commit_hour = int(parsed_dt.hour)
-        except Exception:
-            commit_hour = None
+            yield r, fetch_repo_commits(r.get("full_name"), since=since)
+        except Exception as e:
+            print(f"  Error on {r.get('full_name')}: {e}")
+            yield r, None
+
+# ----------------- GraphQL (historique de plusieurs repos par requête) -----------------
+
+# Seuls les champs lus par commits_frame (colonnes REPO_COLUMNS) sont demandés
+HISTORY_FIELDS = """
+            pageInfo { hasNextPage endCursor }
+            nodes {
+              oid
+              message
+              author { name date user { login } }
+              committer { date }
+              parents { totalCount }
+            }"""
 
+def graphql_author_id(login: str) -> Optional[str]:
+    data = github_api.graphql(get_session(), "query($login: String!) { user(login: $login) { id } }",
+                              {"login": login}, url=GRAPHQL_URL)
+    return ((data or {}).get("user") or {}).get("id")
+
+def graphql_fetch_heads(repos: List[Dict[str, Any]]) -> Dict[str, Optional[str]]:
+    """SHA de tête de la branche par défaut, par paquets de 50 repos."""
+    heads: Dict[str, Optional[str]] = {}
+    for start in range(0, len(repos), 50):
+        batch = repos[start:start + 50]
+        decls, fields, variables = [], [], {}
+        for j, r in enumerate(batch):
+            owner, name = r["full_name"].split("/", 1)
+            decls.append(f"$o{j}: String!, $n{j}: String!")
+            fields.append(f"h{j}: repository(owner: $o{j}, name: $n{j}) {{ defaultBranchRef {{ target {{ oid }} }} }}")
+            variables.update({f"o{j}": owner, f"n{j}": name})
+        query = f"query({', '.join(decls)}) {{\n  " + "\n  ".join(fields) + "\n}"
+        data = github_api.graphql(get_session(), query, variables, url=GRAPHQL_URL) or {}
+        for j, r in enumerate(batch):
+            ref = (data.get(f"h{j}") or {}).get("defaultBranchRef") or {}
+            heads[r["full_name"]] = (ref.get("target") or {}).get("oid")
+    return heads
+
+def build_history_query(active: Dict[str, Dict[str, Any]], author_id: Optional[str]) -> Tuple[str, Dict[str, Any]]:
+    decls = ["$until: GitTimestamp!"]
+    variables: Dict[str, Any] = {"until": END_DATE}
+    if author_id:
+        decls.append("$author: CommitAuthor")
+        variables["author"] = {"id": author_id}
+    fields = []
+    for alias, job in active.items():
+        owner, name = job["repo"]["full_name"].split("/", 1)
+        decls.append(f"${alias}o: String!, ${alias}n: String!, ${alias}s: GitTimestamp, ${alias}c: String")
+        variables.update({f"{alias}o": owner, f"{alias}n": name,
+                          f"{alias}s": job["since"], f"{alias}c": job["cursor"]})
+        args = f"first: {PER_PAGE}, since: ${alias}s, until: $until, after: ${alias}c"
+        if author_id:
+            args += ", author: $author"
+        fields.append(
+            f"{alias}: repository(owner: ${alias}o, name: ${alias}n) {{\n"
+            f"    defaultBranchRef {{ target {{ ... on Commit {{\n"
+            f"          history({args}) {{{HISTORY_FIELDS}\n          }}\n"
+            f"    }} }} }}\n  }}"
+        )
+    query = f"query({', '.join(decls)}) {{\n  " + "\n  ".join(fields) + "\n}"
+    return query, variables
+
+def graphql_node_to_rest(node: Dict[str, Any]) -> Dict[str, Any]:
+    # même forme que la réponse REST /commits => même commits_frame que le mode REST
+    author = node.get("author") or {}
     return {
-        "repo_full_name": repo_meta.get("full_name"),
-        "repo_private": repo_meta.get("private"),
-        "repo_language": repo_meta.get("language"),
-        "repo_stars": repo_meta.get("stargazers_count"),
-        "repo_forks": repo_meta.get("forks_count"),
-        # "sha": row.get("sha"),
-        # "html_url": row.get("html_url"),
-        # "author_login": author.get("login"),
-        # "author_id": author.get("id"),
-        # "author_name": (commit.get("author") or {}).get("name"),
-        # "author_email": (commit.get("author") or {}).get("email"),
-        # "author_date": author_date,
-        # "committer_login": committer.get("login"),
-        # "committer_id": committer.get("id"),
-        # "committer_name": (commit.get("committer") or {}).get("name"),
-        # "committer_email": (commit.get("committer") or {}).get("email"),
-        # "committer_date": committer_date,
-        # "commit_date": commit_date,
-        "commit_day": commit_day,
-        "commit_hour": commit_hour,
-        "message": commit.get("message"),
-        "is_merge": is_merge,
+        "sha": node.get("oid"),
+        "author": author.get("user"),   # compte GitHub (None si l'e-mail n'est lié à aucun compte)
+        "commit": {
+            "message": node.get("message"),
+            "author": {k: v for k, v in author.items() if k != "user"},
+            "committer": node.get("committer") or {},
+        },
+        "parents": [{}] * ((node.get("parents") or {}).get("totalCount") or 0),
     }
 
-def append_dedup(df_new: pd.DataFrame, out_path: str = OUT_CSV, key: str = "sha") -> int:
-    os.makedirs(os.path.dirname(out_path), exist_ok=True)
-    if os.path.exists(out_path) and os.path.getsize(out_path) > 0:
-        df_old = pd.read_csv(out_path, low_memory=False)
-        df_all = pd.concat([df_old, df_new], ignore_index=True)
-        if key in df_all.columns:
-            df_all = df_all.drop_duplicates(subset=[key])
-    else:
-        df_all = df_new.copy()
-    # Types utiles
-    # parse datetime-like columns
-    for col in ["author_date", "committer_date", "commit_date"]:
-        if col in df_all:
-            df_all[col] = pd.to_datetime(df_all[col], utc=True, errors="coerce")
-    # commit_day is date-only; keep as date (no tz)
-    if "commit_day" in df_all:
-        try:
-            df_all["commit_day"] = pd.to_datetime(df_all["commit_day"], errors="coerce").dt.date
-        except Exception:
-            # fallback: leave as-is
-            pass
-    # commit_hour should be integer 0-23 when possible
-    if "commit_hour" in df_all:
-        try:
-            df_all["commit_hour"] = pd.to_numeric(df_all["commit_hour"], errors="coerce").astype(pd.Int64Dtype())
-        except Exception:
-            # best-effort: leave as-is
-            pass
-    df_all.to_csv(out_path, index=False)
-    return len(df_all)
-
-def main_commits_history():
+def graphql_fetch_histories(jobs: List[Tuple[Dict[str, Any], str]],
+                            author_id: Optional[str] = None) -> Iterator[Tuple[Dict[str, Any], Optional[List[Dict[str, Any]]]]]:
+    """Pagine l'historique de GRAPHQL_BATCH repos à la fois dans une seule requête aliasée.
+
+    Un repo terminé libère sa place pour le suivant ; chaque repo est rendu (yield)
+    dès que son historique est complet. En cas d'erreur, le repo est rendu avec None :
+    un historique partiel ferait avancer le curseur au-delà de commits jamais lus.
+    """
+    queue = list(jobs)
+    active: Dict[str, Dict[str, Any]] = {}
+    next_id = 0
+    while queue or active:
+        while queue and len(active) < GRAPHQL_BATCH:
+            r, since = queue.pop(0)
+            active[f"r{next_id}"] = {"repo": r, "since": since, "cursor": None, "pages": 0, "commits": []}
+            next_id += 1
+
+        query, variables = build_history_query(active, author_id)
+        data = github_api.graphql(get_session(), query, variables, url=GRAPHQL_URL)
+        if data is None:
+            for job in active.values():
+                yield job["repo"], None
+            active.clear()
+            continue
+
+        for alias, job in list(active.items()):
+            ref = (data.get(alias) or {}).get("defaultBranchRef") or {}
+            history = (ref.get("target") or {}).get("history")
+            if history is None and data.get(alias) is None:
+                # repo inaccessible (erreur GraphQL déjà affichée)
+                yield job["repo"], None
+                del active[alias]
+                continue
+            history = history or {}
+            job["commits"].extend(graphql_node_to_rest(n) for n in history.get("nodes") or [])
+            job["pages"] += 1
+            page_info = history.get("pageInfo") or {}
+            if page_info.get("hasNextPage") and job["pages"] < MAX_PAGES:
+                job["cursor"] = page_info.get("endCursor")
+            else:
+                yield job["repo"], job["commits"]
+                del active[alias]
+
+REPO_COLUMNS = [
+    "repo_full_name", "repo_private", "repo_language", "repo_stars", "repo_forks",
+    "sha", "author_login", "author_name", "commit_day", "commit_hour", "message", "is_merge",
+]
+
+def parse_commits(commits: List[Dict[str, Any]], repo_meta: Dict[str, Any]) -> "pd.DataFrame":
+    # commits_frame : une seule conversion de dates pour toute la page
+    return commits_frame(
+        commits, REPO_COLUMNS,
+        repo_full_name=repo_meta.get("full_name"),
+        repo_private=repo_meta.get("private"),
+        repo_language=repo_meta.get("language"),
+        repo_stars=repo_meta.get("stargazers_count"),
+        repo_forks=repo_meta.get("forks_count"),
+    )
+
+def main_commits_history(full: bool = False, cache_path: Optional[str] = HTTP_CACHE_PATH,
+                         use_graphql: bool = USE_GRAPHQL, db: Optional[str] = None):
+    from commit_store import append_dedup, count_rows, read_header   # pandas : seulement au lancement du scraping
+
+    header = read_header(OUT_CSV)
+    if header and "sha" not in header:
+        # sortie d'avant l'index SHA : ni dédup ni index de forks possibles sur ses lignes
+        print(f"Error: {OUT_CSV} has no 'sha' column; move it aside and run again to rebuild it.")
+        return
+    state = ScrapeState(state_path_for(OUT_CSV))
+    github_api.use_cache(cache_path)
     print(f"Listing accessible repos… (token scopes déterminent l’accès privé/public)")
-    repos = fetch_accessible_repos()
+    repos = [r for r in fetch_accessible_repos() if r.get("full_name")]
     print(f"Found {len(repos)} repos.")
-    total_added = 0
+    index = ShaIndex(fetch_fork_bases(repos))
+    if index.bases:
+        print(f"{len(index.bases)} forks of accessible repos: only their divergence from the parent is fetched.")
+    if use_graphql:
+        heads = graphql_fetch_heads(repos)
+    else:
+        heads = {r["full_name"]: fetch_head_sha(r["full_name"], r.get("default_branch") or "HEAD") for r in repos}
+
+    jobs = []
     for i, r in enumerate(repos):
-        full = r.get("full_name")
-        print(f"[{i+1}/{len(repos)}] commits {START_DATE} → {END_DATE} for {full} (private={r.get('private')})…")
-        try:
-            commits = fetch_repo_commits(full)
-        except Exception as e:
-            print(f"  Error on {full}: {e}")
+        full_name = r["full_name"]
+        branch = r.get("default_branch") or "HEAD"
+        head_sha = heads.get(full_name)
+        if not full and state.is_unchanged(full_name, branch, head_sha):
+            print(f"[{i+1}/{len(repos)}] {full_name}: {branch} unchanged ({head_sha[:7]}), skipping.")
             continue
-        if not commits:
+        since = START_DATE if full else state.since(full_name, branch, START_DATE)
+        print(f"[{i+1}/{len(repos)}] commits {since} → {END_DATE} for {full_name} (private={r.get('private')})…")
+        jobs.append((r, since))
+
+    # forks traités après leur base, via compare ; l'historique d'une base attend ses forks
+    # pour que chaque commit soit écrit une fois avec tous les repos qui le contiennent
+    fork_jobs = sorted([j for j in jobs if j[0]["full_name"] in index.bases],
+                       key=lambda j: index.depth(j[0]["full_name"]))
+    jobs = [j for j in jobs if j[0]["full_name"] not in index.bases]
+    waiting_for_forks = set(index.bases.values())
+    by_name = {r["full_name"]: r for r in repos}
+
+    if use_graphql:
+        author_id = graphql_author_id(AUTHOR_LOGIN) if AUTHOR_LOGIN else None
+        if AUTHOR_LOGIN and not author_id:
+            print(f"Error: GitHub user {AUTHOR_LOGIN!r} not found.")
+            return
+        results = graphql_fetch_histories(jobs, author_id=author_id)
+    else:
+        results = rest_fetch_histories(jobs)
+
+    total_added = 0
+
+    def write(r: Dict[str, Any], commits: List[Dict[str, Any]]) -> None:
+        nonlocal total_added
+        full_name = r["full_name"]
+        if commits:
+            df_chunk = parse_commits(commits, r)
+            df_chunk["repos"] = [";".join(index.repos_of(sha) or [full_name]) for sha in df_chunk["sha"]]
+            before = count_rows(OUT_CSV)
+            total_now = append_dedup(df_chunk, OUT_CSV, key="sha", db=db)
+            added = max(0, total_now - before)
+            total_added += added
+            print(f"  {full_name}: wrote {len(df_chunk)} rows, file now has {total_now} rows (added {added}).")
+        # curseur sauvegardé après chaque repo écrit : un run interrompu garde ses progrès
+        state.record(full_name, r.get("default_branch") or "HEAD", heads.get(full_name), newest_commit_date(commits))
+        state.save()
+
+    held: Dict[str, Tuple[Dict[str, Any], List[Dict[str, Any]]]] = {}
+    for r, commits in results:
+        full_name = r["full_name"]
+        if commits is None:
+            print(f"  {full_name}: fetch failed, cursor left unchanged.")
             continue
-        rows = [parse_commit(c, r) for c in commits]
-        df_chunk = pd.DataFrame(rows)
-        before = 0
-        if os.path.exists(OUT_CSV):
-            try:
-                before = sum(1 for _ in open(OUT_CSV)) - 1
-            except Exception:
-                before = 0
-        total_now = append_dedup(df_chunk, OUT_CSV, key="sha")
-        added = max(0, total_now - before)
-        total_added += added
-        print(f"  wrote {len(rows)} rows, file now has {total_now} rows (added {added}).")
+        index.add(full_name, (c.get("sha") for c in commits))
+        if full_name in waiting_for_forks:
+            held[full_name] = (r, commits)
+        else:
+            write(r, commits)
+
+    for r, since in fork_jobs:
+        full_name = r["full_name"]
+        base = index.bases[full_name]
+        print(f"  {full_name}: compare with {base}…")
+        divergence = fetch_fork_divergence(by_name[base], r, since, need_base_only=base in index.members)
+        if divergence is None:
+            print(f"[warn] Compare {base}...{full_name} failed; fetching its whole history.")
+            commits = next(rest_fetch_histories([(r, since)]))[1]
+            if commits is None:
+                print(f"  {full_name}: fetch failed, cursor left unchanged.")
+                continue
+            index.add(full_name, (c.get("sha") for c in commits))
+        else:
+            commits, base_only = divergence
+            index.add_fork(full_name, (c.get("sha") for c in commits), base_only)
+        if full_name in waiting_for_forks:
+            held[full_name] = (r, commits)
+        else:
+            write(r, commits)
+
+    for r, commits in held.values():
+        write(r, commits)
 
     print(f"Done. Total new commits added this run: {total_added}. Output -> {OUT_CSV}")
+    github_api.print_cache_stats()
+
+def cli(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Scrape the commit history of every accessible repo.")
+    parser.add_argument("--full", action="store_true",
+                        help="Ignore the saved cursors and refetch the whole START_DATE..END_DATE window.")
+    parser.add_argument("--no-cache", action="store_true",
+                        help="Disable the on-disk ETag cache (HTTP_CACHE_PATH).")
+    parser.add_argument("--rest", action="store_true",
+                        help="Use one REST /commits request per page instead of batched GraphQL queries.")
+    parser.add_argument("--db", help="Also insert the new commits into this commit_db.py SQLite database.")
+    metrics.add_arguments(parser)
+    args = parser.parse_args(argv)
+    metrics.start(args)
+    try:
+        get_session()   # identifiants et token vérifiés avant de commencer
+        main_commits_history(full=args.full, cache_path=None if args.no_cache else HTTP_CACHE_PATH,
+                             use_graphql=USE_GRAPHQL and not args.rest, db=args.db)
+    except credentials.CredentialsError as e:
+        print(f"Error: {e}")
+        return 1
+    finally:
+        metrics.finish(args)
+    return 0
 
 if __name__ == "__main__":
-    main_commits_history()
\ No newline at end of file
+    sys.exit(cli())
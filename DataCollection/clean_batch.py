@@ -0,0 +1,235 @@
+from pathlib import Path
+
+import cleaner
+import columnar
+import compression
+
+try:
+	import pyarrow as pa
+	import pyarrow.compute as pc
+	import pyarrow.csv as pa_csv
+except Exception:
+	pa = None
+	pc = None
+	pa_csv = None
+
+# Nettoyage par colonnes (cleaner.py --engine batch) : même sortie que merge_csv.
+#
+# Chaque CSV est lu par blocs avec pyarrow, puis chaque bloc est normalisé colonne
+# par colonne avec les kernels texte d'Arrow (trim, lower, split_pattern, is_in)
+# au lieu d'un normalize_row par ligne. Les expressions ci-dessous reproduisent
+# _split_normalized et normalize_row pour les valeurs ASCII. Une valeur non ASCII
+# (NFKD, casse et espaces Unicode) repasse par les fonctions Python de cleaner,
+# une seule fois par valeur distincte. Messages et dates très répétés ne sont
+# découpés qu'une fois par valeur distincte, et les lignes CSV sont formatées par
+# Arrow avec les règles de guillemets du module csv.
+
+BLOCK_BYTES = 16 * 1024 * 1024
+
+TEXT_COLUMNS = ["repo_full_name", "sha", "parent_shas", "branch", "author_name"]
+MESSAGE_COLUMNS = ["message_type", "message_argument", "message_message"]
+
+# espaces ASCII au sens de str.strip() (\x1c-\x1f compris)
+ASCII_WHITESPACE = "".join(chr(c) for c in range(128) if chr(c).isspace())
+
+# re.search(r"\((.*?)\)", msg) : seulement pour les messages dont la première
+# parenthèse ne se ferme pas sur sa ligne (les autres sont découpés sans regex)
+ARGUMENT_RE = r"\((?P<argument>[^\n]*?)\)(?P<rest>(?s:.*))$"
+
+
+def _column(batch, name: str):
+	# colonne absente du CSV : DictReader donne None, traité comme ""
+	if name in batch.schema.names:
+		return batch.column(name)
+	return pc.fill_null(pa.nulls(batch.num_rows, type=pa.string()), "")
+
+
+def _strip(values):
+	return pc.utf8_trim(values, characters=ASCII_WHITESPACE)
+
+
+def _split_once(values, sep: str):
+	"""(avant, après) le premier `sep` de chaque valeur ; après = "" s'il n'y en a pas."""
+	parts = pc.split_pattern(pc.binary_join_element_wise(values, sep, ""), sep, max_splits=1)
+	return pc.list_element(parts, 0), pc.utf8_slice_codeunits(pc.list_element(parts, 1), 0, -1)
+
+
+def _after_colon(values):
+	# x.split(":", 1)[1].strip() s'il y a un ":", sinon x
+	_, after = _split_once(values, ":")
+	return pc.if_else(pc.match_substring(values, ":"), _strip(after), values)
+
+
+def _split_dates(commit_date) -> list:
+	day, rest = _split_once(commit_date, " ")
+	hour, _ = _split_once(pc.list_element(pc.split_pattern(rest, " ", max_splits=1), 0), ":")
+	return [day, hour]
+
+
+def _not_ascii(values):
+	return pc.invert(pc.string_is_ascii(values))
+
+
+def _fix_non_ascii(values, columns: list, fn) -> list:
+	"""Remplace, pour les valeurs non ASCII, chaque colonne de `columns` par fn(valeur)[i]."""
+	mask = _not_ascii(values)
+	if not pc.any(mask).as_py():
+		return columns
+	todo = pc.filter(values, mask).to_pylist()
+	fixed = {v: fn(v) for v in set(todo)}
+	return [pc.replace_with_mask(column, mask, pa.array([fixed[v][i] for v in todo], type=column.type))
+		for i, column in enumerate(columns)]
+
+
+def _distinct(values, fn) -> list:
+	"""fn(values), calculé une fois par valeur distincte si les valeurs se répètent beaucoup."""
+	encoded = pc.dictionary_encode(values)
+	if 2 * len(encoded.dictionary) > len(values):
+		return fn(values)
+	return [pc.take(column, encoded.indices) for column in fn(encoded.dictionary)]
+
+
+def _text(values):
+	"""normalize_text(value.strip()) sur une colonne."""
+	return _fix_non_ascii(values, [_strip(values)], lambda v: [cleaner.normalize_text(v.strip())])[0]
+
+
+def _nomenclature(kind):
+	return pc.cast(pc.is_in(kind, value_set=pa.array(sorted(cleaner.ALLOWED_TYPES))), pa.int8())
+
+
+def _split_messages(message) -> list:
+	"""type, argument, message et nomenclature d'un message brut, comme split_message."""
+	msg = _strip(message)
+	head, rest = _split_once(msg, "(")
+	# type : avant la première parenthèse, sans retour à la ligne hors espaces finaux
+	found = pc.and_(pc.match_substring(msg, "("),
+		pc.invert(pc.match_substring(pc.utf8_rtrim(head, characters=ASCII_WHITESPACE), "\n")))
+	# argument : premier "(...)" fermé sur sa ligne
+	inner, tail = _split_once(rest, ")")
+	closed = pc.and_(found, pc.match_substring(rest, ")"))
+	multiline = pc.and_(closed, pc.match_substring(inner, "\n"))
+	if pc.any(multiline).as_py():
+		parts = pc.extract_regex(pc.filter(msg, multiline), pattern=ARGUMENT_RE)
+		inner = pc.replace_with_mask(inner, multiline, pc.struct_field(parts, "argument"))
+		tail = pc.replace_with_mask(tail, multiline, pc.struct_field(parts, "rest"))
+		closed = pc.and_(closed, pc.is_valid(inner))
+	kind = pc.if_else(found, pc.ascii_lower(_strip(head)), "")
+	argument = pc.if_else(closed, pc.ascii_lower(_strip(inner)), "")
+	after = _after_colon(pc.if_else(closed, _strip(tail), msg))
+	columns = [kind, argument, after, _nomenclature(kind)]
+	return _fix_non_ascii(message, columns, lambda v: cleaner.normalize_message(v, None, None, None))
+
+
+def _given_type(message_type) -> list:
+	"""normalize_text(type) et nomenclature d'un type déjà découpé (CSV déjà nettoyé)."""
+	columns = [message_type, _nomenclature(pc.ascii_lower(_strip(message_type)))]
+	return _fix_non_ascii(message_type, columns, lambda v: cleaner.normalize_message(None, v, None, None)[::3])
+
+
+def _normalized(values):
+	return _fix_non_ascii(values, [values], lambda v: [cleaner.normalize_text(v)])[0]
+
+
+def _messages(batch) -> list:
+	"""message_type, message_argument, message_message et nomenclature (cf. normalize_message)."""
+	message = _column(batch, "message")
+	given_type, given_argument, given_message = (_column(batch, name) for name in MESSAGE_COLUMNS)
+	given = pc.or_(pc.or_(pc.not_equal(given_type, ""), pc.not_equal(given_argument, "")),
+		pc.not_equal(given_message, ""))
+
+	# colonnes message_* présentes : reprises ; sinon message brut découpé
+	if not pc.any(given).as_py():
+		return _distinct(message, _split_messages)
+	kind, nomenclature = _distinct(given_type, _given_type)
+	kept = [kind, _normalized(given_argument), _normalized(given_message), nomenclature]
+	if pc.all(given).as_py():
+		return kept
+	return [pc.if_else(given, a, b) for a, b in zip(kept, _distinct(message, _split_messages))]
+
+
+def clean_batch(batch):
+	"""Un bloc du CSV d'entrée -> RecordBatch aux colonnes de cleaner.OUTPUT_COLUMNS."""
+	out = {name: _text(_column(batch, name)) for name in TEXT_COLUMNS}
+
+	# commit_day = commit_date.split(" ")[0], commit_hour = split(" ")[1].split(":")[0]
+	day = _column(batch, "commit_day")
+	hour = _column(batch, "commit_hour")
+	missing_day, missing_hour = pc.equal(day, ""), pc.equal(hour, "")
+	if pc.any(pc.or_(missing_day, missing_hour)).as_py():
+		date_day, date_hour = _distinct(_column(batch, "commit_date"), _split_dates)
+		day = pc.if_else(missing_day, date_day, day)
+		hour = pc.if_else(missing_hour, date_hour, hour)
+	out["commit_day"] = day
+	out["commit_hour"] = hour
+
+	out.update(zip(MESSAGE_COLUMNS + ["nomenclature"], _messages(batch)))
+	return pa.record_batch([out[name] for name in cleaner.OUTPUT_COLUMNS], names=cleaner.OUTPUT_COLUMNS)
+
+
+def _csv_field(values):
+	# QUOTE_MINIMAL du module csv : guillemets si ',', '"', '\r' ou '\n', guillemets internes doublés
+	values = pc.cast(values, pa.string())
+	data = values.buffers()[2]
+	data = bytes(data) if data is not None else b""
+	if not any(ch in data for ch in (b",", b'"', b"\r", b"\n")):
+		return values
+	mask = pc.match_substring_regex(values, r'[,"\r\n]')
+	quoted = pc.binary_join_element_wise('"', pc.replace_substring(pc.filter(values, mask), '"', '""'), '"', "")
+	return pc.replace_with_mask(values, mask, quoted)
+
+
+def encode_csv(batch):
+	"""Lignes CSV de `batch`, octet pour octet celles de csv.DictWriter (fin de ligne \r\n)."""
+	fields = [_csv_field(column) for column in batch.columns]
+	fields[-1] = pc.binary_join_element_wise(fields[-1], "\r\n", "")
+	lines = pc.binary_join_element_wise(*fields, ",")
+	offsets = lines.buffers()[1]
+	first, last = (int.from_bytes(offsets[4 * i:4 * i + 4], "little", signed=True)
+		for i in (lines.offset, lines.offset + len(lines)))
+	return lines.buffers()[2][first:last]
+
+
+def iter_batches(path: Path, block_bytes: int = BLOCK_BYTES):
+	header, _ = cleaner.read_header(path)
+	# .csv.gz / .csv.zst : flux décompressé par compression.py (dictionnaire zstd compris)
+	source = compression.open_binary(path) if compression.codec(path) else path
+	reader = pa_csv.open_csv(
+		source,
+		read_options=pa_csv.ReadOptions(block_size=block_bytes),
+		parse_options=pa_csv.ParseOptions(newlines_in_values=True),
+		convert_options=pa_csv.ConvertOptions(
+			column_types={name: pa.string() for name in header},
+			strings_can_be_null=False,
+		),
+	)
+	try:
+		for batch in reader:
+			if batch.num_rows:
+				yield batch
+	finally:
+		if source is not path:
+			source.close()
+
+
+def merge_csv_batch(inputs: list[Path], output: Path, block_bytes: int = BLOCK_BYTES) -> int:
+	"""Même sortie que merge_csv_sequential, normalisée par blocs de colonnes."""
+	columnar.require_pyarrow()
+	rows_written = 0
+	sink = cleaner.open_sink(output)
+	csv_output = isinstance(sink, cleaner.CsvSink)
+	try:
+		for path in inputs:
+			if not path.exists():
+				continue
+			for batch in iter_batches(path, block_bytes):
+				cleaned = clean_batch(batch)
+				if csv_output:
+					sink.write_encoded(encode_csv(cleaned))
+				else:
+					sink.write_frame(cleaned.to_pandas())
+				rows_written += batch.num_rows
+	finally:
+		sink.close()
+
+	return rows_written
@@ -0,0 +1,328 @@
+import csv
+import hashlib
+import inspect
+import json
+import os
+import sqlite3
+import unicodedata
+import zlib
+from pathlib import Path
+
+import cleaner
+import compression
+import partitions
+
+# Nettoyage incrémental (cleaner.py --incremental).
+#
+# À côté de la sortie CSV, une base SQLite (<sortie>.clean.sqlite) garde :
+#   - meta   : empreinte des règles de nettoyage et taille de la sortie au dernier passage ;
+#   - inputs : pour chaque entrée, son en-tête, la taille déjà traitée, son mtime et une
+#              empreinte blake2b de ces octets ;
+#   - rows   : une ligne par ligne de sortie, dans le même ordre : entrée d'origine, SHA
+#              et crc32 de la ligne normalisée.
+# Une entrée inchangée est ignorée. Une entrée qui a seulement grandi (mêmes premiers
+# octets, cas des sorties append-only de commit_store.py) n'a que ses nouvelles lignes
+# normalisées, ajoutées en fin de sortie. Une entrée réécrite est renormalisée et
+# comparée SHA par SHA à ce qu'elle avait donné : les lignes modifiées sont remplacées
+# sur place, les disparues retirées, les nouvelles ajoutées en fin de sortie.
+# Même contenu qu'une reconstruction complète donc, dans l'ordre d'arrivée des lignes.
+# Entrées et sortie .csv.gz / .csv.zst : tailles et empreintes portent sur les octets
+# compressés ; un ajout de commit_store.py est un nouveau membre / une nouvelle trame,
+# relu à partir de l'ancienne taille.
+# Reconstruction complète si les règles changent (RULES_VERSION, colonnes, types,
+# code des fonctions normalize_*, version Unicode), si l'en-tête d'une entrée change,
+# ou si la sortie a été modifiée hors de ce module.
+
+CHUNK_ROWS = 50_000
+HASH_BLOCK = 1024 * 1024
+
+RULE_FUNCTIONS = [
+	cleaner.normalize_row,
+	cleaner.normalize_message,
+	cleaner.split_message,
+	cleaner._split_normalized,
+	cleaner.normalize_text,
+	cleaner._normalize_unicode,
+]
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (k TEXT PRIMARY KEY, v);
+CREATE TABLE IF NOT EXISTS inputs (
+	id INTEGER PRIMARY KEY,
+	path TEXT UNIQUE,
+	header TEXT,
+	size INTEGER,
+	mtime_ns INTEGER,
+	fingerprint TEXT
+);
+CREATE TABLE IF NOT EXISTS rows (line INTEGER PRIMARY KEY, source INTEGER, sha TEXT, digest INTEGER);
+CREATE INDEX IF NOT EXISTS rows_source ON rows (source);
+"""
+
+
+def state_path_for(output: Path) -> Path:
+	return output.with_name(output.name + ".clean.sqlite")
+
+
+def rules_hash() -> str:
+	h = hashlib.blake2b(digest_size=16)
+	for part in [
+		str(cleaner.RULES_VERSION),
+		",".join(cleaner.OUTPUT_COLUMNS),
+		",".join(sorted(cleaner.ALLOWED_TYPES)),
+		unicodedata.unidata_version,
+	] + [inspect.getsource(inspect.unwrap(fn)) for fn in RULE_FUNCTIONS]:
+		h.update(part.encode("utf-8") + b"\0")
+	return h.hexdigest()
+
+
+def fingerprints(path: Path, sizes: list[int]) -> list[str]:
+	"""Empreintes des `sizes` premiers octets de `path` (tailles croissantes), en une lecture."""
+	h = hashlib.blake2b(digest_size=16)
+	out = []
+	pos = 0
+	with path.open("rb") as f:
+		for size in sizes:
+			while pos < size:
+				block = f.read(min(HASH_BLOCK, size - pos))
+				if not block:
+					break
+				h.update(block)
+				pos += len(block)
+			out.append(h.hexdigest() if pos == size else "")
+	return out
+
+
+def row_digest(row: dict) -> int:
+	return zlib.crc32("\x1f".join(str(row[name]) for name in cleaner.OUTPUT_COLUMNS).encode("utf-8"))
+
+
+def iter_normalized(path: Path, header: list[str], start: int, end: int):
+	# start = 0 : CSV compressé relu depuis le début, en-tête compris (cf. cleaner.read_header)
+	for row in csv.DictReader(cleaner.iter_lines(path, start, end), fieldnames=header if start else None):
+		yield cleaner.normalize_row(row)
+
+
+def _row_chunks(rows, sink):
+	"""Écrit les lignes normalisées ; rend (SHA, crc32) par morceaux de CHUNK_ROWS."""
+	keys = []
+	for row in rows:
+		sink.write_row(row)
+		keys.append((row["sha"], row_digest(row)))
+		if len(keys) >= CHUNK_ROWS:
+			yield keys
+			keys = []
+	if keys:
+		yield keys
+
+
+def _batch_chunks(path: Path, sink):
+	"""Comme _row_chunks pour un fichier entier, normalisé par clean_batch (--engine batch)."""
+	import clean_batch
+	pa, pc = clean_batch.pa, clean_batch.pc
+
+	for batch in clean_batch.iter_batches(path):
+		cleaned = clean_batch.clean_batch(batch)
+		sink.write_encoded(clean_batch.encode_csv(cleaned))
+		joined = pc.binary_join_element_wise(*[pc.cast(c, pa.string()) for c in cleaned.columns], "\x1f")
+		digests = [zlib.crc32(v.encode("utf-8")) for v in joined.to_pylist()]
+		yield list(zip(cleaned.column("sha").to_pylist(), digests))
+
+
+class CleanState:
+	"""Entrées et lignes déjà nettoyées d'une sortie CSV (cf. en-tête du module)."""
+
+	def __init__(self, output: Path):
+		self.output = output
+		output.parent.mkdir(parents=True, exist_ok=True)
+		self.db = sqlite3.connect(state_path_for(output))
+		self.db.executescript(SCHEMA)
+		self.db.commit()
+		self.written = 0   # lignes écrites ou remplacées pendant ce passage
+
+	def close(self) -> None:
+		self.db.close()
+
+	def __enter__(self):
+		return self
+
+	def __exit__(self, *exc):
+		self.close()
+
+	def _meta(self, k: str):
+		row = self.db.execute("SELECT v FROM meta WHERE k = ?", (k,)).fetchone()
+		return row[0] if row else None
+
+	def _set_meta(self, **values) -> None:
+		self.db.executemany("INSERT OR REPLACE INTO meta (k, v) VALUES (?, ?)", values.items())
+
+	def rebuild_reason(self, headers: dict[Path, list[str]]) -> str | None:
+		"""Pourquoi la sortie doit être reconstruite entièrement (None : mise à jour possible)."""
+		rules = self._meta("rules")
+		if rules is None:
+			return "no previous state"
+		if rules != rules_hash():
+			return "cleaning rules changed"
+		if not self.output.exists() or self.output.stat().st_size != self._meta("output_size"):
+			return "output modified since the last run"
+		for path, header in headers.items():
+			row = self.db.execute("SELECT header FROM inputs WHERE path = ?", (str(path.resolve()),)).fetchone()
+			if row and json.loads(row[0]) != header:
+				return f"{path.name}: columns changed"
+		return None
+
+	def reset(self) -> None:
+		self.db.execute("DELETE FROM inputs")
+		self.db.execute("DELETE FROM rows")
+		cleaner.CsvSink(self.output).close()   # en-tête seul
+		self._set_meta(rules=rules_hash(), output_size=self.output.stat().st_size)
+		self.db.commit()
+
+	def update(self, path: Path, header: list[str], start: int, engine: str = "row") -> str:
+		"""Met la sortie à jour pour une entrée ; rend un résumé pour le log."""
+		stat = path.stat()
+		row = self.db.execute(
+			"SELECT id, size, mtime_ns, fingerprint FROM inputs WHERE path = ?", (str(path.resolve()),)
+		).fetchone()
+		if row is None:
+			source = self.db.execute(
+				"INSERT INTO inputs (path, header) VALUES (?, ?)", (str(path.resolve()), json.dumps(header))
+			).lastrowid
+			added = self._append(source, path, header, start, stat.st_size, engine)
+			summary = f"new (+{added})"
+			fingerprint = fingerprints(path, [stat.st_size])[0]
+		else:
+			source, size, mtime_ns, fingerprint = row
+			if size == stat.st_size and mtime_ns == stat.st_mtime_ns:
+				return "unchanged"
+			if stat.st_size >= size:
+				before, fingerprint = fingerprints(path, [size, stat.st_size])
+			else:
+				before, fingerprint = "", fingerprints(path, [stat.st_size])[0]
+			if before and before == row[3]:
+				# mêmes premiers octets : seules les lignes ajoutées depuis sont nouvelles
+				added = self._append(source, path, header, size, stat.st_size, "row")
+				summary = f"appended (+{added})" if added else "unchanged"
+			else:
+				summary = "rewritten (%s)" % self._diff(source, path, header, start, stat.st_size)
+		self.db.execute(
+			"UPDATE inputs SET size = ?, mtime_ns = ?, fingerprint = ? WHERE id = ?",
+			(stat.st_size, stat.st_mtime_ns, fingerprint, source),
+		)
+		return summary
+
+	def drop_missing(self, paths: list[Path]) -> list[str]:
+		"""Retire de la sortie les lignes des entrées suivies qui ne sont plus dans `paths`."""
+		keep = {str(path.resolve()) for path in paths}
+		gone = [(i, p) for i, p in self.db.execute("SELECT id, path FROM inputs") if p not in keep]
+		if not gone:
+			return []
+		deleted = set()
+		summaries = []
+		for source, p in gone:
+			lines = [line for (line,) in self.db.execute("SELECT line FROM rows WHERE source = ?", (source,))]
+			deleted.update(lines)
+			summaries.append(f"{Path(p).name}: removed (-{len(lines)})")
+		self._rewrite({}, deleted)
+		self.db.executemany("DELETE FROM inputs WHERE id = ?", ((source,) for source, _ in gone))
+		return summaries
+
+	def commit(self) -> None:
+		self._set_meta(output_size=self.output.stat().st_size)
+		self.db.commit()
+
+	def _record(self, source: int, chunks) -> int:
+		rows = 0
+		for keys in chunks:
+			self.db.executemany(
+				"INSERT INTO rows (source, sha, digest) VALUES (?, ?, ?)", ((source, k, d) for k, d in keys)
+			)
+			rows += len(keys)
+		self.written += rows
+		return rows
+
+	def _append(self, source: int, path: Path, header: list[str], start: int, end: int, engine: str) -> int:
+		sink = cleaner.CsvSink(self.output, append=True)
+		try:
+			if engine == "batch" and start == cleaner.read_header(path)[1]:
+				return self._record(source, _batch_chunks(path, sink))
+			return self._record(source, _row_chunks(iter_normalized(path, header, start, end), sink))
+		finally:
+			sink.close()
+
+	def _diff(self, source: int, path: Path, header: list[str], start: int, end: int) -> str:
+		"""Entrée réécrite : compare ses lignes normalisées, SHA par SHA, à celles déjà en sortie."""
+		known: dict[str, list[tuple[int, int]]] = {}
+		for line, sha, digest in self.db.execute(
+			"SELECT line, sha, digest FROM rows WHERE source = ? ORDER BY line", (source,)
+		):
+			known.setdefault(sha, []).append((line, digest))
+
+		replaced: dict[int, tuple[dict, int]] = {}
+		added = []
+		for row in iter_normalized(path, header, start, end):
+			digest = row_digest(row)
+			entries = known.get(row["sha"])
+			if not entries:
+				added.append(row)
+				continue
+			same = next((e for e in entries if e[1] == digest), None)
+			entry = same or entries[0]
+			entries.remove(entry)
+			if same is None:
+				# même SHA, ligne différente : remplacée à sa place
+				replaced[entry[0]] = (row, digest)
+		deleted = {line for entries in known.values() for line, _ in entries}
+
+		if replaced or deleted:
+			self._rewrite(replaced, deleted)
+		sink = cleaner.CsvSink(self.output, append=True)
+		try:
+			self._record(source, _row_chunks(added, sink))
+		finally:
+			sink.close()
+		return f"+{len(added)} ~{len(replaced)} -{len(deleted)}"
+
+	def _rewrite(self, replaced: dict[int, tuple[dict, int]], deleted: set[int]) -> None:
+		"""Recopie la sortie en remplaçant / retirant des lignes (rows suit l'ordre de la sortie)."""
+		tmp = self.output.with_name(self.output.name + ".tmp")
+		lines = self.db.execute("SELECT line FROM rows ORDER BY line")
+		with compression.open_text(self.output) as f_in, \
+				compression.open_text(tmp, "w", kind=compression.codec(self.output)) as f_out:
+			reader = csv.reader(f_in)
+			writer = csv.writer(f_out)
+			writer.writerow(next(reader))
+			for (line,), values in zip(lines, reader):
+				if line in deleted:
+					continue
+				if line in replaced:
+					row = replaced[line][0]
+					values = [row[name] for name in cleaner.OUTPUT_COLUMNS]
+				writer.writerow(values)
+		os.replace(tmp, self.output)
+		self.written += len(replaced)
+		self.db.executemany("DELETE FROM rows WHERE line = ?", ((line,) for line in deleted))
+		self.db.executemany(
+			"UPDATE rows SET digest = ? WHERE line = ?", ((digest, line) for line, (_, digest) in replaced.items())
+		)
+
+
+def merge_csv_incremental(inputs: list[Path], output: Path, engine: str = "row") -> int:
+	"""Met `output` à jour depuis `inputs` ; rend le nombre de lignes écrites ou remplacées."""
+	if cleaner.is_columnar_output(output) or partitions.is_partitioned(output):
+		raise ValueError(f"{output}: incremental cleaning writes .csv outputs")
+	present = [path for path in inputs if path.exists()]
+	headers = {path: cleaner.read_header(path) for path in present}
+
+	with CleanState(output) as state:
+		reason = state.rebuild_reason({path: header for path, (header, _) in headers.items()})
+		if reason:
+			print(f"Full rebuild: {reason}")
+			state.reset()
+		for path in present:
+			header, start = headers[path]
+			print(f"  {path.name}: {state.update(path, header, start, engine)}")
+		for summary in state.drop_missing(present):
+			print(f"  {summary}")
+		state.commit()
+		return state.written
@@ -1,14 +1,27 @@
 import argparse
 import csv
-import re
+import os
+import shutil
+import tempfile
 import unicodedata
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
 from pathlib import Path
 
+import compression
+import metrics
+import partitions
+
 
 DEFAULT_INPUTS = [
 	Path(__file__).resolve().parent.parent / "data" / "nftm_fork.csv",
 	Path(__file__).resolve().parent.parent / "data" / "differential_solver.csv",
 ]
+DEFAULT_OUTPUT = Path(__file__).resolve().parent.parent / "data" / "commits_history_cleaned.csv"
+# bundle du dashboard, reconstruit avec la sortie par défaut (cf. --cubes)
+DEFAULT_CUBES = Path(__file__).resolve().parent.parent / "data" / "commits_cubes.json"
+# extensions de columnar.FORMATS, reconnues sans importer columnar (pandas + pyarrow)
+COLUMNAR_SUFFIXES = (".parquet", ".arrows")
 
 OUTPUT_COLUMNS = [
 	"repo_full_name",
@@ -24,6 +37,18 @@ OUTPUT_COLUMNS = [
 	"nomenclature",
 ]
 
+# À incrémenter à chaque changement des règles de nettoyage qui ne passe pas par le
+# code des fonctions normalize_* (clean_state.py en tient déjà compte) : la sortie
+# incrémentale est alors reconstruite entièrement.
+RULES_VERSION = 1
+
+# Auteurs, branches, repos et messages types se répètent : on mémorise leur normalisation.
+NORMALIZE_CACHE_SIZE = 65536
+
+# Mode parallèle : chaque fichier est découpé en morceaux d'environ CHUNK_BYTES,
+# coupés uniquement entre deux enregistrements CSV.
+CHUNK_BYTES = 64 * 1024 * 1024
+
 ALLOWED_TYPES = {
 	"feat",
 	"fix",
@@ -41,32 +66,54 @@ ALLOWED_TYPES = {
 def split_message(msg: str | None):
 	if msg is None:
 		return None, None, None
-	msg = normalize_text(str(msg).strip())
+	return _split_normalized(normalize_text(str(msg).strip()))
+
+
+@lru_cache(maxsize=NORMALIZE_CACHE_SIZE)
+def _split_normalized(msg: str):
+	"""Découpe "type(argument): message" en un seul parcours (str.find, sans regex).
+
+	Reproduit exactement l'ancien couple re.match(r"^(.*?)\s*\(") / re.search(r"\((.*?)\)") :
+	`.` ne traverse pas les retours à la ligne, donc le type doit précéder la première
+	parenthèse de la première ligne, et l'argument est le premier "(...)" fermé sur sa ligne.
+	"""
 	if msg == "":
 		return None, None, None
 	before = None
 	between = None
 	after = msg
-	before_match = re.match(r"^(.*?)\s*\(", msg)
-	if before_match:
-		before = normalize_text(before_match.group(1).strip().lower())
-		between_match = re.search(r"\((.*?)\)", msg)
-		if between_match:
-			between = normalize_text(between_match.group(1).strip().lower())
-			after_start = between_match.end()
-			after_part = msg[after_start:].strip()
-			if ":" in after_part:
-				after = normalize_text(after_part.split(":", 1)[1].strip())
-			else:
-				after = normalize_text(after_part)
+	open_at = msg.find("(")
+	if open_at != -1:
+		head = msg[:open_at]
+		if "\n" not in head.rstrip():
+			before = normalize_text(head.strip().lower())
+			while open_at != -1:
+				close_at = msg.find(")", open_at + 1)
+				if close_at == -1:
+					break
+				if "\n" not in msg[open_at + 1:close_at]:
+					between = normalize_text(msg[open_at + 1:close_at].strip().lower())
+					after_part = msg[close_at + 1:].strip()
+					if ":" in after_part:
+						after = normalize_text(after_part.split(":", 1)[1].strip())
+					else:
+						after = normalize_text(after_part)
+					break
+				open_at = msg.find("(", open_at + 1)
 	if ":" in msg and after == msg:
 		after = normalize_text(msg.split(":", 1)[1].strip())
 	return before, between, after
 
 
 def normalize_text(value: str) -> str:
-	if value == "":
-		return ""
+	if value == "" or value.isascii():
+		# NFKD ne modifie pas l'ASCII (SHA, la plupart des branches et logins)
+		return value
+	return _normalize_unicode(value)
+
+
+@lru_cache(maxsize=NORMALIZE_CACHE_SIZE)
+def _normalize_unicode(value: str) -> str:
 	normalized = unicodedata.normalize("NFKD", value)
 	return "".join(ch for ch in normalized if not unicodedata.combining(ch))
 
@@ -83,49 +130,276 @@ def normalize_row(row: dict) -> dict:
 		if len(parts) > 1:
 			commit_hour = parts[1].split(":")[0]
 
-	message = row.get("message")
-	message_type = row.get("message_type")
-	message_argument = row.get("message_argument")
-	message_message = row.get("message_message")
-
-	if not (message_type or message_argument or message_message):
-		message_type, message_argument, message_message = split_message(message)
-
-	nomenclature = 0
-	if message_type and str(message_type).strip().lower() in ALLOWED_TYPES:
-		nomenclature = 1
+	message_type, message_argument, message_message, nomenclature = normalize_message(
+		row.get("message"),
+		row.get("message_type"),
+		row.get("message_argument"),
+		row.get("message_message"),
+	)
 
 	return {
 		"repo_full_name": normalize_text((row.get("repo_full_name") or "").strip()),
 		"sha": normalize_text((row.get("sha") or "").strip()),
 		"parent_shas": normalize_text((row.get("parent_shas") or "").strip()),
 		"branch": normalize_text((row.get("branch") or "").strip()),
-		"author_name": normalize_text((row.get("author_name") or "").strip()),
+		# sorties sans nom d'auteur (build_commits_graphql avant ses colonnes author_*) : login GitHub
+		"author_name": normalize_text((row.get("author_name") or row.get("author_login") or row.get("author") or "").strip()),
 		"commit_day": commit_day,
 		"commit_hour": commit_hour,
-		"message_type": normalize_text(message_type or ""),
-		"message_argument": normalize_text(message_argument or ""),
-		"message_message": normalize_text(message_message or ""),
+		"message_type": message_type,
+		"message_argument": message_argument,
+		"message_message": message_message,
 		"nomenclature": nomenclature,
 	}
 
 
-def merge_csv(inputs: list[Path], output: Path) -> int:
-	rows_written = 0
+def normalize_message(
+	message: str | None,
+	message_type: str | None,
+	message_argument: str | None,
+	message_message: str | None,
+) -> tuple[str, str, str, int]:
+	"""Colonnes message_* et nomenclature : reprises si déjà présentes, sinon tirées du message brut."""
+	if not (message_type or message_argument or message_message):
+		message_type, message_argument, message_message = split_message(message)
+
+	nomenclature = 0
+	if message_type and str(message_type).strip().lower() in ALLOWED_TYPES:
+		nomenclature = 1
+
+	return (
+		normalize_text(message_type or ""),
+		normalize_text(message_argument or ""),
+		normalize_text(message_message or ""),
+		nomenclature,
+	)
+
+
+def is_columnar_output(path) -> bool:
+	return Path(path).suffix.lower() in COLUMNAR_SUFFIXES
+
+
+class CsvSink:
+	def __init__(self, output: Path, append: bool = False):
+		# append : lignes ajoutées à une sortie existante (mode incrémental), sans en-tête
+		# .csv.gz / .csv.zst : compressé à la volée (un ajout écrit un nouveau membre / une nouvelle trame)
+		self.f_out = compression.open_text(output, "a" if append else "w")
+		self.writer = csv.DictWriter(self.f_out, fieldnames=OUTPUT_COLUMNS)
+		if not append:
+			self.writer.writeheader()
+
+	def write_row(self, row: dict) -> None:
+		self.writer.writerow(row)
+
+	def write_encoded(self, data) -> None:
+		# lignes CSV déjà formatées et encodées en UTF-8 (moteur batch)
+		self.f_out.flush()
+		self.f_out.buffer.write(data)
+
+	def write_part(self, part_path: str) -> None:
+		with open(part_path, "r", newline="", encoding="utf-8") as f_part:
+			shutil.copyfileobj(f_part, self.f_out)
+
+	def close(self) -> None:
+		self.f_out.close()
+
+
+class ColumnarSink:
+	"""Parquet / flux Arrow : columnar.py (pandas + pyarrow) n'est importé que pour ces sorties."""
+
+	def __init__(self, output: Path):
+		import columnar
+
+		self.writer = columnar.ColumnarWriter(output, OUTPUT_COLUMNS)
+
+	def write_row(self, row: dict) -> None:
+		self.writer.write_row(row)
+
+	def write_frame(self, df) -> None:
+		self.writer.write_frame(df)
+
+	def write_part(self, part_path: str) -> None:
+		with open(part_path, "r", newline="", encoding="utf-8") as f_part:
+			self.writer.write_rows(csv.DictReader(f_part, fieldnames=OUTPUT_COLUMNS))
+
+	def close(self) -> None:
+		self.writer.close()
+
+
+class PartitionSink(partitions.PartitionWriter):
+	"""Dossier partitionné repo=…/month=… (partitions.py), remplacé à la fermeture."""
+
+	def __init__(self, output: Path):
+		super().__init__(output, OUTPUT_COLUMNS)
+
+	def write_part(self, part_path: str) -> None:
+		with open(part_path, "r", newline="", encoding="utf-8") as f_part:
+			self.write_rows(csv.DictReader(f_part, fieldnames=OUTPUT_COLUMNS))
+
+	def write_frame(self, df) -> None:
+		self.write_rows(df.to_dict("records"))
+
+	def close(self) -> None:
+		self.commit(replace=True)
+
+
+def open_sink(output: Path):
+	"""CSV par défaut (.csv.gz / .csv.zst compressés) ; Parquet / flux Arrow selon l'extension
+	(.parquet, .arrows), dossier partitionné (cf. partitions.is_partitioned)."""
 	output.parent.mkdir(parents=True, exist_ok=True)
+	if is_columnar_output(output):
+		return ColumnarSink(output)
+	if partitions.is_partitioned(output):
+		return PartitionSink(output)
+	return CsvSink(output)
 
-	with output.open("w", newline="", encoding="utf-8") as f_out:
-		writer = csv.DictWriter(f_out, fieldnames=OUTPUT_COLUMNS)
-		writer.writeheader()
 
+def merge_csv(
+	inputs: list[Path],
+	output: Path,
+	workers: int = 1,
+	chunk_bytes: int = CHUNK_BYTES,
+	engine: str = "row",
+	incremental: bool = False,
+) -> int:
+	# jeux de données partitionnés en entrée : lus part par part
+	inputs = partitions.expand(inputs)
+	with metrics.METRICS.stage("clean"):
+		if incremental:
+			from clean_state import merge_csv_incremental
+
+			rows = merge_csv_incremental(inputs, output, engine=engine)
+		elif engine == "batch":
+			from clean_batch import merge_csv_batch
+
+			rows = merge_csv_batch(inputs, output)
+		elif workers > 1:
+			rows = merge_csv_parallel(inputs, output, workers, chunk_bytes)
+		else:
+			rows = merge_csv_sequential(inputs, output)
+	metrics.METRICS.add("rows_written", rows)
+	return rows
+
+
+def merge_csv_sequential(inputs: list[Path], output: Path) -> int:
+	rows_written = 0
+	sink = open_sink(output)
+	try:
 		for path in inputs:
 			if not path.exists():
 				continue
-			with path.open("r", newline="", encoding="utf-8-sig") as f_in:
+			with compression.open_text(path, encoding="utf-8-sig") as f_in:
 				reader = csv.DictReader(f_in)
 				for row in reader:
-					writer.writerow(normalize_row(row))
+					sink.write_row(normalize_row(row))
 					rows_written += 1
+	finally:
+		sink.close()
+
+	return rows_written
+
+
+def read_header(path: Path) -> tuple[list[str], int]:
+	"""Colonnes du CSV et position (en octets) du premier enregistrement.
+
+	Pour un CSV compressé, la position rendue est 0 : l'en-tête est relu dans le flux.
+	"""
+	with compression.open_binary(path) as f:
+		first = f.readline()
+	header = next(csv.reader([first.decode("utf-8-sig")]), [])
+	return header, 0 if compression.codec(path) else len(first)
+
+
+def record_boundaries(path: Path, start: int, chunk_bytes: int) -> list[int]:
+	"""Offsets de découpe d'environ `chunk_bytes`, toujours en fin d'enregistrement.
+
+	Un message de commit peut contenir des retours à la ligne entre guillemets :
+	on suit la parité des guillemets pour ne couper qu'en dehors d'un champ
+	(un guillemet échappé "" ne change pas la parité). Lecture en streaming.
+	"""
+	size = path.stat().st_size
+	bounds = [start]
+	target = start + chunk_bytes
+	in_quotes = False
+	pos = start
+	with path.open("rb") as f:
+		f.seek(start)
+		for line in f:
+			pos += len(line)
+			if line.count(b'"') % 2:
+				in_quotes = not in_quotes
+			if not in_quotes and pos >= target and pos < size:
+				bounds.append(pos)
+				target = pos + chunk_bytes
+	bounds.append(size)
+	return bounds
+
+
+def iter_lines(path: Path, start: int, end: int):
+	"""Lignes des octets [start, end) ; offsets compressés (début de membre / trame) pour un .gz / .zst."""
+	if compression.codec(path):
+		with compression.open_text(path, encoding="utf-8" if start else "utf-8-sig", start=start, end=end) as f:
+			yield from f
+		return
+	with path.open("rb") as f:
+		f.seek(start)
+		pos = start
+		while pos < end:
+			line = f.readline()
+			if not line:
+				break
+			pos += len(line)
+			yield line.decode("utf-8")
+
+
+def _normalize_chunk(task: tuple[str, list[str], int, int, str]) -> int:
+	path, header, start, end, part_path = task
+	rows = 0
+	with open(part_path, "w", newline="", encoding="utf-8") as f_out:
+		writer = csv.DictWriter(f_out, fieldnames=OUTPUT_COLUMNS)
+		# start = 0 : CSV compressé lu depuis le début, en-tête compris
+		for row in csv.DictReader(iter_lines(Path(path), start, end), fieldnames=header if start else None):
+			writer.writerow(normalize_row(row))
+			rows += 1
+	return rows
+
+
+def merge_csv_parallel(inputs: list[Path], output: Path, workers: int, chunk_bytes: int = CHUNK_BYTES) -> int:
+	"""Même sortie que merge_csv, normalisée par morceaux dans un pool de processus.
+
+	Chaque worker écrit son morceau dans un fichier temporaire ; les morceaux sont
+	recopiés dans l'ordre (fichier d'entrée puis offset), donc la sortie est identique
+	au mode séquentiel et la mémoire ne dépend pas de la taille des fichiers.
+	"""
+	rows_written = 0
+	output.parent.mkdir(parents=True, exist_ok=True)
+
+	with tempfile.TemporaryDirectory(dir=output.parent, prefix=".merge_") as tmp_dir:
+		tasks = []
+		for path in inputs:
+			if not path.exists():
+				continue
+			header, start = read_header(path)
+			if compression.codec(path):
+				# un flux compressé ne se découpe pas à un offset quelconque : un morceau par fichier
+				bounds = [start, path.stat().st_size]
+			else:
+				bounds = record_boundaries(path, start, chunk_bytes)
+			for a, b in zip(bounds, bounds[1:]):
+				part_path = os.path.join(tmp_dir, f"part-{len(tasks):06d}.csv")
+				tasks.append((str(path), header, a, b, part_path))
+
+		sink = open_sink(output)
+		try:
+			with ProcessPoolExecutor(max_workers=workers) as pool:
+				# map() rend les résultats dans l'ordre des tâches
+				for task, rows in zip(tasks, pool.map(_normalize_chunk, tasks)):
+					part_path = task[4]
+					sink.write_part(part_path)
+					os.remove(part_path)
+					rows_written += rows
+		finally:
+			sink.close()
 
 	return rows_written
 
@@ -135,19 +409,84 @@ def main() -> None:
 	parser.add_argument(
 		"inputs",
 		nargs="*",
-		help="Input CSV files. If omitted, default datasets are used.",
+		help="Input CSV files (.csv, .csv.gz, .csv.zst) or partitioned datasets. If omitted, default datasets are used.",
 	)
 	parser.add_argument(
 		"-o",
 		"--output",
-		default=str(Path(__file__).resolve().parent.parent / "data" / "commits_history_cleaned.csv"),
-		help="Output CSV file path.",
+		default=str(DEFAULT_OUTPUT),
+		help="Output file path (.csv, .csv.gz / .csv.zst compressed, .parquet / .arrows for typed columnar output, "
+		"or a directory ending with '/' for a repo=/month= partitioned dataset).",
+	)
+	parser.add_argument(
+		"-j",
+		"--workers",
+		type=int,
+		default=1,
+		help="Worker processes for the parallel mode (default: 1, sequential).",
+	)
+	parser.add_argument(
+		"--chunk-mb",
+		type=int,
+		default=CHUNK_BYTES // (1024 * 1024),
+		help="Approximate chunk size in MB for the parallel mode.",
+	)
+	parser.add_argument(
+		"--engine",
+		choices=["row", "batch"],
+		default="row",
+		help="'row': normalize_row on each record (default); 'batch': column-wise pyarrow kernels, same output.",
+	)
+	parser.add_argument(
+		"--incremental",
+		action="store_true",
+		help="Only clean rows added or changed since the last run (state in <output>.clean.sqlite, CSV output).",
+	)
+	parser.add_argument(
+		"--db",
+		help="Also rebuild this commit_db.py SQLite database from the cleaned output.",
+	)
+	parser.add_argument(
+		"--cubes",
+		help="Also rebuild this dashboard_cubes.py JSON bundle "
+		"(default: data/commits_cubes.json when writing the default output).",
 	)
+	metrics.add_arguments(parser)
 	args = parser.parse_args()
 
+	try:
+		# "dossier/" : jeu de données créé ici, Path() perdant le "/" final
+		if partitions.is_partitioned(args.output):
+			partitions.init_dataset(args.output)
+	except ValueError as exc:
+		parser.error(str(exc))
+
+	metrics.start(args)
 	input_paths = [Path(p) for p in args.inputs] if args.inputs else DEFAULT_INPUTS
-	rows = merge_csv(input_paths, Path(args.output))
+	try:
+		rows = merge_csv(
+			input_paths,
+			Path(args.output),
+			workers=args.workers,
+			chunk_bytes=args.chunk_mb * 1024 * 1024,
+			engine=args.engine,
+			incremental=args.incremental,
+		)
+	finally:
+		metrics.finish(args)
 	print(f"Merged {rows} rows into {args.output}")
+	if args.db:
+		from commit_db import CommitDB
+
+		with CommitDB(args.db) as db:
+			db.load(Path(args.output), replace=True)
+			print(f"Loaded {len(db)} rows into {args.db}")
+	cubes = args.cubes or (DEFAULT_CUBES if Path(args.output).resolve() == DEFAULT_OUTPUT else None)
+	if cubes:
+		from dashboard_cubes import write_cubes
+
+		bundle = write_cubes(Path(args.output), Path(cubes))
+		print(f"Aggregated {bundle['rows']} rows into {cubes}")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,152 @@
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional
+
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except Exception:
+    pa = None
+    pq = None
+
+# Sortie colonnaire (Parquet / flux Arrow IPC) avec un schéma typé et compact :
+# chaînes très répétées encodées en dictionnaire, heure en int8, jour en date32…
+# Choisie d'après l'extension du fichier de sortie ; nécessite pyarrow.
+
+FORMATS = {
+    ".parquet": "parquet",
+    ".arrows": "arrow",   # Arrow IPC, format "stream" (dictionnaires remplaçables entre lots)
+}
+
+BATCH_ROWS = 65536
+
+DICTIONARY_COLUMNS = {"repo_full_name", "branch", "author_name", "message_type", "repo_language"}
+TIMESTAMP_COLUMNS = {"author_date", "committer_date", "commit_date"}
+INT8_COLUMNS = {"commit_hour", "nomenclature"}
+BOOL_COLUMNS = {"is_merge", "repo_private"}
+INT_COLUMNS = {"repo_stars", "repo_forks"}
+
+
+def output_format(path) -> Optional[str]:
+    return FORMATS.get(Path(path).suffix.lower())
+
+
+def is_columnar(path) -> bool:
+    return output_format(path) is not None
+
+
+def require_pyarrow() -> None:
+    if pa is None:
+        raise RuntimeError("Parquet/Arrow output needs pyarrow (pip install pyarrow).")
+
+
+def column_type(name: str):
+    if name in DICTIONARY_COLUMNS:
+        return pa.dictionary(pa.int32(), pa.string())
+    if name in TIMESTAMP_COLUMNS:
+        return pa.timestamp("us", tz="UTC")
+    if name == "commit_day":
+        return pa.date32()
+    if name in INT8_COLUMNS:
+        return pa.int8()
+    if name in BOOL_COLUMNS:
+        return pa.bool_()
+    if name in INT_COLUMNS:
+        return pa.int64()
+    return pa.string()
+
+
+def commit_schema(columns: List[str]):
+    require_pyarrow()
+    return pa.schema([pa.field(name, column_type(name)) for name in columns])
+
+
+def _as_bool(series: pd.Series) -> pd.Series:
+    mapped = series.map(lambda v: v if v is None or isinstance(v, bool)
+                        else str(v).strip().lower() in ("true", "1"))
+    return mapped.astype(pd.BooleanDtype())
+
+
+def frame_to_table(df: pd.DataFrame, columns: Optional[List[str]] = None):
+    """Convertit un DataFrame (valeurs texte du CSV ou déjà typées) vers le schéma typé."""
+    require_pyarrow()
+    columns = columns or list(df.columns)
+    df = df.reindex(columns=columns)
+    arrays = []
+    for name in columns:
+        col = df[name].astype(object)
+        col = col.where(col.notna() & (col != ""), None)   # champ CSV vide => null
+        if name in TIMESTAMP_COLUMNS:
+            col = pd.to_datetime(col, utc=True, errors="coerce", format="mixed")
+        elif name == "commit_day":
+            col = pd.to_datetime(col, errors="coerce", format="mixed").dt.date
+        elif name in INT8_COLUMNS:
+            col = pd.to_numeric(col, errors="coerce").astype(pd.Int8Dtype())
+        elif name in INT_COLUMNS:
+            col = pd.to_numeric(col, errors="coerce").astype(pd.Int64Dtype())
+        elif name in BOOL_COLUMNS:
+            col = _as_bool(col)
+        else:
+            col = col.map(lambda v: v if v is None else str(v))
+        arrays.append(pa.array(col, type=column_type(name), from_pandas=True))
+    return pa.Table.from_arrays(arrays, schema=commit_schema(columns))
+
+
+class ColumnarWriter:
+    """Écriture en streaming par lots de `batch_rows` lignes (mémoire bornée par un lot)."""
+
+    def __init__(self, path, columns: List[str], batch_rows: int = BATCH_ROWS):
+        require_pyarrow()
+        self.path = Path(path)
+        self.format = output_format(path)
+        self.columns = columns
+        self.batch_rows = batch_rows
+        self.rows: List[Dict[str, Any]] = []
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        schema = commit_schema(columns)
+        if self.format == "parquet":
+            self._writer = pq.ParquetWriter(str(self.path), schema)
+        else:
+            options = pa.ipc.IpcWriteOptions(emit_dictionary_deltas=True)
+            self._writer = pa.ipc.new_stream(str(self.path), schema, options=options)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def write_row(self, row: Dict[str, Any]) -> None:
+        self.rows.append(row)
+        if len(self.rows) >= self.batch_rows:
+            self.flush()
+
+    def write_rows(self, rows: Iterable[Dict[str, Any]]) -> None:
+        for row in rows:
+            self.write_row(row)
+
+    def write_frame(self, df: pd.DataFrame) -> None:
+        self.flush()
+        if len(df):
+            self._writer.write_table(frame_to_table(df, self.columns))
+
+    def flush(self) -> None:
+        if self.rows:
+            table = frame_to_table(pd.DataFrame(self.rows, columns=self.columns, dtype=object), self.columns)
+            self._writer.write_table(table)
+            self.rows = []
+
+    def close(self) -> None:
+        self.flush()
+        self._writer.close()
+
+
+def read_table(path, columns: Optional[List[str]] = None):
+    """Relit un fichier (ou dossier de parts) Parquet / un flux Arrow en pyarrow.Table."""
+    require_pyarrow()
+    if output_format(path) == "arrow":
+        with pa.ipc.open_stream(str(path)) as reader:
+            table = reader.read_all()
+        return table.select(columns) if columns else table
+    return pq.read_table(str(path), columns=columns)
@@ -0,0 +1,119 @@
+from typing import TYPE_CHECKING, List, Dict, Any
+
+from metrics import METRICS
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+# Parsing des réponses REST /commits.
+#
+# `commits_frame` aplatit une page entière en colonnes puis fait une seule
+# conversion de dates vectorisée. L'ancien parsing ligne par ligne (un
+# pd.to_datetime par commit) ne sert plus que de référence à
+# benchmarks/bench_parse_commit.py.
+# pandas n'est importé qu'au premier appel : importer les scrapers reste rapide.
+
+# Colonnes produites pour un repo/branche (scrap_git_project, scrap_github)
+BRANCH_COLUMNS = [
+    "repo_full_name",
+    "branch",
+    "sha",
+    "html_url",
+    "message",
+    "author_login",
+    "author_name",
+    "author_email",
+    "committer_login",
+    "committer_name",
+    "committer_email",
+    "author_date",
+    "committer_date",
+    "commit_date",
+    "commit_day",
+    "commit_hour",
+    "is_merge",
+]
+
+RAW_COLUMNS = [
+    "sha",
+    "html_url",
+    "message",
+    "author_login",
+    "author_name",
+    "author_email",
+    "committer_login",
+    "committer_name",
+    "committer_email",
+    "author_date",
+    "committer_date",
+    "commit_date",
+    "commit_day",
+    "is_merge",
+]
+
+
+def flatten_commits(commits: List[Dict[str, Any]]) -> Dict[str, List[Any]]:
+    """Une passe sur le JSON brut -> une liste Python par colonne (pas de pandas par ligne)."""
+    cols: Dict[str, List[Any]] = {name: [] for name in RAW_COLUMNS}
+    for row in commits:
+        commit = row.get("commit") or {}
+        author_user = row.get("author") or {}
+        committer_user = row.get("committer") or {}
+        author_block = commit.get("author") or {}
+        committer_block = commit.get("committer") or {}
+        author_date = author_block.get("date")
+        committer_date = committer_block.get("date")
+        commit_date = author_date or committer_date
+
+        cols["sha"].append(row.get("sha"))
+        cols["html_url"].append(row.get("html_url"))
+        cols["message"].append(commit.get("message"))
+        cols["author_login"].append(author_user.get("login"))
+        cols["author_name"].append(author_block.get("name"))
+        cols["author_email"].append(author_block.get("email"))
+        cols["committer_login"].append(committer_user.get("login"))
+        cols["committer_name"].append(committer_block.get("name"))
+        cols["committer_email"].append(committer_block.get("email"))
+        cols["author_date"].append(author_date)
+        cols["committer_date"].append(committer_date)
+        cols["commit_date"].append(commit_date)
+        cols["commit_day"].append(commit_date.split("T")[0] if commit_date else None)
+        cols["is_merge"].append(len(row.get("parents") or []) > 1)
+    return cols
+
+
+def commits_frame(commits: List[Dict[str, Any]], columns: List[str] = BRANCH_COLUMNS,
+                  **constants: Any) -> "pd.DataFrame":
+    """Équivalent vectorisé de `pd.DataFrame([parse_commit(c, ...) for c in commits])` (benchmarks/bench_parse_commit.py).
+
+    `constants` remplit les colonnes communes à toute la page (repo_full_name, branch,
+    métadonnées du repo…) ; `columns` fixe l'ordre des colonnes du résultat.
+    """
+    with METRICS.stage("parse"):
+        df = _commits_frame(commits, columns, constants)
+    METRICS.add("rows_parsed", len(df))
+    return df
+
+
+def _commits_frame(commits: List[Dict[str, Any]], columns: List[str], constants: Dict[str, Any]) -> "pd.DataFrame":
+    import pandas as pd
+
+    cols = flatten_commits(commits)
+    n = len(commits)
+
+    # une seule conversion de dates pour toute la page
+    dt = pd.to_datetime(pd.Series(cols["commit_date"], dtype=object),
+                        utc=True, errors="coerce", format="ISO8601")
+    hours = dt.dt.hour.astype(pd.Int64Dtype())
+
+    data: Dict[str, Any] = {}
+    for name in columns:
+        if name == "commit_hour":
+            data[name] = hours.array
+        elif name == "is_merge":
+            data[name] = pd.array(cols[name], dtype=bool)
+        elif name in constants:
+            data[name] = pd.array([constants[name]] * n, dtype=object)
+        else:
+            data[name] = pd.array(cols.get(name, [None] * n), dtype=object)
+    return pd.DataFrame(data, columns=columns)
@@ -0,0 +1,365 @@
+import argparse
+import json
+import sqlite3
+import sys
+from datetime import date
+from pathlib import Path
+from typing import Any, Iterable
+
+import cleaner
+import partitions
+
+# Base SQLite des commits nettoyés, pour interroger les données sans relire le CSV.
+#
+# Table `commits` : colonnes de cleaner.OUTPUT_COLUMNS (+ weekday, lundi = 0 comme
+# weekdayIndexUTC côté JS), indexée sur (author_name, commit_day),
+# (repo_full_name, commit_day) et (sha, repo_full_name) — unique : réinsérer une
+# ligne déjà connue ne fait rien.
+# Deux agrégats tenus à jour par trigger à chaque insertion :
+#   - rollup_day  : commits et commits "nomenclature" par auteur, repo et jour ;
+#   - rollup_hour : commits par auteur, repo, jour de semaine et heure.
+# Les rollups (heatmap, repos, nomenclature, per-day) lisent ces agrégats : quelques
+# milliers de lignes au lieu de millions de commits. Avec --since/--until, la heatmap
+# repasse par `commits` (index auteur/repo + jour).
+#
+# Alimentée par cleaner.py (--db, reconstruction complète) et par les scrapers
+# (--db, nouvelles lignes normalisées au fil des appends du CommitStore).
+# `load --repo/--since/--until` ne recharge qu'un sous-ensemble : avec un dossier
+# partitionné (partitions.py), seules les partitions concernées sont relues.
+
+DEFAULT_DB = Path(__file__).resolve().parent.parent / "data" / "commits.sqlite"
+DEFAULT_INPUT = Path(__file__).resolve().parent.parent / "data" / "commits_history_cleaned.csv"
+BATCH_ROWS = 50_000
+
+COLUMNS = cleaner.OUTPUT_COLUMNS + ["weekday"]
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS commits (
+	repo_full_name TEXT NOT NULL,
+	sha TEXT,
+	parent_shas TEXT,
+	branch TEXT,
+	author_name TEXT NOT NULL,
+	commit_day TEXT NOT NULL,
+	commit_hour INTEGER,
+	message_type TEXT,
+	message_argument TEXT,
+	message_message TEXT,
+	nomenclature INTEGER NOT NULL,
+	weekday INTEGER
+);
+CREATE INDEX IF NOT EXISTS commits_author_day ON commits (author_name, commit_day);
+CREATE INDEX IF NOT EXISTS commits_repo_day ON commits (repo_full_name, commit_day);
+CREATE UNIQUE INDEX IF NOT EXISTS commits_sha ON commits (sha, repo_full_name);
+
+CREATE TABLE IF NOT EXISTS rollup_day (
+	author_name TEXT NOT NULL,
+	repo_full_name TEXT NOT NULL,
+	commit_day TEXT NOT NULL,
+	commits INTEGER NOT NULL,
+	nomenclature_ok INTEGER NOT NULL,
+	PRIMARY KEY (author_name, repo_full_name, commit_day)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS rollup_hour (
+	author_name TEXT NOT NULL,
+	repo_full_name TEXT NOT NULL,
+	weekday INTEGER NOT NULL,
+	commit_hour INTEGER NOT NULL,
+	commits INTEGER NOT NULL,
+	PRIMARY KEY (author_name, repo_full_name, weekday, commit_hour)
+) WITHOUT ROWID;
+
+"""
+
+# trigger à part : retiré pendant une reconstruction complète, les rollups sont alors
+# recalculés en une passe (GROUP BY) plutôt que ligne à ligne
+TRIGGER = """
+CREATE TRIGGER IF NOT EXISTS commits_rollup AFTER INSERT ON commits BEGIN
+	INSERT INTO rollup_day VALUES (NEW.author_name, NEW.repo_full_name, NEW.commit_day, 1, NEW.nomenclature)
+		ON CONFLICT DO UPDATE SET commits = commits + 1, nomenclature_ok = nomenclature_ok + excluded.nomenclature_ok;
+	INSERT INTO rollup_hour
+		SELECT NEW.author_name, NEW.repo_full_name, NEW.weekday, NEW.commit_hour, 1
+		WHERE NEW.weekday IS NOT NULL AND NEW.commit_hour IS NOT NULL
+		ON CONFLICT DO UPDATE SET commits = commits + 1;
+END;
+"""
+
+
+def _hour(value: Any) -> int | None:
+	try:
+		hour = int(float(str(value).strip()))
+	except (ValueError, OverflowError):
+		return None
+	return hour if 0 <= hour <= 23 else None
+
+
+class CommitDB:
+	def __init__(self, path: str | Path = DEFAULT_DB):
+		self.path = Path(path)
+		self.path.parent.mkdir(parents=True, exist_ok=True)
+		self.db = sqlite3.connect(self.path)
+		self.db.execute("PRAGMA journal_mode = WAL")
+		self.db.execute("PRAGMA synchronous = NORMAL")
+		self.db.executescript(SCHEMA + TRIGGER)
+		self._weekdays: dict[str, int | None] = {}
+
+	def close(self) -> None:
+		self.db.close()
+
+	def __enter__(self):
+		return self
+
+	def __exit__(self, *exc):
+		self.close()
+
+	def __len__(self) -> int:
+		return self.db.execute("SELECT coalesce(sum(commits), 0) FROM rollup_day").fetchone()[0]
+
+	def _weekday(self, day: str) -> int | None:
+		if day not in self._weekdays:
+			try:
+				self._weekdays[day] = date.fromisoformat(day).weekday()
+			except ValueError:
+				self._weekdays[day] = None
+		return self._weekdays[day]
+
+	def _record(self, row: dict) -> tuple:
+		day = row.get("commit_day") or ""
+		if isinstance(day, date):
+			day = day.isoformat()
+		return (
+			row.get("repo_full_name") or "",
+			row.get("sha") or None,   # NULL : pas de contrainte d'unicité sans SHA
+			row.get("parent_shas") or "",
+			row.get("branch") or "",
+			row.get("author_name") or "",
+			day,
+			_hour(row.get("commit_hour")),
+			row.get("message_type") or "",
+			row.get("message_argument") or "",
+			row.get("message_message") or "",
+			1 if str(row.get("nomenclature")) == "1" else 0,
+			self._weekday(day),
+		)
+
+	def insert(self, rows: Iterable[dict]) -> int:
+		"""Ajoute des lignes au format nettoyé ; retourne le nombre de lignes nouvelles."""
+		sql = f"INSERT OR IGNORE INTO commits ({', '.join(COLUMNS)}) VALUES ({', '.join('?' * len(COLUMNS))})"
+		added = 0
+		batch: list[tuple] = []
+		with self.db:
+			for row in rows:
+				batch.append(self._record(row))
+				if len(batch) >= BATCH_ROWS:
+					added += self.db.executemany(sql, batch).rowcount
+					batch = []
+			if batch:
+				added += self.db.executemany(sql, batch).rowcount
+		return added
+
+	def insert_raw(self, rows: Iterable[dict]) -> int:
+		"""Lignes brutes des scrapers : normalisées comme dans merge_csv avant insertion."""
+		return self.insert(cleaner.normalize_row(row) for row in rows)
+
+	def insert_frame(self, df) -> int:
+		# valeurs du CommitStore (dates, Int64, NA) remises sous forme de texte, comme dans le CSV
+		import pandas as pd
+
+		columns = list(df.columns)
+		records = (
+			{k: ("" if pd.isna(v) else v.isoformat() if isinstance(v, date) else str(v))
+			 for k, v in zip(columns, values)}
+			for values in df.astype(object).itertuples(index=False, name=None)
+		)
+		return self.insert_raw(records)
+
+	def clear(self) -> None:
+		with self.db:
+			for table in ("commits", "rollup_day", "rollup_hour"):
+				self.db.execute(f"DELETE FROM {table}")
+
+	def load(self, path: Path, replace: bool = True, repos: list[str] | None = None,
+			since: str | None = None, until: str | None = None) -> int:
+		"""Charge un fichier nettoyé (CSV, Parquet, Arrow, dossier partitionné) ; `replace` vide d'abord la base.
+
+		Avec repos / since / until, seules ces lignes sont lues (partitions élaguées) et,
+		avec `replace`, seul ce sous-ensemble de la base est remplacé.
+		"""
+		from dashboard_cubes import iter_rows
+
+		if not replace:
+			added = self.insert(iter_rows(path, repos, since, until))
+		elif repos or since or until:
+			added = self._reload(iter_rows(path, repos, since, until), repos, since, until)
+		else:
+			self.clear()
+			self.db.executescript("""
+				DROP TRIGGER commits_rollup;
+				DROP INDEX commits_author_day;
+				DROP INDEX commits_repo_day;
+			""")
+			try:
+				added = self.insert(iter_rows(path))
+				with self.db:
+					self.db.execute(
+						"INSERT INTO rollup_day SELECT author_name, repo_full_name, commit_day, count(*), sum(nomenclature)"
+						" FROM commits GROUP BY author_name, repo_full_name, commit_day")
+					self.db.execute(
+						"INSERT INTO rollup_hour SELECT author_name, repo_full_name, weekday, commit_hour, count(*)"
+						" FROM commits WHERE weekday IS NOT NULL AND commit_hour IS NOT NULL"
+						" GROUP BY author_name, repo_full_name, weekday, commit_hour")
+			finally:
+				self.db.executescript(SCHEMA + TRIGGER)
+		self.db.execute("ANALYZE")
+		return added
+
+	def _reload(self, rows: Iterable[dict], repos: list[str] | None, since: str | None, until: str | None) -> int:
+		first, last = partitions.day_bounds(since, until)
+		clauses, params = [], []
+		if repos:
+			clauses.append(f"repo_full_name IN ({', '.join('?' * len(repos))})")
+			params += repos
+		for clause, value in (("commit_day >= ?", first), ("commit_day <= ?", last)):
+			if value:
+				clauses.append(clause)
+				params.append(value)
+		where = " WHERE " + " AND ".join(clauses)
+		with self.db:
+			self.db.execute(f"DELETE FROM commits{where}", params)
+			self.db.execute(f"DELETE FROM rollup_day{where}", params)
+		# rollup_day du sous-ensemble refait par le trigger ligne à ligne
+		added = self.insert(rows)
+		# rollup_hour n'a pas de jour : recalculé pour les repos concernés
+		scope = f"repo_full_name IN ({', '.join('?' * len(repos))})" if repos else "1"
+		with self.db:
+			self.db.execute(f"DELETE FROM rollup_hour WHERE {scope}", repos or [])
+			self.db.execute(
+				"INSERT INTO rollup_hour SELECT author_name, repo_full_name, weekday, commit_hour, count(*)"
+				f" FROM commits WHERE {scope} AND weekday IS NOT NULL AND commit_hour IS NOT NULL"
+				" GROUP BY author_name, repo_full_name, weekday, commit_hour", repos or [])
+		return added
+
+	# --- rollups ---
+
+	@staticmethod
+	def _where(author: str | None = None, repo: str | None = None,
+			since: str | None = None, until: str | None = None) -> tuple[str, list]:
+		clauses, params = [], []
+		for clause, value in (("author_name = ?", author), ("repo_full_name = ?", repo),
+				("commit_day >= ?", since), ("commit_day <= ?", until)):
+			if value:
+				clauses.append(clause)
+				params.append(value)
+		return (" WHERE " + " AND ".join(clauses) if clauses else ""), params
+
+	def heatmap(self, author: str | None = None, repo: str | None = None,
+			since: str | None = None, until: str | None = None) -> list[list[int]]:
+		"""Matrice 7x24 (lundi = ligne 0) du nombre de commits."""
+		if since or until:
+			where, params = self._where(author, repo, since, until)
+			sql = (f"SELECT weekday, commit_hour, count(*) FROM commits{where}"
+				f"{' AND' if where else ' WHERE'} weekday IS NOT NULL AND commit_hour IS NOT NULL"
+				" GROUP BY weekday, commit_hour")
+		else:
+			where, params = self._where(author, repo)
+			sql = f"SELECT weekday, commit_hour, sum(commits) FROM rollup_hour{where} GROUP BY weekday, commit_hour"
+		matrix = [[0] * 24 for _ in range(7)]
+		for weekday, hour, n in self.db.execute(sql, params):
+			matrix[weekday][hour] = n
+		return matrix
+
+	def repo_counts(self, author: str | None = None, since: str | None = None,
+			until: str | None = None) -> list[tuple[str, int]]:
+		where, params = self._where(author, None, since, until)
+		return self.db.execute(
+			f"SELECT repo_full_name, sum(commits) AS n FROM rollup_day{where}"
+			" GROUP BY repo_full_name ORDER BY n DESC, repo_full_name", params).fetchall()
+
+	def nomenclature(self, by: str = "author", author: str | None = None, repo: str | None = None,
+			since: str | None = None, until: str | None = None) -> list[tuple[str, int, int, float]]:
+		"""(clé, commits, commits conformes, taux) par auteur ou par repo."""
+		key = {"author": "author_name", "repo": "repo_full_name"}[by]
+		where, params = self._where(author, repo, since, until)
+		return self.db.execute(
+			f"SELECT {key}, sum(commits) AS n, sum(nomenclature_ok), round(1.0 * sum(nomenclature_ok) / sum(commits), 4)"
+			f" FROM rollup_day{where} GROUP BY {key} ORDER BY n DESC, {key}", params).fetchall()
+
+	def per_day(self, author: str | None = None, repo: str | None = None,
+			since: str | None = None, until: str | None = None) -> list[tuple[str, int]]:
+		where, params = self._where(author, repo, since, until)
+		return self.db.execute(
+			f"SELECT commit_day, sum(commits) FROM rollup_day{where} GROUP BY commit_day ORDER BY commit_day",
+			params).fetchall()
+
+
+def _print_table(header: list[str], rows: list) -> None:
+	rows = [[str(v) for v in row] for row in rows]
+	widths = [max([len(h)] + [len(r[i]) for r in rows]) for i, h in enumerate(header)]
+	print("  ".join(h.ljust(w) for h, w in zip(header, widths)))
+	for row in rows:
+		print("  ".join(v.ljust(w) for v, w in zip(row, widths)))
+
+
+def main() -> None:
+	parser = argparse.ArgumentParser(description="Embedded commit database and common rollups.")
+	parser.add_argument("--db", default=str(DEFAULT_DB), help="SQLite database (default: data/commits.sqlite).")
+	parser.add_argument("--json", action="store_true", help="Print the result as JSON.")
+	sub = parser.add_subparsers(dest="command", required=True)
+
+	p = sub.add_parser("load", help="(Re)build the database from a cleaned file.")
+	p.add_argument("input", nargs="?", default=str(DEFAULT_INPUT),
+		help="Output of cleaner.py (.csv, .parquet, .arrows or partitioned directory).")
+	p.add_argument("--append", action="store_true", help="Keep the existing rows (duplicates are ignored).")
+	p.add_argument("--repo", action="append", help="Only (re)load this repo_full_name (repeatable).")
+	p.add_argument("--since", help="Only (re)load from this commit_day (YYYY-MM-DD or YYYY-MM).")
+	p.add_argument("--until", help="Only (re)load up to this commit_day (YYYY-MM-DD or YYYY-MM).")
+
+	for name, help_text in [
+		("heatmap", "Commits per weekday (Monday first) and hour."),
+		("repos", "Commits per repository."),
+		("nomenclature", "Share of conventional 'type(scope): message' commits."),
+		("per-day", "Commits per day."),
+	]:
+		p = sub.add_parser(name, help=help_text)
+		p.add_argument("--author", help="Only this author_name.")
+		if name != "repos":
+			p.add_argument("--repo", help="Only this repo_full_name.")
+		p.add_argument("--since", help="First commit_day (YYYY-MM-DD).")
+		p.add_argument("--until", help="Last commit_day (YYYY-MM-DD).")
+		if name == "nomenclature":
+			p.add_argument("--by", choices=["author", "repo"], default="author")
+	args = parser.parse_args()
+
+	with CommitDB(args.db) as db:
+		if args.command == "load":
+			added = db.load(Path(args.input), replace=not args.append, repos=args.repo,
+				since=args.since, until=args.until)
+			print(f"Loaded {added} rows from {args.input} into {args.db} ({len(db)} rows)")
+			return
+		filters = {"author": args.author, "since": args.since, "until": args.until}
+		if args.command != "repos":
+			filters["repo"] = args.repo
+		if args.command == "heatmap":
+			result = db.heatmap(**filters)
+			header = ["day"] + [str(h) for h in range(24)]
+			rows = [[d] + counts for d, counts in zip(["Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun"], result)]
+		elif args.command == "repos":
+			result = rows = db.repo_counts(**filters)
+			header = ["repo_full_name", "commits"]
+		elif args.command == "nomenclature":
+			result = rows = db.nomenclature(by=args.by, **filters)
+			header = [args.by, "commits", "conventional", "rate"]
+		else:
+			result = rows = db.per_day(**filters)
+			header = ["commit_day", "commits"]
+
+	if args.json:
+		json.dump(result, sys.stdout)
+		print()
+	else:
+		_print_table(header, rows)
+
+
+if __name__ == "__main__":
+	main()
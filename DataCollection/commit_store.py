@@ -0,0 +1,517 @@
+import argparse
+import csv
+import glob
+import os
+import shutil
+import sqlite3
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+import pandas as pd
+
+import columnar
+import compression
+import partitions
+from metrics import METRICS
+
+# Stockage "append-only" des fichiers de commits.
+#
+# À côté de chaque sortie on garde un index SQLite (<sortie>.idx.sqlite) avec :
+#   - la table `seen` : les SHA déjà présents,
+#   - la table `meta` : nombre de lignes et taille des données au dernier append.
+# Un append ne relit donc plus la sortie : on filtre les nouvelles lignes contre
+# l'index puis on les ajoute à la fin. Si les données ont été modifiées hors de
+# ce module (taille différente), l'index est reconstruit en streaming.
+# Un SHA garde sa première ligne écrite (une ligne déjà connue n'est jamais
+# remplacée) ; compact() suit la même règle : la sortie se lit pareil avant et après.
+#
+# Trois formats, choisis d'après l'extension :
+#   - .csv     : un seul fichier, les nouvelles lignes sont ajoutées en fin de fichier ;
+#                .csv.gz / .csv.zst compressés à la volée (compression.py), chaque
+#                append écrivant un nouveau membre gzip / une nouvelle trame zstd ;
+#   - .parquet : un dossier de parts immuables (part-000000.parquet, …) au schéma
+#                typé de columnar.py, une part par append ;
+#   - dossier partitionné repo=…/month=… (partitions.py : dossier existant, ou chemin
+#                terminé par "/" pour en créer un ; autre chemin sans extension refusé), une part
+#                CSV par partition touchée et par append. Les parts sont écrites avant
+#                de prendre le verrou de l'index : plusieurs scrapers peuvent alimenter
+#                le même dossier en parallèle, seuls la réservation des SHA et le
+#                renommage des parts sont sérialisés.
+#
+# Si un append apporte des colonnes absentes de la sortie (nouveau champ d'un scraper),
+# une sortie CSV est réécrite en streaming avec l'en-tête élargi (valeurs vides pour
+# les lignes existantes) ; pour un dossier Parquet ou partitionné, l'append échoue.
+# Exception : une sortie sans la colonne clé (ancien commits_history.csv, sans `sha`)
+# est refusée, ses lignes ne pouvant pas être dédupliquées.
+#
+# Appartenance aux branches (colonne `branches` de scrap_git_project / git_mirror) :
+# une ligne écrite n'est plus modifiée, alors qu'une branche créée plus tard peut
+# contenir des commits déjà stockés. L'index garde donc aussi, à part :
+#   - la table `members` : (SHA, branche), dans l'ordre où chaque paire a été notée ;
+#   - la table `parents` : (SHA, parent), pour marquer les ancêtres d'une merge base.
+# Elles survivent à reindex() ; compact() complète la colonne `branches` avec `members`
+# (valeurs écrites d'abord, branches notées ensuite), CommitStore.members() la donne
+# à la lecture.
+#
+# Avec `db`, les lignes réellement ajoutées sont aussi normalisées (cleaner.normalize_row)
+# et insérées dans la base SQLite de commit_db.py, qui reste ainsi à jour entre deux
+# passages du cleaner.
+
+CHUNK_ROWS = 50_000
+DATE_COLUMNS = ["author_date", "committer_date", "commit_date"]
+
+
+def index_path_for(path: str) -> str:
+    return path + ".idx.sqlite"
+
+
+def is_parquet(path: str) -> bool:
+    return columnar.output_format(path) == "parquet"
+
+
+def normalize_types(df: pd.DataFrame) -> pd.DataFrame:
+    # mêmes conversions que l'ancien append_dedup, appliquées aux seules nouvelles lignes
+    for col in DATE_COLUMNS:
+        if col in df.columns:
+            df[col] = pd.to_datetime(df[col], utc=True, errors="coerce")
+
+    if "commit_day" in df.columns:
+        df["commit_day"] = pd.to_datetime(df["commit_day"], errors="coerce").dt.date
+
+    if "commit_hour" in df.columns:
+        df["commit_hour"] = pd.to_numeric(df["commit_hour"], errors="coerce").astype(pd.Int64Dtype())
+
+    return df
+
+
+def is_partitioned(path: str) -> bool:
+    return partitions.is_partitioned(path)
+
+
+def parquet_parts(path: str) -> List[str]:
+    return sorted(glob.glob(os.path.join(path, "part-*.parquet")))
+
+
+def read_header(path: str) -> Optional[List[str]]:
+    if is_partitioned(path):
+        parts = partitions.part_files(path) if os.path.isdir(path) else []
+        return read_header(str(parts[0])) if parts else None
+    if is_parquet(path):
+        parts = parquet_parts(path)
+        return columnar.pq.read_schema(parts[0]).names if parts else None
+    if not os.path.exists(path) or os.path.getsize(path) == 0:
+        return None
+    with compression.open_text(path) as f:
+        header = next(csv.reader(f), None)
+    return header or None
+
+
+def migrate_header(path: str, columns: List[str]) -> None:
+    """Réécrit le CSV `path` avec l'en-tête `columns` (les colonnes ajoutées sont vides)."""
+    tmp_path = path + ".migrate.tmp"
+    with compression.open_text(path) as f_in, \
+            compression.open_text(tmp_path, "w", kind=compression.codec(path)) as f_out:
+        reader = csv.reader(f_in)
+        # mêmes fins de ligne que df.to_csv
+        writer = csv.writer(f_out, lineterminator="\n")
+        next(reader, None)
+        writer.writerow(columns)
+        for row in reader:
+            writer.writerow(row + [""] * (len(columns) - len(row)))
+    os.replace(tmp_path, path)
+
+
+def read_members(db: sqlite3.Connection, shas: Iterable[str]) -> Dict[str, List[str]]:
+    """SHA -> branches notées dans la table `members` (ordre de notation)."""
+    found: Dict[str, List[str]] = {}
+    shas = [sha for sha in shas if isinstance(sha, str) and sha]
+    for start in range(0, len(shas), 500):
+        batch = shas[start:start + 500]
+        for sha, branch in db.execute(
+                f"SELECT sha, branch FROM members WHERE sha IN ({', '.join('?' * len(batch))}) ORDER BY rowid",
+                batch):
+            found.setdefault(sha, []).append(branch)
+    return found
+
+
+def join_branches(df: pd.DataFrame, members: Dict[str, List[str]], key: str = "sha") -> pd.DataFrame:
+    """Colonne `branches` complétée par `members` : branches écrites d'abord, puis les autres."""
+    def merged(sha, stored) -> str:
+        names = [b for b in stored.split(";") if b] if isinstance(stored, str) else []
+        return ";".join(names + [b for b in members.get(sha, []) if b not in names])
+
+    df = df.copy()
+    df["branches"] = [merged(sha, stored) for sha, stored in zip(df[key], df["branches"])]
+    return df
+
+
+def iter_keys(path: str, key: str) -> Iterator[List[Optional[str]]]:
+    """Valeurs de la colonne `key`, par morceaux (une liste par morceau ; None si absente)."""
+    header = read_header(path)
+    if not header:
+        return
+    if is_parquet(path):
+        for part in parquet_parts(path):
+            if key in header:
+                yield columnar.pq.read_table(part, columns=[key]).column(key).to_pylist()
+            else:
+                yield [None] * columnar.pq.read_metadata(part).num_rows
+        return
+    for csv_path in partitions.expand([Path(path)]):
+        header = read_header(str(csv_path))
+        if not header:
+            continue
+        usecols = [key] if key in header else [header[0]]
+        with compression.open_text(csv_path) as f:
+            for chunk in pd.read_csv(f, usecols=usecols, dtype=str, chunksize=CHUNK_ROWS):
+                if key in chunk.columns:
+                    yield [None if pd.isna(v) else v for v in chunk[key]]
+                else:
+                    yield [None] * len(chunk)
+
+
+class CommitStore:
+    """Sortie en ajout seul (CSV, dossier Parquet ou partitionné) + index SHA persistant."""
+
+    def __init__(self, path: str, key: str = "sha", db: Optional[str] = None):
+        if columnar.is_columnar(path) and not is_parquet(path):
+            raise ValueError(f"{path}: the append-only store writes .csv, .parquet or partitioned outputs")
+        if is_parquet(path):
+            columnar.require_pyarrow()
+        if is_partitioned(path):
+            # manifeste écrit tout de suite : le dossier reste reconnu sans le "/" final
+            path = str(partitions.init_dataset(path))
+        elif is_parquet(path):
+            os.makedirs(path, exist_ok=True)
+        else:
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.path = path
+        self.key = key
+        # timeout : un autre scraper peut tenir le verrou (append ou reindex en cours)
+        self.db = sqlite3.connect(index_path_for(path), timeout=60)
+        self.db.execute("CREATE TABLE IF NOT EXISTS seen (sha TEXT PRIMARY KEY) WITHOUT ROWID")
+        self.db.execute("CREATE TABLE IF NOT EXISTS meta (k TEXT PRIMARY KEY, v INTEGER)")
+        self.db.execute("CREATE TABLE IF NOT EXISTS members (sha TEXT NOT NULL, branch TEXT NOT NULL, "
+                        "UNIQUE (sha, branch))")
+        self.db.execute("CREATE TABLE IF NOT EXISTS parents (sha TEXT NOT NULL, parent TEXT NOT NULL, "
+                        "UNIQUE (sha, parent))")
+        self.db.commit()
+        # sous verrou : aucun append d'un autre écrivain à moitié fait pendant la comparaison
+        self.db.execute("BEGIN IMMEDIATE")
+        if self._meta("data_size") != self._data_size():
+            self.reindex()
+        self.db.commit()
+        self.appended = False
+        self.commit_db = None
+        if db:
+            from commit_db import CommitDB
+            self.commit_db = CommitDB(db)
+
+    def close(self) -> None:
+        if self.appended and is_partitioned(self.path):
+            partitions.refresh_manifest(self.path)
+        self.db.close()
+        if self.commit_db is not None:
+            self.commit_db.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __len__(self) -> int:
+        return self._meta("rows") or 0
+
+    def __contains__(self, sha: str) -> bool:
+        return self.db.execute("SELECT 1 FROM seen WHERE sha = ?", (sha,)).fetchone() is not None
+
+    def _data_size(self) -> int:
+        if is_parquet(self.path):
+            return sum(os.path.getsize(p) for p in parquet_parts(self.path))
+        if is_partitioned(self.path):
+            return sum(os.path.getsize(p) for p in partitions.part_files(self.path))
+        return os.path.getsize(self.path) if os.path.exists(self.path) else 0
+
+    def _meta(self, k: str) -> Optional[int]:
+        row = self.db.execute("SELECT v FROM meta WHERE k = ?", (k,)).fetchone()
+        return row[0] if row else None
+
+    def _set_meta(self, **values: int) -> None:
+        self.db.executemany("INSERT OR REPLACE INTO meta (k, v) VALUES (?, ?)", values.items())
+
+    def reindex(self) -> None:
+        """Reconstruit l'index en relisant la colonne clé par morceaux (mémoire bornée)."""
+        self.db.execute("DELETE FROM seen")
+        rows = 0
+        for keys in iter_keys(self.path, self.key):
+            rows += len(keys)
+            self.db.executemany("INSERT OR IGNORE INTO seen (sha) VALUES (?)",
+                                ((k,) for k in keys if k is not None))
+        self._set_meta(rows=rows, data_size=self._data_size())
+        self.db.commit()
+
+    def append(self, df_new: pd.DataFrame) -> int:
+        """Ajoute les lignes dont le SHA n'est pas encore connu. Retourne le nombre de lignes ajoutées."""
+        if df_new.empty:
+            return 0
+        with METRICS.stage("write"):
+            added = self._append(df_new)
+        METRICS.add("rows_written", added)
+        return added
+
+    def add_members(self, pairs: Iterable[Tuple[str, str]]) -> int:
+        """Note des paires (SHA, branche), lignes déjà écrites comprises ; rend le nombre de paires nouvelles."""
+        with self.db:
+            return self.db.executemany("INSERT OR IGNORE INTO members (sha, branch) VALUES (?, ?)", pairs).rowcount
+
+    def add_parents(self, pairs: Iterable[Tuple[str, str]]) -> None:
+        with self.db:
+            self.db.executemany("INSERT OR IGNORE INTO parents (sha, parent) VALUES (?, ?)", pairs)
+
+    def add_reach(self, branch: str, sha: str) -> int:
+        """`branch` contient `sha` et tous ses ancêtres connus (table `parents`) ; rend le nombre de paires nouvelles."""
+        before = self.db.total_changes   # rowcount vaut -1 pour un INSERT précédé de WITH
+        with self.db:
+            self.db.execute(
+                "WITH RECURSIVE up(sha) AS (SELECT ? UNION SELECT p.parent FROM parents p JOIN up ON p.sha = up.sha) "
+                "INSERT OR IGNORE INTO members (sha, branch) SELECT sha, ? FROM up", (sha, branch))
+        return self.db.total_changes - before
+
+    def members(self, shas: Iterable[str]) -> Dict[str, List[str]]:
+        return read_members(self.db, shas)
+
+    def _claim(self, df: pd.DataFrame) -> List[bool]:
+        """Réserve dans l'index les SHA de `df` ; True pour les lignes à écrire."""
+        is_new = []
+        for sha in df[self.key]:
+            if pd.isna(sha):
+                is_new.append(True)
+                continue
+            cur = self.db.execute("INSERT OR IGNORE INTO seen (sha) VALUES (?)", (sha,))
+            is_new.append(cur.rowcount == 1)
+        return is_new
+
+    def _prepare(self, df: pd.DataFrame) -> pd.DataFrame:
+        df = normalize_types(df.copy())
+        header = read_header(self.path)
+        if header:
+            extra = [c for c in df.columns if c not in header]
+            if extra:
+                if is_parquet(self.path) or is_partitioned(self.path):
+                    raise ValueError(f"{self.path}: columns {extra} are not in the stored schema "
+                                     f"(rewrite the output to add them)")
+                # appelé sous le verrou de l'index ; les clés ne changent pas, l'index reste valide
+                print(f"Adding columns {extra} to {self.path} header")
+                header = header + extra
+                migrate_header(self.path, header)
+            df = df.reindex(columns=header)
+        return df
+
+    def _append(self, df_new: pd.DataFrame) -> int:
+        header = read_header(self.path)
+        if header and self.key in df_new.columns and self.key not in header:
+            raise ValueError(f"{self.path}: no '{self.key}' column, its rows cannot be deduplicated; "
+                             f"move it aside and scrape again into a new file")
+
+        df = df_new
+        if self.key in df.columns:
+            df = df.drop_duplicates(subset=[self.key], keep="first")
+        if is_partitioned(self.path):
+            return self._append_partitioned(df)
+        if self.key in df.columns:
+            df = df[self._claim(df)]
+        if df.empty:
+            self.db.rollback()
+            return 0
+
+        try:
+            df = self._prepare(df)
+            if is_parquet(self.path):
+                part = os.path.join(self.path, f"part-{len(parquet_parts(self.path)):06d}.parquet")
+                columnar.pq.write_table(columnar.frame_to_table(df), part)
+            else:
+                header = read_header(self.path) is None
+                with compression.open_text(self.path, "a") as f:
+                    df.to_csv(f, header=header, index=False)
+        except Exception:
+            self.db.rollback()
+            raise
+        self._set_meta(rows=len(self) + len(df), data_size=self._data_size())
+        self.db.commit()
+        if self.commit_db is not None:
+            self.commit_db.insert_frame(df)
+        return len(df)
+
+    def _append_partitioned(self, df: pd.DataFrame) -> int:
+        # parts écrites hors transaction ; le verrou de l'index n'est pris que pour
+        # réserver les SHA et renommer les parts
+        if self.key in df.columns:
+            df = df[[pd.isna(sha) or sha not in self for sha in df[self.key]]]
+        if df.empty:
+            return 0
+        df = self._prepare(df)
+        writer = partitions.PartitionWriter(self.path)
+        writer.write_frame(df)
+        try:
+            self.db.execute("BEGIN IMMEDIATE")
+            if self.key in df.columns:
+                is_new = self._claim(df)
+                if not all(is_new):
+                    # SHA ajoutés entre-temps par un autre écrivain : parts refaites sans eux
+                    writer.discard()
+                    df = df[is_new]
+                    writer.write_frame(df)
+            writer.commit(refresh=False)
+        except Exception:
+            self.db.rollback()
+            writer.discard()
+            raise
+        self._set_meta(rows=len(self) + len(df), data_size=self._data_size())
+        self.db.commit()
+        self.appended = True
+        if self.commit_db is not None:
+            self.commit_db.insert_frame(df)
+        return len(df)
+
+
+def append_dedup(df_new: pd.DataFrame, out_path: str, key: str = "sha", db: Optional[str] = None) -> int:
+    """Ajout dédupliqué à la fin de `out_path`. Retourne le nombre total de lignes."""
+    with CommitStore(out_path, key=key, db=db) as store:
+        store.append(df_new)
+        return len(store)
+
+
+def count_rows(path: str, key: str = "sha") -> int:
+    if not os.path.exists(path):
+        return 0
+    with CommitStore(path, key=key) as store:
+        return len(store)
+
+
+def compact(path: str, key: str = "sha") -> int:
+    """Réécrit la sortie sans doublons (première occurrence gardée, comme append) puis reconstruit l'index.
+
+    Utile après une modification manuelle du fichier (doublons réintroduits) ; pour
+    un dossier Parquet, regroupe aussi les petites parts écrites par chaque append.
+    Deux passes en streaming : la première repère la première ligne de chaque SHA
+    dans une table SQLite temporaire, la seconde ne recopie que ces lignes, avec la
+    colonne `branches` complétée par la table `members` de l'index.
+    """
+    header = read_header(path)
+    if not header:
+        return 0
+    store = CommitStore(path, key=key) if "branches" in header and key in header else None
+
+    def with_members(df: pd.DataFrame) -> pd.DataFrame:
+        return join_branches(df, store.members(df[key]), key) if store is not None else df
+
+    rows = 0
+    tmp_path = path + ".compact.tmp"
+    scratch = sqlite3.connect("")   # base temporaire sur disque, supprimée à la fermeture
+    try:
+        scratch.execute("CREATE TABLE first (sha TEXT PRIMARY KEY, pos INTEGER) WITHOUT ROWID")
+        pos = 0
+        for keys in iter_keys(path, key):
+            scratch.executemany(
+                "INSERT OR IGNORE INTO first (sha, pos) VALUES (?, ?)",
+                ((sha, pos + i) for i, sha in enumerate(keys) if sha is not None),
+            )
+            pos += len(keys)
+
+        def keep_mask(keys: List[Optional[str]], offset: int) -> List[bool]:
+            keep = []
+            for i, sha in enumerate(keys):
+                if sha is None or sha == "":
+                    keep.append(True)
+                else:
+                    hit = scratch.execute("SELECT pos FROM first WHERE sha = ?", (sha,)).fetchone()
+                    keep.append(hit is not None and hit[0] == offset + i)
+            return keep
+
+        pos = 0
+        if is_partitioned(path):
+            # parts regroupées : une par partition (ou par BUFFER_ROWS lignes)
+            writer = partitions.PartitionWriter(path, columns=header)
+            for part in partitions.part_files(path):
+                for chunk in pd.read_csv(part, dtype=str, keep_default_na=False, chunksize=CHUNK_ROWS):
+                    keys = list(chunk[key]) if key in chunk.columns else [None] * len(chunk)
+                    kept = with_members(chunk[keep_mask(keys, pos)])
+                    pos += len(chunk)
+                    writer.write_rows(kept.to_dict("records"))
+                    rows += len(kept)
+            writer.commit(replace=True)
+        elif is_parquet(path):
+            shutil.rmtree(tmp_path, ignore_errors=True)
+            os.makedirs(tmp_path)
+            schema = columnar.pq.read_schema(parquet_parts(path)[0])
+            writer = columnar.pq.ParquetWriter(os.path.join(tmp_path, "part-000000.parquet"), schema)
+            try:
+                for part in parquet_parts(path):
+                    table = columnar.pq.read_table(part)
+                    keys = table.column(key).to_pylist() if key in header else [None] * table.num_rows
+                    kept = table.filter(columnar.pa.array(keep_mask(keys, pos)))
+                    if store is not None:
+                        i = kept.schema.get_field_index("branches")
+                        field = kept.schema.field(i)
+                        merged = with_members(pd.DataFrame({key: kept.column(key).to_pylist(),
+                                                            "branches": kept.column(i).to_pylist()}))
+                        kept = kept.set_column(i, field, columnar.pa.array(list(merged["branches"]), type=field.type))
+                    writer.write_table(kept)
+                    pos += table.num_rows
+                    rows += kept.num_rows
+            finally:
+                writer.close()
+            shutil.rmtree(path)
+            os.replace(tmp_path, path)
+        else:
+            first = True
+            # un seul flux (et donc un seul membre / une seule trame) pour un CSV compressé
+            with compression.open_text(path) as f_in, \
+                    compression.open_text(tmp_path, "w", kind=compression.codec(path)) as f_out:
+                for chunk in pd.read_csv(f_in, dtype=str, keep_default_na=False, chunksize=CHUNK_ROWS):
+                    keys = list(chunk[key]) if key in chunk.columns else [None] * len(chunk)
+                    kept = with_members(chunk[keep_mask(keys, pos)])
+                    pos += len(chunk)
+                    kept.to_csv(f_out, header=first, index=False)
+                    first = False
+                    rows += len(kept)
+            os.replace(tmp_path, path)
+    finally:
+        scratch.close()
+        if store is not None:
+            store.close()
+
+    with CommitStore(path, key=key) as store:
+        store.reindex()
+    return rows
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Maintenance of the append-only commit store.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    for name, help_text in [
+        ("compact", "Rewrite the output without duplicate SHAs, complete its branches column "
+                    "from the index and rebuild the index."),
+        ("reindex", "Rebuild the SHA index from the output."),
+        ("count", "Print the number of rows in the output."),
+    ]:
+        p = sub.add_parser(name, help=help_text)
+        p.add_argument("path", help="Commit output (e.g. data/commits_history.csv, a .csv.gz / .csv.zst, a .parquet "
+                       "or a partitioned dataset directory).")
+        p.add_argument("--key", default="sha", help="Dedup column (default: %(default)s).")
+    args = parser.parse_args()
+
+    if args.command == "compact":
+        rows = compact(args.path, key=args.key)
+        print(f"Compacted {args.path}: {rows} rows")
+    elif args.command == "reindex":
+        with CommitStore(args.path, key=args.key) as store:
+            store.reindex()
+            print(f"Reindexed {args.path}: {len(store)} rows")
+    else:
+        print(count_rows(args.path, key=args.key))
+
+
+if __name__ == "__main__":
+    main()
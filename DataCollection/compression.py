@@ -0,0 +1,202 @@
+import argparse
+import csv
+import gzip
+import io
+import os
+import random
+import shutil
+from functools import lru_cache
+from pathlib import Path
+from typing import List, Optional
+
+try:
+    import zstandard as zstd
+except Exception:
+    zstd = None
+
+# CSV compressés, lus et écrits en streaming (mémoire constante), d'après l'extension :
+#   - .gz  : gzip (bibliothèque standard) ;
+#   - .zst : zstandard (pip install zstandard).
+# Un ajout en fin de fichier (CommitStore, cleaner --incremental) écrit un nouveau
+# membre gzip / une nouvelle trame zstd, qui commence à l'ancienne taille du fichier :
+# les fichiers ainsi concaténés se relisent d'un bloc, ou à partir d'un de ces offsets.
+#
+# Mode dictionnaire (zstd) : noms de repos, d'auteurs, types et formules des messages
+# de commit se répètent d'un fichier à l'autre. Un dictionnaire entraîné sur des
+# lignes de commits (`python compression.py train`) donne ce vocabulaire à chaque
+# trame dès son premier octet, ce qui profite surtout aux petites trames (appends,
+# petits fichiers). S'il existe, le dictionnaire ZSTD_DICT (par défaut
+# data/commits.zdict) sert à écrire les .zst ; à la lecture, une trame qui l'exige
+# n'est décodée qu'avec le dictionnaire du même identifiant.
+
+CODECS = {
+    ".gz": "gzip",
+    ".zst": "zstd",
+}
+
+GZIP_LEVEL = 6
+ZSTD_LEVEL = 6
+
+DICTIONARY = Path(os.environ.get("ZSTD_DICT", Path(__file__).resolve().parent.parent / "data" / "commits.zdict"))
+DICT_SIZE = 112 * 1024
+DICT_SAMPLES = 100_000   # lignes tirées au hasard (réservoir) pour l'entraînement
+
+
+def codec(path) -> Optional[str]:
+    return CODECS.get(Path(path).suffix.lower())
+
+
+def require_zstd() -> None:
+    if zstd is None:
+        raise RuntimeError(".zst files need zstandard (pip install zstandard).")
+
+
+@lru_cache(maxsize=None)
+def _load_dictionary(path: Path):
+    return zstd.ZstdCompressionDict(path.read_bytes())
+
+
+def dictionary(dict_id: int = 0):
+    """Dictionnaire ZSTD_DICT (None s'il n'existe pas) ; `dict_id` : celui qu'exige une trame."""
+    if not DICTIONARY.exists():
+        if dict_id:
+            raise RuntimeError(f"zstd frame needs dictionary {dict_id}, but {DICTIONARY} does not exist (ZSTD_DICT).")
+        return None
+    found = _load_dictionary(DICTIONARY)
+    if dict_id and found.dict_id() != dict_id:
+        raise RuntimeError(f"zstd frame needs dictionary {dict_id}, {DICTIONARY} is {found.dict_id()} (ZSTD_DICT).")
+    return found
+
+
+class _Slice(io.RawIOBase):
+    """Octets [start, end) d'un fichier (end=None : jusqu'à la fin)."""
+
+    def __init__(self, path, start: int = 0, end: Optional[int] = None):
+        self.f = open(path, "rb")
+        self.f.seek(start)
+        self.left = None if end is None else max(0, end - start)
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        size = len(buffer) if self.left is None else min(len(buffer), self.left)
+        data = self.f.read(size)
+        buffer[:len(data)] = data
+        if self.left is not None:
+            self.left -= len(data)
+        return len(data)
+
+    def close(self) -> None:
+        self.f.close()
+        super().close()
+
+
+def open_binary(path, mode: str = "rb", kind: Optional[str] = None, start: int = 0, end: Optional[int] = None):
+    """Flux binaire décompressé / compressé de `path`.
+
+    `kind` force le codec (sinon d'après l'extension). En lecture, start / end
+    bornent les octets *compressés* lus : start doit être un début de membre / trame.
+    """
+    kind = kind or codec(path)
+    if "r" in mode:
+        raw = _Slice(path, start, end)
+        if kind is None:
+            return io.BufferedReader(raw)
+        if kind == "gzip":
+            buffered = io.BufferedReader(raw)
+            stream = gzip.GzipFile(fileobj=buffered, mode="rb")
+            stream.myfileobj = buffered   # fermé avec le flux, comme pour gzip.open(path)
+            return stream
+        require_zstd()
+        head = raw.f.read(18)
+        raw.f.seek(start)
+        try:
+            dict_id = zstd.get_frame_parameters(head).dict_id
+        except zstd.ZstdError:   # fichier vide ou tronqué : l'erreur viendra à la lecture
+            dict_id = 0
+        dctx = zstd.ZstdDecompressor(dict_data=dictionary(dict_id) if dict_id else dictionary())
+        # BufferedReader : readline() / peek(), comme pour gzip
+        return io.BufferedReader(dctx.stream_reader(raw, read_across_frames=True, closefd=True))
+    if kind is None:
+        return open(path, mode)
+    if kind == "gzip":
+        return gzip.open(path, mode, compresslevel=GZIP_LEVEL)
+    require_zstd()
+    cctx = zstd.ZstdCompressor(level=ZSTD_LEVEL, dict_data=dictionary(), write_checksum=True)
+    return cctx.stream_writer(open(path, mode), closefd=True)
+
+
+def open_text(path, mode: str = "r", encoding: str = "utf-8", newline: Optional[str] = "",
+              kind: Optional[str] = None, start: int = 0, end: Optional[int] = None):
+    """Comme open(path, mode, encoding=…, newline=…), compressé d'après l'extension (ou `kind`)."""
+    kind = kind or codec(path)
+    if kind is None and not start and end is None:
+        return open(path, mode, encoding=encoding, newline=newline)
+    stream = open_binary(path, mode.replace("t", "") + "b", kind=kind, start=start, end=end)
+    return io.TextIOWrapper(stream, encoding=encoding, newline=newline)
+
+
+def train_dictionary(inputs: List[Path], output: Path = DICTIONARY, size: int = DICT_SIZE,
+                     samples: int = DICT_SAMPLES, seed: int = 0) -> int:
+    """Entraîne un dictionnaire zstd sur des lignes de commits (CSV, compressés ou non)."""
+    require_zstd()
+    rng = random.Random(seed)
+    picked: List[bytes] = []
+    seen = 0
+    for path in inputs:
+        with open_text(path) as f:
+            reader = csv.reader(f)
+            next(reader, None)
+            for row in reader:
+                # la ligne telle qu'écrite dans le CSV (guillemets compris)
+                line = io.StringIO()
+                csv.writer(line).writerow(row)
+                sample = line.getvalue().encode("utf-8")
+                seen += 1
+                if len(picked) < samples:
+                    picked.append(sample)
+                else:
+                    i = rng.randrange(seen)
+                    if i < samples:
+                        picked[i] = sample
+    trained = zstd.train_dictionary(size, picked, level=ZSTD_LEVEL)
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_bytes(trained.as_bytes())
+    _load_dictionary.cache_clear()
+    return trained.dict_id()
+
+
+def convert(source: Path, output: Path) -> None:
+    """Recopie `source` vers `output` en changeant de compression (d'après les extensions)."""
+    with open_binary(source) as f_in, open_binary(output, "wb") as f_out:
+        shutil.copyfileobj(f_in, f_out, 1024 * 1024)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Compressed CSV helpers (.gz, .zst with an optional dictionary).")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("train", help="Train the zstd dictionary on commit CSV rows.")
+    p.add_argument("inputs", nargs="+", help="Commit CSV files (.csv, .csv.gz, .csv.zst).")
+    p.add_argument("-o", "--output", default=str(DICTIONARY), help="Dictionary file (default: %(default)s).")
+    p.add_argument("--size-kb", type=int, default=DICT_SIZE // 1024, help="Dictionary size in KB.")
+    p.add_argument("--samples", type=int, default=DICT_SAMPLES, help="Rows sampled for the training.")
+
+    p = sub.add_parser("convert", help="Copy a CSV to another compression (by extension).")
+    p.add_argument("source")
+    p.add_argument("output")
+    args = parser.parse_args()
+
+    if args.command == "train":
+        output = Path(args.output)
+        dict_id = train_dictionary([Path(p) for p in args.inputs], output, args.size_kb * 1024, args.samples)
+        print(f"Trained zstd dictionary {dict_id} ({output.stat().st_size} bytes) -> {output}")
+    else:
+        convert(Path(args.source), Path(args.output))
+        print(f"{args.source} ({os.path.getsize(args.source)} bytes) -> {args.output} "
+              f"({os.path.getsize(args.output)} bytes)")
+
+
+if __name__ == "__main__":
+    main()
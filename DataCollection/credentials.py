@@ -0,0 +1,85 @@
+import hashlib
+import importlib.util
+import json
+import os
+import time
+from typing import Optional, Tuple
+
+import requests
+
+import github_api
+
+# Identifiants GitHub chargés à la demande (plus au moment de l'import des scrapers).
+#
+# Ordre : variables d'environnement GITHUB_TOKEN / GITHUB_LOGIN, sinon .secrets.py.
+# La vérification du token (GET /user) est mise en cache TOKEN_CHECK_TTL secondes
+# dans TOKEN_CHECK_PATH : les lancements rapprochés sautent cet aller-retour.
+# Seule une empreinte SHA-256 du token est écrite sur disque.
+
+SECRETS_PATH = os.path.join(os.path.dirname(__file__), ".secrets.py")
+TOKEN_CHECK_PATH = os.path.join(os.path.dirname(__file__), ".token_check.json")
+TOKEN_CHECK_TTL = 3600
+USER_URL = f"{github_api.API_URL}/user"
+
+
+class CredentialsError(RuntimeError):
+    pass
+
+
+def load_credentials(secrets_path: str = SECRETS_PATH) -> Tuple[str, str]:
+    token = os.environ.get("GITHUB_TOKEN")
+    login = os.environ.get("GITHUB_LOGIN")
+    if not (token and login) and os.path.exists(secrets_path):
+        spec = importlib.util.spec_from_file_location("project_secrets", secrets_path)
+        project_secrets = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(project_secrets)
+        token = token or getattr(project_secrets, "GITHUB_TOKEN", None)
+        login = login or getattr(project_secrets, "GITHUB_LOGIN", None)
+    if not (token and login):
+        raise CredentialsError("GITHUB_TOKEN and GITHUB_LOGIN must be set in .secrets.py.")
+    return token, login
+
+
+def token_fingerprint(token: str, login: str) -> str:
+    return hashlib.sha256(f"{login}:{token}".encode("utf-8")).hexdigest()
+
+
+def _read_check(path: str) -> dict:
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def validate_token(session: requests.Session, token: str, login: str,
+                   cache_path: Optional[str] = TOKEN_CHECK_PATH, ttl: int = TOKEN_CHECK_TTL) -> None:
+    """GET /user, sauf si le même token a été validé il y a moins de `ttl` secondes."""
+    fingerprint = token_fingerprint(token, login)
+    if cache_path and ttl > 0:
+        check = _read_check(cache_path)
+        if check.get("fingerprint") == fingerprint and time.time() - check.get("checked_at", 0) < ttl:
+            return
+
+    r = session.get(USER_URL, timeout=30)
+    if r.status_code != 200:
+        raise CredentialsError(f"Invalid GITHUB_TOKEN or GITHUB_LOGIN.\n{r.status_code} {r.text[:200]}")
+
+    if cache_path:
+        tmp = cache_path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"fingerprint": fingerprint, "checked_at": time.time()}, f)
+        os.replace(tmp, cache_path)
+
+
+def github_session(user_agent: Optional[str] = None, check: bool = True) -> requests.Session:
+    token, login = load_credentials()
+    session = requests.Session()
+    session.headers.update({
+        "Authorization": f"Bearer {token}",
+        "Accept": "application/vnd.github.v3+json",
+        "User-Agent": user_agent or login,
+    })
+    if check:
+        validate_token(session, token, login)
+    return session
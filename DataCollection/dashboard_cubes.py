@@ -0,0 +1,250 @@
+import argparse
+import csv
+import json
+from collections import Counter
+from datetime import date
+from pathlib import Path
+from typing import Iterator
+
+import columnar
+import compression
+import partitions
+
+# Agrégats pré-calculés pour le dashboard (js/app.js).
+#
+# Au lieu de télécharger tout commits_history_cleaned.csv et de refaire les
+# comptages côté navigateur, on produit ici un petit bundle JSON avec, par
+# personne : heatmap 7x24, langages, projets, nomenclature et commits par jour ;
+# et par repo : les derniers commits nécessaires au git graph.
+# Mêmes règles que les fonctions de js/data.js (heatmapMatrix, languageCounts…).
+# Le déploiement GitHub Pages (.github/workflows/static.yml) régénère le bundle à
+# partir du CSV commité : le bundle publié correspond toujours aux données.
+
+BUNDLE_VERSION = 1
+
+DEFAULT_INPUT = Path(__file__).resolve().parent.parent / "data" / "commits_history_cleaned.csv"
+DEFAULT_OUTPUT = Path(__file__).resolve().parent.parent / "data" / "commits_cubes.json"
+
+# Colonnes du tableau "Raw data" (js/app.js)
+SAMPLE_COLUMNS = [
+	"repo_full_name",
+	"sha",
+	"parent_shas",
+	"branch",
+	"author_name",
+	"commit_day",
+	"commit_hour",
+	"message_type",
+	"message_argument",
+	"message_message",
+	"nomenclature",
+]
+SAMPLE_ROWS = 6
+
+# Champs d'un commit du git graph, dans l'ordre des tableaux du bundle
+GRAPH_COLUMNS = ["sha", "parent_shas", "author_name", "commit_day", "commit_hour"]
+GRAPH_LIMIT = 500  # commits les plus récents gardés par repo (0 = tous)
+
+
+def _text(value) -> str:
+	if value is None:
+		return ""
+	if isinstance(value, bool):
+		return "true" if value else "false"
+	if isinstance(value, date):
+		return value.isoformat()
+	return str(value)
+
+
+def _iter_file(path: Path) -> Iterator[dict[str, str]]:
+	if columnar.is_columnar(path):
+		table = columnar.read_table(path)
+		for batch in table.to_batches(columnar.BATCH_ROWS):
+			for row in batch.to_pylist():
+				yield {k: _text(v) for k, v in row.items()}
+		return
+	with compression.open_text(path) as f:
+		yield from csv.DictReader(f)
+
+
+def iter_rows(
+	path: Path,
+	repos: list[str] | None = None,
+	since: str | None = None,
+	until: str | None = None,
+) -> Iterator[dict[str, str]]:
+	"""Lignes du fichier nettoyé (CSV, Parquet, Arrow ou dossier partitionné), valeurs sous forme de texte comme dans le CSV.
+
+	Filtres optionnels sur le repo et le jour : un dossier partitionné n'ouvre que les
+	partitions concernées, les autres formats sont filtrés ligne à ligne.
+	"""
+	if partitions.is_partitioned(path):
+		yield from partitions.iter_rows(path, repos, since, until)
+		return
+	keep = partitions.row_filter(repos, since, until)
+	rows = _iter_file(path)
+	yield from (filter(keep, rows) if keep else rows)
+
+
+def person_key(row: dict[str, str]) -> str:
+	# même ordre de priorité que getPersonKey (js/app.js)
+	for col in ("person", "author_login", "author_name"):
+		if row.get(col):
+			return row[col]
+	repo = row.get("repo_full_name") or ""
+	if "/" in repo:
+		return repo.split("/")[0]
+	return "Unknown"
+
+
+def _hour(value: str | None) -> int | None:
+	# `+d.commit_hour` côté JS : champ vide => 0, texte => NaN (ligne ignorée)
+	value = (value or "").strip()
+	if not value:
+		return 0
+	try:
+		return max(0, min(23, int(float(value))))
+	except (ValueError, OverflowError):   # "inf", "1e400" : comme commit_db._hour
+		return None
+
+
+class PersonCube:
+	def __init__(self, name: str):
+		self.name = name
+		self.count = 0
+		self.heatmap = [[0] * 24 for _ in range(7)]
+		self.languages: Counter[str] = Counter()
+		self.projects: Counter[str] = Counter()
+		self.repos: set[str] = set()
+		self.nomenclature_ok = 0
+		self.per_day: Counter[str] = Counter()
+
+	def add(self, row: dict[str, str], weekday: int | None, hour: int | None) -> None:
+		self.count += 1
+		if weekday is not None and hour is not None:
+			self.heatmap[weekday][hour] += 1
+		self.languages[(row.get("repo_language") or "Unknown").strip() or "Unknown"] += 1
+		self.projects[(row.get("repo_full_name") or "unknown-repo").strip() or "unknown-repo"] += 1
+		self.repos.add(row.get("repo_full_name") or "")
+		if row.get("nomenclature") == "1":
+			self.nomenclature_ok += 1
+		if row.get("commit_day"):
+			self.per_day[row["commit_day"]] += 1
+
+	def to_json(self) -> dict:
+		# tri stable par valeur décroissante, comme Array.sort côté JS
+		by_count = lambda c: [[k, v] for k, v in sorted(c.items(), key=lambda kv: -kv[1])]
+		return {
+			"name": self.name,
+			"count": self.count,
+			"heatmap": self.heatmap,
+			"languages": by_count(self.languages),
+			"projects": by_count(self.projects),
+			"uniqueRepos": len(self.repos),
+			"nomenclature": [self.nomenclature_ok, self.count - self.nomenclature_ok],
+			"perDay": sorted([day, n] for day, n in self.per_day.items()),
+		}
+
+
+def build_cubes(rows: Iterator[dict[str, str]], graph_limit: int = GRAPH_LIMIT) -> dict:
+	persons: dict[str, PersonCube] = {}
+	repos: dict[str, list[list]] = {}
+	sample: list[list[str]] = []
+	weekdays: dict[str, int | None] = {}
+	total = 0
+
+	for row in rows:
+		total += 1
+		if len(sample) < SAMPLE_ROWS:
+			sample.append([row.get(c) or "" for c in SAMPLE_COLUMNS])
+
+		day = row.get("commit_day") or ""
+		if day not in weekdays:
+			try:
+				weekdays[day] = date.fromisoformat(day).weekday()   # lundi = 0, comme weekdayIndexUTC
+			except ValueError:
+				weekdays[day] = None
+		hour = _hour(row.get("commit_hour"))
+
+		key = person_key(row)
+		cube = persons.get(key)
+		if cube is None:
+			cube = persons[key] = PersonCube(key)
+		cube.add(row, weekdays[day], hour)
+
+		repos.setdefault(row.get("repo_full_name") or "unknown-repo", []).append(
+			[row.get("sha") or "", row.get("parent_shas") or "", row.get("author_name") or "", day, hour]
+		)
+
+	graphs = {}
+	for repo, commits in repos.items():
+		# même ordre que drawGitGraph : du plus récent au plus ancien
+		commits.sort(key=lambda c: (c[3], c[4] or 0), reverse=True)
+		graphs[repo] = {
+			"total": len(commits),
+			"commits": commits[:graph_limit] if graph_limit else commits,
+		}
+
+	return {
+		"version": BUNDLE_VERSION,
+		"rows": total,
+		"sampleColumns": SAMPLE_COLUMNS,
+		"sample": sample,
+		"graphColumns": GRAPH_COLUMNS,
+		"persons": [cube.to_json() for cube in persons.values()],
+		"repos": graphs,
+	}
+
+
+def write_cubes(
+	input_path: Path,
+	output_path: Path,
+	graph_limit: int = GRAPH_LIMIT,
+	repos: list[str] | None = None,
+	since: str | None = None,
+	until: str | None = None,
+) -> dict:
+	bundle = build_cubes(iter_rows(input_path, repos, since, until), graph_limit=graph_limit)
+	bundle["source"] = input_path.name
+	output_path.parent.mkdir(parents=True, exist_ok=True)
+	tmp_path = output_path.with_suffix(output_path.suffix + ".tmp")
+	with tmp_path.open("w", encoding="utf-8") as f:
+		json.dump(bundle, f, ensure_ascii=False, separators=(",", ":"))
+	tmp_path.replace(output_path)
+	return bundle
+
+
+def main() -> None:
+	parser = argparse.ArgumentParser(description="Pre-aggregate the cleaned commits for the dashboard.")
+	parser.add_argument(
+		"input",
+		nargs="?",
+		default=str(DEFAULT_INPUT),
+		help="Cleaned commits (.csv, .parquet, .arrows or partitioned directory, output of cleaner.py).",
+	)
+	parser.add_argument(
+		"-o",
+		"--output",
+		default=str(DEFAULT_OUTPUT),
+		help="JSON bundle loaded by js/app.js.",
+	)
+	parser.add_argument(
+		"--graph-limit",
+		type=int,
+		default=GRAPH_LIMIT,
+		help="Most recent commits kept per repository for the git graphs (0 = all).",
+	)
+	parser.add_argument("--repo", action="append", help="Only this repo_full_name (repeatable).")
+	parser.add_argument("--since", help="First commit_day (YYYY-MM-DD or YYYY-MM).")
+	parser.add_argument("--until", help="Last commit_day (YYYY-MM-DD or YYYY-MM).")
+	args = parser.parse_args()
+
+	output = Path(args.output)
+	bundle = write_cubes(Path(args.input), output, graph_limit=args.graph_limit,
+		repos=args.repo, since=args.since, until=args.until)
+	print(f"Aggregated {bundle['rows']} rows ({len(bundle['persons'])} persons, "
+		f"{len(bundle['repos'])} repos) into {output} ({output.stat().st_size} bytes)")
+
+
+if __name__ == "__main__":
+	main()
@@ -5,11 +5,13 @@ import random
 from dataclasses import dataclass
 from datetime import date, timedelta
 from pathlib import Path
-from typing import Optional
+from typing import Iterator, Optional
 
 try:
+    import numpy as np
     import pandas as pd
 except Exception:
+    np = None
     pd = None
 
 
@@ -136,6 +138,197 @@ def generate_fake_git_commits(
     return commits
 
 
+# ----------------------------
+# Streaming generator (cleaner.OUTPUT_COLUMNS schema)
+# ----------------------------
+#
+# Version vectorisée (NumPy) pour les tests de charge : les lignes sortent par
+# paquets de `chunk_rows`, directement au format du CSV nettoyé. Chaque repo a
+# `branches` lignées de commits ; un commit a pour parent le commit précédent de
+# sa branche, une nouvelle branche part du dernier commit de main, et une partie
+# des commits de main sont des merges d'une autre branche (deux parents).
+
+CHUNK_ROWS = 500_000
+
+FIRST_NAMES = ["Alice", "Bob", "Chloe", "David", "Emma", "Farid", "Gina", "Hugo",
+               "Ines", "Jules", "Kenza", "Lucas", "Maya", "Nina", "Oscar", "Paul"]
+LAST_NAMES = ["Martin", "Bernard", "Dubois", "Moreau", "Laurent", "Simon", "Michel",
+              "Garcia", "Chen", "Nguyen", "Rossi", "Smith"]
+BRANCH_NAMES = ["main", "dev", "feature/ui", "feature/api", "fix/tests", "refactor/core"]
+FREE_MESSAGES = ["Update main.ipynb", "wip", "Add files via upload", "minor changes", "update"]
+
+# part des commits par heure (journée de travail + soirée), normalisée plus bas
+HOUR_PROFILE = [1, 1, 1, 1, 1, 1, 2, 4, 7, 10, 11, 10, 7, 9, 11, 11, 10, 9, 7, 6, 6, 5, 3, 2]
+
+
+def skewed_weights(n: int, skew: float) -> "np.ndarray":
+    # loi de Zipf tronquée : quelques repos / auteurs très actifs, une longue traîne
+    w = 1.0 / np.arange(1, n + 1) ** skew
+    return w / w.sum()
+
+
+def author_names(n: int) -> list[str]:
+    names = []
+    for i in range(n):
+        name = f"{FIRST_NAMES[i % len(FIRST_NAMES)]} {LAST_NAMES[(i // len(FIRST_NAMES)) % len(LAST_NAMES)]}"
+        cycle = i // (len(FIRST_NAMES) * len(LAST_NAMES))
+        names.append(f"{name} {cycle + 1}" if cycle else name)
+    return names
+
+
+def repo_names(n: int, owner: str = "fake-org") -> list[str]:
+    return [f"{owner}/{REPO_NAMES[i % len(REPO_NAMES)]}" + (f"-{i // len(REPO_NAMES)}" if i >= len(REPO_NAMES) else "")
+            for i in range(n)]
+
+
+def branch_names(n: int) -> list[str]:
+    return [BRANCH_NAMES[i] if i < len(BRANCH_NAMES) else f"feature/{i}" for i in range(n)]
+
+
+def random_shas(rng: "np.random.Generator", n: int) -> "np.ndarray":
+    raw = rng.bytes(20 * n).hex()
+    return np.array([raw[i:i + 40] for i in range(0, 40 * n, 40)], dtype=object)
+
+
+def generate_commit_chunks(
+    rows: int,
+    seed: int = 42,
+    chunk_rows: int = CHUNK_ROWS,
+    repos: int = 20,
+    repo_skew: float = 0.8,
+    authors: int = 50,
+    author_skew: float = 1.1,
+    branches: int = 4,
+    main_share: float = 0.5,
+    merge_ratio: float = 0.1,
+    nomenclature_ratio: float = 0.6,
+    start_date: date = date(2024, 1, 1),
+    end_date: date = date(2026, 1, 21),
+) -> Iterator["pd.DataFrame"]:
+    """`rows` commits en DataFrames de `chunk_rows` lignes (colonnes de cleaner.OUTPUT_COLUMNS).
+
+    Déterministe pour un `seed` donné (et un même `chunk_rows`).
+    """
+    if np is None:
+        raise RuntimeError("The streaming generator needs numpy and pandas.")
+    from cleaner import OUTPUT_COLUMNS
+
+    rng = np.random.default_rng(seed)
+    repo_pool = np.array(repo_names(repos), dtype=object)
+    author_pool = np.array(author_names(authors), dtype=object)
+    branch_pool = np.array(branch_names(branches), dtype=object)
+    repo_p = skewed_weights(repos, repo_skew)
+    author_p = skewed_weights(authors, author_skew)
+    hour_p = np.array(HOUR_PROFILE, dtype=float) / sum(HOUR_PROFILE)
+    days = (end_date - start_date).days + 1
+
+    types = np.array(MESSAGE_TYPES, dtype=object)
+    scopes = np.array(SCOPES, dtype=object)
+    bank = np.array([m for t in MESSAGE_TYPES for m in MESSAGE_BANK[t]], dtype=object)
+    bank_len = np.array([len(MESSAGE_BANK[t]) for t in MESSAGE_TYPES])
+    bank_start = np.concatenate([[0], np.cumsum(bank_len)[:-1]])
+    free = np.array(FREE_MESSAGES, dtype=object)
+
+    # dernier SHA de chaque lignée (repo, branche), reporté d'un paquet à l'autre
+    tips = np.full(repos * branches, "", dtype=object)
+
+    for first in range(0, rows, chunk_rows):
+        n = min(chunk_rows, rows - first)
+        idx = np.arange(n)
+
+        # dates croissantes sur toute la génération, heures selon HOUR_PROFILE
+        day = np.floor(np.sort(rng.uniform(first / rows, (first + n) / rows, n)) * days).astype(np.int64)
+        hour = rng.choice(24, n, p=hour_p)
+        order = np.lexsort((hour, day))
+        day, hour = day[order], hour[order]
+
+        repo = rng.choice(repos, n, p=repo_p)
+        branch = np.where(rng.random(n) < main_share, 0, rng.integers(1, max(branches, 2), n)) \
+            if branches > 1 else np.zeros(n, dtype=np.int64)
+        lane = repo * branches + branch
+        main_lane = repo * branches
+        sha = random_shas(rng, n)
+
+        # lignes triées par (lignée, ordre chronologique)
+        by_lane = np.lexsort((idx, lane))
+        sorted_lane = lane[by_lane]
+        starts = np.r_[True, sorted_lane[1:] != sorted_lane[:-1]]
+        ends = np.r_[sorted_lane[1:] != sorted_lane[:-1], True]
+        keys = sorted_lane * n + by_lane
+
+        def last_before(target: "np.ndarray", pos: "np.ndarray") -> "np.ndarray":
+            # SHA du dernier commit de la lignée `target` strictement avant la ligne `pos`
+            j = np.searchsorted(keys, target * n + pos) - 1
+            jj = np.maximum(j, 0)
+            hit = (j >= 0) & (sorted_lane[jj] == target)
+            return np.where(hit, sha[by_lane[jj]], tips[target])
+
+        parent = np.empty(n, dtype=object)
+        prev = np.r_[0, by_lane[:-1]]
+        parent[by_lane] = np.where(starts, tips[sorted_lane], sha[prev])
+        # premier commit d'une branche : elle part du dernier commit de main
+        orphan = (parent == "") & (branch > 0)
+        parent[orphan] = last_before(main_lane[orphan], idx[orphan])
+
+        # merges sur main : second parent = dernier commit d'une autre branche du repo
+        merge = np.zeros(n, dtype=bool)
+        merged_from = np.zeros(n, dtype=np.int64)
+        if branches > 1:
+            candidates = (branch == 0) & (parent != "") & (rng.random(n) < merge_ratio)
+            merged_from = rng.integers(1, branches, n)
+            second = last_before(main_lane[candidates] + merged_from[candidates], idx[candidates])
+            merge[np.flatnonzero(candidates)[second != ""]] = True
+            parent[merge] = parent[merge] + ";" + second[second != ""]
+
+        # messages : conventionnels (type(scope): message), libres, ou merge
+        conventional = ~merge & (rng.random(n) < nomenclature_ratio)
+        t = rng.integers(0, len(types), n)
+        with_scope = conventional & (rng.random(n) < 0.6)
+        m_type = np.where(conventional, types[t], "")
+        m_arg = np.where(with_scope, scopes[rng.integers(0, len(scopes), n)], "")
+        m_msg = np.where(conventional, bank[bank_start[t] + (rng.random(n) * bank_len[t]).astype(np.int64)],
+                         free[rng.integers(0, len(free), n)])
+        if merge.any():
+            m_msg[merge] = "Merge branch '" + branch_pool[merged_from[merge]] + "'"
+
+        tips[sorted_lane[ends]] = sha[by_lane[ends]]
+
+        yield pd.DataFrame({
+            "repo_full_name": repo_pool[repo],
+            "sha": sha,
+            "parent_shas": parent,
+            "branch": branch_pool[branch],
+            "author_name": author_pool[rng.choice(authors, n, p=author_p)],
+            "commit_day": (np.datetime64(start_date) + day).astype(str),
+            "commit_hour": hour,
+            "message_type": m_type,
+            "message_argument": m_arg,
+            "message_message": m_msg,
+            "nomenclature": conventional.astype(np.int8),
+        }, columns=OUTPUT_COLUMNS)
+
+
+def export_stream(chunks: Iterator["pd.DataFrame"], output: Path) -> int:
+    """Écrit les paquets au fil de l'eau (.csv / .csv.gz / .csv.zst, ou .parquet / .arrows via columnar)."""
+    import columnar
+    import compression
+    from cleaner import OUTPUT_COLUMNS
+
+    output.parent.mkdir(parents=True, exist_ok=True)
+    rows = 0
+    if columnar.is_columnar(output):
+        with columnar.ColumnarWriter(output, OUTPUT_COLUMNS) as writer:
+            for df in chunks:
+                writer.write_frame(df)
+                rows += len(df)
+        return rows
+    with compression.open_text(output, "w") as f:
+        for df in chunks:
+            df.to_csv(f, header=rows == 0, index=False)
+            rows += len(df)
+    return rows
+
+
 # ----------------------------
 # CSV export
 # ----------------------------
@@ -155,7 +348,9 @@ def export_to_csv(rows: list[dict], output: Path) -> None:
         "message_message",
     ]
 
-    with output.open("w", newline="", encoding="utf-8") as f:
+    import compression
+
+    with compression.open_text(output, "w") as f:
         writer = csv.DictWriter(f, fieldnames=fields)
         writer.writeheader()
         writer.writerows(rows)
@@ -166,12 +361,40 @@ def export_to_csv(rows: list[dict], output: Path) -> None:
 # ----------------------------
 
 if __name__ == "__main__":
-    random_seed = random.randint(0, 1000)
-    commits = generate_fake_git_commits(
-        n=200,
-        template_csv=Path("commits_history_cleaned.csv"),
-        seed=random_seed,
-    )
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Generate fake commit datasets.")
+    parser.add_argument("--rows", type=int, default=None,
+                        help="Stream this many commits in the cleaned schema (default: 200 legacy rows).")
+    parser.add_argument("-o", "--output", default="fake_git_commits.csv",
+                        help="Output file (.csv, .csv.gz / .csv.zst, or .parquet / .arrows with --rows).")
+    parser.add_argument("--seed", type=int, default=None, help="Random seed (default: random).")
+    parser.add_argument("--chunk-rows", type=int, default=CHUNK_ROWS)
+    parser.add_argument("--repos", type=int, default=20)
+    parser.add_argument("--repo-skew", type=float, default=0.8, help="Zipf exponent of the repo activity.")
+    parser.add_argument("--authors", type=int, default=50)
+    parser.add_argument("--author-skew", type=float, default=1.1, help="Zipf exponent of the author activity.")
+    parser.add_argument("--branches", type=int, default=4, help="Branches per repo (main included).")
+    parser.add_argument("--merge-ratio", type=float, default=0.1, help="Share of main commits that are merges.")
+    parser.add_argument("--nomenclature-ratio", type=float, default=0.6,
+                        help="Share of conventional 'type(scope): message' commits.")
+    args = parser.parse_args()
 
-    export_to_csv(commits, Path("fake_git_commits.csv"))
-    print("CSV généré : fake_git_commits.csv")
+    random_seed = args.seed if args.seed is not None else random.randint(0, 1000)
+    if args.rows is None:
+        commits = generate_fake_git_commits(
+            n=200,
+            template_csv=Path("commits_history_cleaned.csv"),
+            seed=random_seed,
+        )
+        export_to_csv(commits, Path(args.output))
+    else:
+        chunks = generate_commit_chunks(
+            args.rows, seed=random_seed, chunk_rows=args.chunk_rows,
+            repos=args.repos, repo_skew=args.repo_skew,
+            authors=args.authors, author_skew=args.author_skew,
+            branches=args.branches, merge_ratio=args.merge_ratio,
+            nomenclature_ratio=args.nomenclature_ratio,
+        )
+        export_stream(chunks, Path(args.output))
+    print(f"CSV généré : {args.output}")
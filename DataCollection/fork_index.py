@@ -0,0 +1,48 @@
+from typing import Dict, Iterable, List, Optional, Set
+
+# Index SHA commun à tous les repos d'un run, qui connaît les liens fork -> parent.
+#
+# L'historique d'un repo parent n'est téléchargé qu'une fois ; pour un fork on ne
+# récupère que ce qui diverge (endpoint compare) : ses commits propres, et les
+# commits du parent absents du fork. Le fork contient donc tout l'historique
+# connu du parent sauf ces derniers, plus ses commits propres. Chaque SHA garde
+# la liste des repos qui le contiennent (colonne `repos` de la sortie).
+
+
+class ShaIndex:
+    def __init__(self, bases: Optional[Dict[str, str]] = None):
+        self.bases: Dict[str, str] = dict(bases or {})   # fork -> repo dont il diverge
+        self.members: Dict[str, List[str]] = {}          # repo -> SHA connus, dans l'ordre d'ajout
+        self.repos: Dict[str, List[str]] = {}            # SHA -> repos qui le contiennent
+
+    def __contains__(self, sha: str) -> bool:
+        return sha in self.repos
+
+    def add(self, repo: str, shas: Iterable[Optional[str]]) -> None:
+        members = self.members.setdefault(repo, [])
+        for sha in shas:
+            if not sha:
+                continue
+            repos = self.repos.setdefault(sha, [])
+            if repo not in repos:
+                repos.append(repo)
+                members.append(sha)
+
+    def add_fork(self, fork: str, unique: Iterable[Optional[str]], base_only: Set[str]) -> None:
+        """`fork` contient l'historique connu de sa base, sauf `base_only`, plus ses commits `unique`."""
+        base = self.bases[fork]
+        self.add(fork, [sha for sha in self.members.get(base, []) if sha not in base_only])
+        self.add(fork, unique)
+
+    def repos_of(self, sha: Optional[str]) -> List[str]:
+        return self.repos.get(sha or "", [])
+
+    def depth(self, repo: str) -> int:
+        # 0 pour un repo qui n'est pas un fork suivi ; les bases passent avant leurs forks
+        depth = 0
+        seen = {repo}
+        while repo in self.bases and self.bases[repo] not in seen:
+            repo = self.bases[repo]
+            seen.add(repo)
+            depth += 1
+        return depth
@@ -0,0 +1,199 @@
+import argparse
+import os
+import subprocess
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import pandas as pd
+
+from commit_batch import BRANCH_COLUMNS, commits_frame
+from commit_store import CommitStore
+
+# Ingestion depuis un clone miroir local, sans API GitHub (ni token, ni rate limit).
+#
+# Un seul `git log` sur toutes les branches, avec un format à séparateurs
+# (\x1f entre champs, \x1e entre commits), lu en streaming. `--source` donne la
+# branche par laquelle chaque commit a été atteint ; on reconstruit des
+# commits au format REST pour réutiliser commits_frame => mêmes colonnes que
+# scrap_git_project : `branch` = branche par laquelle le commit a été atteint,
+# `branches` = toutes les branches qui le contiennent (un `git rev-list` par branche).
+# L'appartenance de tous les commits de la fenêtre est notée à chaque passage dans
+# l'index du CommitStore (table `members`) : une branche créée depuis sur un historique
+# déjà stocké y apparaît, et `commit_store.py compact` la reporte dans `branches`.
+
+REPO_FULL_NAME = "Samuel-Chapuis/CS-NFTM-Fork"
+OUT_CSV = "data/commits_repo_all_members.csv"
+MIRRORS_DIR = "data/mirrors"
+
+START_DATE = "2025-08-01T00:00:00Z"
+END_DATE   = "2026-02-01T23:59:59Z"
+
+BATCH_ROWS = 5000
+
+COLUMNS = BRANCH_COLUMNS + ["branches"]
+
+FIELD_SEP = "\x1f"
+RECORD_SEP = "\x1e"
+LOG_FIELDS = ["%H", "%P", "%S", "%an", "%ae", "%ad", "%cn", "%ce", "%cd", "%B"]
+# dates réécrites en UTC "…Z", comme celles de l'API
+DATE_FORMAT = "format-local:%Y-%m-%dT%H:%M:%SZ"
+
+# refs => nom de branche ; seules les branches sont parcourues (pas refs/pull/*, tags…)
+REF_PREFIXES = ["refs/heads/", "refs/remotes/origin/"]
+# `git log --source` donne des noms courts : "main", ou "origin/dev" dans un clone classique
+SHORT_PREFIXES = ["origin/"]
+
+
+def mirror_path_for(full_name: str, mirrors_dir: str = MIRRORS_DIR) -> str:
+    return os.path.join(mirrors_dir, full_name.replace("/", "__") + ".git")
+
+
+def run_git(args: List[str], cwd: Optional[str] = None) -> str:
+    # stderr non capturé : les erreurs de git s'affichent telles quelles
+    out = subprocess.run(["git"] + args, cwd=cwd, check=True, stdout=subprocess.PIPE, text=True)
+    return out.stdout
+
+
+def update_mirror(url: str, path: str) -> None:
+    """Clone miroir au premier run, `git fetch` ensuite."""
+    if os.path.isdir(path):
+        print(f"Fetching {url} into {path}…")
+        run_git(["fetch", "--prune", "origin"], cwd=path)
+    else:
+        print(f"Cloning {url} into {path}…")
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        run_git(["clone", "--mirror", url, path])
+
+
+def branch_name(ref: str) -> str:
+    for prefix in REF_PREFIXES + SHORT_PREFIXES:
+        if ref.startswith(prefix):
+            return ref[len(prefix):]
+    return ref
+
+
+def branch_heads(path: str) -> Dict[str, str]:
+    heads = {}
+    for line in run_git(["for-each-ref", "--format=%(refname) %(objectname)"] +
+                        [p.rstrip("/") for p in REF_PREFIXES], cwd=path).splitlines():
+        ref, sha = line.split(" ", 1)
+        if ref.endswith("/HEAD"):
+            continue
+        heads.setdefault(branch_name(ref), sha)
+    return heads
+
+
+def branch_members(path: str, heads: Dict[str, str], since: str = START_DATE,
+                   until: str = END_DATE) -> Dict[str, List[str]]:
+    """SHA -> branches qui le contiennent, dans la même fenêtre de dates que iter_log."""
+    members: Dict[str, List[str]] = {}
+    for branch, head in heads.items():
+        for sha in run_git(["rev-list", f"--since={since}", f"--until={until}", head], cwd=path).split():
+            members.setdefault(sha, []).append(branch)
+    return members
+
+
+def iter_log(path: str, since: str = START_DATE, until: str = END_DATE) -> Iterator[Tuple[Dict[str, Any], str]]:
+    """(commit au format REST, branche) pour chaque commit des branches, du plus récent au plus ancien."""
+    # origin/HEAD exclu : sinon `--source` peut attribuer des commits à "HEAD"
+    cmd = ["git", "log", "--branches", "--exclude=origin/HEAD", "--remotes=origin/*", "--source",
+           f"--since={since}", f"--until={until}", f"--date={DATE_FORMAT}",
+           "--format=" + FIELD_SEP.join(LOG_FIELDS) + RECORD_SEP]
+    env = dict(os.environ, TZ="UTC")
+    proc = subprocess.Popen(cmd, cwd=path, env=env, stdout=subprocess.PIPE,
+                            encoding="utf-8", errors="replace")
+    buf = ""
+    try:
+        for chunk in iter(lambda: proc.stdout.read(1 << 16), ""):
+            buf += chunk
+            *records, buf = buf.split(RECORD_SEP)
+            for record in records:
+                yield parse_log_record(record.lstrip("\n"))
+    finally:
+        proc.stdout.close()
+        if proc.wait() != 0:
+            raise subprocess.CalledProcessError(proc.returncode, cmd)
+
+
+def parse_log_record(record: str) -> Tuple[Dict[str, Any], str]:
+    sha, parents, source, an, ae, ad, cn, ce, cd, message = record.split(FIELD_SEP, len(LOG_FIELDS) - 1)
+    commit = {
+        "sha": sha,
+        "parents": [{"sha": p} for p in parents.split()],
+        "commit": {
+            "message": message.rstrip("\n"),   # l'API ne renvoie pas le saut de ligne final
+            "author": {"name": an, "email": ae, "date": ad},
+            "committer": {"name": cn, "email": ce, "date": cd},
+        },
+    }
+    return commit, branch_name(source)
+
+
+def log_frames(path: str, full_name: str, since: str = START_DATE, until: str = END_DATE,
+               batch_rows: int = BATCH_ROWS, heads: Optional[Dict[str, str]] = None,
+               members: Optional[Dict[str, List[str]]] = None) -> Iterator[pd.DataFrame]:
+    if members is None:
+        members = branch_members(path, heads if heads is not None else branch_heads(path), since=since, until=until)
+    commits: List[Dict[str, Any]] = []
+    branches: List[str] = []
+
+    def frame() -> pd.DataFrame:
+        for c in commits:
+            c["html_url"] = f"https://github.com/{full_name}/commit/{c['sha']}"
+        df = commits_frame(commits, columns=COLUMNS, repo_full_name=full_name)
+        df["branch"] = branches
+        # branche d'arrivée en premier, comme dans scrap_git_project
+        df["branches"] = [";".join([br] + [b for b in members.get(c["sha"], []) if b != br])
+                          for c, br in zip(commits, branches)]
+        return df
+
+    for commit, branch in iter_log(path, since=since, until=until):
+        commits.append(commit)
+        branches.append(branch)
+        if len(commits) >= batch_rows:
+            yield frame()
+            commits, branches = [], []
+    if commits:
+        yield frame()
+
+
+def main(full_name: str = REPO_FULL_NAME, url: Optional[str] = None, mirror: Optional[str] = None,
+         out_csv: str = OUT_CSV, fetch: bool = True, since: str = START_DATE, until: str = END_DATE,
+         db: Optional[str] = None) -> int:
+    mirror = mirror or mirror_path_for(full_name)
+    if fetch:
+        update_mirror(url or f"https://github.com/{full_name}.git", mirror)
+    heads = branch_heads(mirror)
+    print(f"Repo: {full_name} ({len(heads)} branches in {mirror})")
+
+    members = branch_members(mirror, heads, since=since, until=until)
+    fetched = 0
+    added = 0
+    with CommitStore(out_csv, key="sha", db=db) as store:
+        stored = {sha for sha in members if sha in store}
+        for df in log_frames(mirror, full_name, since=since, until=until, members=members):
+            fetched += len(df)
+            added += store.append(df)
+        # lignes déjà écrites : leur colonne `branches` ne bouge pas, l'index garde l'appartenance à jour
+        updated = store.add_members((sha, br) for sha in stored for br in members[sha])
+        store.add_members((sha, br) for sha, brs in members.items() if sha not in stored for br in brs)
+        total = len(store)
+    print(f"Read {fetched} commits, {added} new. Rows: {total} -> {out_csv}")
+    if updated:
+        print(f"{updated} new branch memberships for stored commits; "
+              f"`python commit_store.py compact {out_csv}` writes them to the branches column.")
+    return added
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Ingest commits from a local mirror clone instead of the GitHub API.")
+    parser.add_argument("repo", nargs="?", default=REPO_FULL_NAME, help="owner/name (default: %(default)s).")
+    parser.add_argument("--url", help="Clone URL (default: https://github.com/<repo>.git).")
+    parser.add_argument("--mirror", help=f"Mirror directory (default: {MIRRORS_DIR}/<owner>__<name>.git).")
+    parser.add_argument("-o", "--output", default=OUT_CSV, help="Output (default: %(default)s).")
+    parser.add_argument("--no-fetch", action="store_true", help="Read the mirror as is, without git fetch.")
+    parser.add_argument("--since", default=START_DATE, help="Committer date lower bound (default: %(default)s).")
+    parser.add_argument("--until", default=END_DATE, help="Committer date upper bound (default: %(default)s).")
+    parser.add_argument("--db", help="Also insert the new commits into this commit_db.py SQLite database.")
+    args = parser.parse_args()
+    main(args.repo, url=args.url, mirror=args.mirror, out_csv=args.output,
+         fetch=not args.no_fetch, since=args.since, until=args.until, db=args.db)
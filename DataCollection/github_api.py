@@ -0,0 +1,283 @@
+import os
+import threading
+import time
+from typing import List, Dict, Any, Iterator, Optional
+from urllib.parse import parse_qs, urlparse
+
+import requests
+
+from http_cache import DEFAULT_MAX_BYTES, HttpCache
+from metrics import METRICS
+
+# ----------------- CONFIG -----------------
+# GITHUB_API_URL : GitHub Enterprise, ou serveur local de benchmarks/bench_pipeline.py
+API_URL = os.environ.get("GITHUB_API_URL", "https://api.github.com").rstrip("/")
+GRAPHQL_URL = f"{API_URL}/graphql"
+PER_PAGE = 100
+MAX_PAGES = 500
+RATE_LIMIT_THRESHOLD = 10
+SLEEP_ON_RATE_LIMIT = 10
+
+
+class RateLimiter:
+    """Vue partagée (token bucket) du budget X-RateLimit-Remaining / X-RateLimit-Reset.
+
+    Chaque requête consomme un jeton via `acquire()`, et chaque réponse recale
+    le budget via `update()`. Quand le budget passe sous `threshold`, tous les
+    workers attendent le même reset au lieu de dormir chacun de leur côté.
+    """
+
+    def __init__(self, threshold: int = RATE_LIMIT_THRESHOLD,
+                 min_sleep: int = SLEEP_ON_RATE_LIMIT):
+        self.threshold = threshold
+        self.min_sleep = min_sleep
+        self.remaining: Optional[int] = None   # None = inconnu (pas encore de réponse)
+        self.reset = 0
+        self._resume_at = 0.0
+        self._cond = threading.Condition()
+
+    def acquire(self) -> None:
+        with self._cond:
+            while True:
+                now = time.time()
+                if now < self._resume_at:
+                    self._cond.wait(self._resume_at - now)
+                    METRICS.add("rate_limit_sleep_seconds", time.time() - now)
+                    continue
+                if self._resume_at or (self.reset and now >= self.reset):
+                    # fin de l'attente / nouvelle fenêtre : la prochaine réponse donnera le budget
+                    self._resume_at = 0.0
+                    self.remaining = None
+                if self.remaining is not None and self.remaining <= self.threshold:
+                    wait = max(self.min_sleep, self.reset - int(now) + 1)
+                    self._resume_at = now + wait
+                    print(f"[rate-limit] remaining={self.remaining}, sleeping {wait}s…")
+                    continue
+                if self.remaining is not None:
+                    self.remaining -= 1
+                return
+
+    def refund(self) -> None:
+        # un 304 ne consomme pas de quota chez GitHub
+        with self._cond:
+            if self.remaining is not None:
+                self.remaining += 1
+
+    def update(self, headers) -> None:
+        if "X-RateLimit-Remaining" not in headers:
+            return
+        remaining = int(headers.get("X-RateLimit-Remaining"))
+        reset = int(headers.get("X-RateLimit-Reset", "0"))
+        METRICS.observe_budget(remaining, reset)
+        with self._cond:
+            if reset != self.reset:
+                self.reset = reset
+                self.remaining = remaining
+            elif self.remaining is None or remaining < self.remaining:
+                # réponses concurrentes : on garde la vue la plus pessimiste
+                self.remaining = remaining
+            self._cond.notify_all()
+
+
+RATE_LIMITER = RateLimiter()
+HTTP_CACHE: Optional[HttpCache] = None
+
+
+def use_cache(path: Optional[str], max_bytes: int = DEFAULT_MAX_BYTES) -> Optional[HttpCache]:
+    """Active (ou désactive avec path=None) le cache ETag utilisé par github_get_all."""
+    global HTTP_CACHE
+    if HTTP_CACHE is not None:
+        HTTP_CACHE.close()
+    HTTP_CACHE = HttpCache(path, max_bytes=max_bytes) if path else None
+    return HTTP_CACHE
+
+
+def print_cache_stats() -> None:
+    if HTTP_CACHE is not None:
+        print(HTTP_CACHE.stats_line())
+
+
+def next_link(rr: requests.Response) -> Optional[str]:
+    return next_link_from_header(rr.headers.get("Link"))
+
+
+def next_link_from_header(link: Optional[str]) -> Optional[str]:
+    if link:
+        for part in link.split(","):
+            if 'rel="next"' in part:
+                return part.split(";")[0].strip().lstrip("<").rstrip(">")
+    return None
+
+
+def timed_request(session: requests.Session, method: str, url: str, **kwargs) -> requests.Response:
+    """Requête comptée dans METRICS (étape "fetch", latence, octets, statut)."""
+    with METRICS.stage("fetch"):
+        start = time.perf_counter()
+        rr = session.request(method, url, **kwargs)
+        METRICS.observe_request(rr.status_code, time.perf_counter() - start, len(rr.content))
+    return rr
+
+
+def iter_pages(session: requests.Session, url: str,
+               params: Optional[Dict[str, Any]] = None,
+               max_pages: int = MAX_PAGES,
+               limiter: Optional[RateLimiter] = None,
+               with_next: bool = False) -> Iterator[Any]:
+    """Rend le JSON de chaque page dès sa réception (liste, ou objet pour /compare…).
+
+    La page suivante n'est demandée que quand l'appelant a consommé la précédente :
+    la mémoire reste bornée à une page. Avec `with_next=True`, rend des couples
+    (page, URL de la page suivante ou None) : de quoi reprendre plus tard en
+    repassant cette URL (qui contient déjà les paramètres) comme `url`.
+    """
+    limiter = limiter or RATE_LIMITER
+    page = 1
+    params = dict(params or {})
+    if "?" not in url:
+        params.setdefault("per_page", PER_PAGE)
+
+    cache = HTTP_CACHE
+
+    while url and page <= max_pages:
+        page_params = (params or None) if page == 1 else None
+        cached = cache.lookup(url, page_params) if cache else None
+        limiter.acquire()
+        rr = timed_request(session, "GET", url, params=page_params,
+                           headers=cached.conditional_headers() if cached else None, timeout=60)
+        limiter.update(rr.headers)
+
+        # Gérer rate limit (y compris 403) : on réessaie la même page après le reset
+        if rr.status_code == 403 and rr.headers.get("X-RateLimit-Remaining") == "0":
+            METRICS.add("http_retries")
+            continue
+
+        if rr.status_code == 304 and cached:
+            limiter.refund()
+            cache.hit(url, page_params)
+            data = cached.json()
+            next_url = next_link_from_header(cached.link)
+        elif rr.status_code == 200:
+            if cache:
+                cache.store(url, page_params, rr)
+            data = rr.json()
+            next_url = next_link(rr)
+        else:
+            print(f"[warn] GET {url} page {page} -> {rr.status_code}; {rr.text[:200]}")
+            break
+
+        yield (data, next_url) if with_next else data
+
+        url = next_url
+        page += 1
+
+
+def get_text(session: requests.Session, url: str,
+             params: Optional[Dict[str, Any]] = None,
+             accept: Optional[str] = None,
+             limiter: Optional[RateLimiter] = None) -> Optional[str]:
+    """GET d'une réponse non paginée, lue comme texte (ex. media type "sha").
+
+    Même rate limit partagé, cache ETag, nouvel essai sur 403 et métriques que
+    iter_pages. None si la requête échoue.
+    """
+    limiter = limiter or RATE_LIMITER
+    cache = HTTP_CACHE
+    # une entrée de cache par media type : /commits/<ref> rend du JSON par défaut
+    cache_params = dict(params or {}, accept=accept) if accept else params
+    while True:
+        cached = cache.lookup(url, cache_params) if cache else None
+        headers = dict(cached.conditional_headers() if cached else {})
+        if accept:
+            headers["Accept"] = accept
+        limiter.acquire()
+        rr = timed_request(session, "GET", url, params=params, headers=headers, timeout=60)
+        limiter.update(rr.headers)
+        if rr.status_code == 403 and rr.headers.get("X-RateLimit-Remaining") == "0":
+            METRICS.add("http_retries")
+            continue
+        if rr.status_code == 304 and cached:
+            limiter.refund()
+            cache.hit(url, cache_params)
+            return cached.body.decode("utf-8")
+        if rr.status_code != 200:
+            print(f"[warn] GET {url} -> {rr.status_code}; {rr.text[:200]}")
+            return None
+        if cache:
+            cache.store(url, cache_params, rr)
+        return rr.text
+
+
+def last_page_from_header(link: Optional[str]) -> Optional[int]:
+    if link:
+        for part in link.split(","):
+            if 'rel="last"' in part:
+                query = parse_qs(urlparse(part.split(";")[0].strip().lstrip("<").rstrip(">")).query)
+                if query.get("page"):
+                    return int(query["page"][0])
+    return None
+
+
+def count_items(session: requests.Session, url: str,
+                params: Optional[Dict[str, Any]] = None,
+                limiter: Optional[RateLimiter] = None) -> Optional[int]:
+    """Nombre d'éléments d'une liste paginée, en une requête.
+
+    Avec per_page=1, le numéro de la page rel="last" du header Link est le nombre
+    d'éléments (sans Link : 0 ou 1 élément, tout tient dans la réponse).
+    None si la requête échoue.
+    """
+    limiter = limiter or RATE_LIMITER
+    while True:
+        limiter.acquire()
+        rr = timed_request(session, "GET", url, params=dict(params or {}, per_page=1), timeout=60)
+        limiter.update(rr.headers)
+        if rr.status_code == 403 and rr.headers.get("X-RateLimit-Remaining") == "0":
+            METRICS.add("http_retries")
+            continue
+        if rr.status_code != 200:
+            print(f"[warn] GET {url} (count) -> {rr.status_code}; {rr.text[:200]}")
+            return None
+        last = last_page_from_header(rr.headers.get("Link"))
+        return last if last is not None else len(rr.json())
+
+
+def github_get_all(session: requests.Session, url: str,
+                   params: Optional[Dict[str, Any]] = None,
+                   max_pages: int = MAX_PAGES,
+                   limiter: Optional[RateLimiter] = None) -> List[Dict[str, Any]]:
+    out: List[Dict[str, Any]] = []
+    for data in iter_pages(session, url, params=params, max_pages=max_pages, limiter=limiter):
+        if isinstance(data, list):
+            out.extend(data)
+        else:
+            out.append(data)
+    return out
+
+
+def graphql(session: requests.Session, query: str, variables: Optional[Dict[str, Any]] = None,
+            url: str = GRAPHQL_URL, limiter: Optional[RateLimiter] = None) -> Optional[Dict[str, Any]]:
+    """POST d'une requête GraphQL. Retourne `data` (éventuellement partiel) ou None en cas d'échec."""
+    limiter = limiter or RATE_LIMITER
+    while True:
+        limiter.acquire()
+        rr = timed_request(session, "POST", url, json={"query": query, "variables": variables or {}}, timeout=60)
+        limiter.update(rr.headers)
+
+        if rr.status_code == 403 and rr.headers.get("X-RateLimit-Remaining") == "0":
+            METRICS.add("http_retries")
+            continue
+
+        if rr.status_code != 200:
+            print(f"[warn] POST {url} -> {rr.status_code}; {rr.text[:200]}")
+            return None
+
+        payload = rr.json()
+        errors = payload.get("errors") or []
+        if any(e.get("type") == "RATE_LIMITED" for e in errors):
+            METRICS.add("http_retries")
+            limiter.update({"X-RateLimit-Remaining": "0",
+                            "X-RateLimit-Reset": rr.headers.get("X-RateLimit-Reset", "0")})
+            continue
+        for e in errors:
+            print(f"[warn] GraphQL {e.get('path')}: {e.get('message')}")
+        return payload.get("data")
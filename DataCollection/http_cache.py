@@ -0,0 +1,117 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Optional
+from urllib.parse import urlencode
+
+# Cache disque des réponses GitHub pour les requêtes conditionnelles.
+#
+# Pour chaque (URL, paramètres) on garde le corps JSON, l'ETag, Last-Modified
+# et le header Link (pagination). Au run suivant on renvoie If-None-Match /
+# If-Modified-Since : un 304 réutilise le corps en cache et ne compte pas dans
+# le rate limit GitHub. Taille bornée, éviction LRU sur la date de dernier accès.
+
+DEFAULT_MAX_BYTES = 200 * 1024 * 1024
+
+
+def cache_key(url: str, params: Optional[Dict[str, Any]] = None) -> str:
+    if not params:
+        return url
+    return url + "?" + urlencode(sorted((k, str(v)) for k, v in params.items()))
+
+
+class CachedResponse:
+    def __init__(self, etag: Optional[str], last_modified: Optional[str],
+                 link: Optional[str], body: bytes):
+        self.etag = etag
+        self.last_modified = last_modified
+        self.link = link
+        self.body = body
+
+    def json(self) -> Any:
+        return json.loads(self.body)
+
+    def conditional_headers(self) -> Dict[str, str]:
+        headers = {}
+        if self.etag:
+            headers["If-None-Match"] = self.etag
+        if self.last_modified:
+            headers["If-Modified-Since"] = self.last_modified
+        return headers
+
+
+class HttpCache:
+    """Cache SQLite partagé entre threads (un verrou autour de la connexion)."""
+
+    def __init__(self, path: str, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.hits = 0      # 304 servis depuis le cache
+        self.misses = 0    # 200 (nouveau contenu ou pas encore en cache)
+        self.evictions = 0
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        self.db.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            " key TEXT PRIMARY KEY, etag TEXT, last_modified TEXT, link TEXT,"
+            " body BLOB, size INTEGER, last_used REAL)"
+        )
+        self.db.execute("CREATE INDEX IF NOT EXISTS responses_lru ON responses (last_used)")
+        self.db.commit()
+
+    def close(self) -> None:
+        with self._lock:
+            self.db.close()
+
+    def lookup(self, url: str, params: Optional[Dict[str, Any]] = None) -> Optional[CachedResponse]:
+        key = cache_key(url, params)
+        with self._lock:
+            row = self.db.execute(
+                "SELECT etag, last_modified, link, body FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+        return CachedResponse(*row) if row else None
+
+    def hit(self, url: str, params: Optional[Dict[str, Any]] = None) -> None:
+        with self._lock:
+            self.hits += 1
+            self.db.execute("UPDATE responses SET last_used = ? WHERE key = ?",
+                            (time.time(), cache_key(url, params)))
+            self.db.commit()
+
+    def store(self, url: str, params: Optional[Dict[str, Any]], rr) -> None:
+        with self._lock:
+            self.misses += 1
+            etag = rr.headers.get("ETag")
+            last_modified = rr.headers.get("Last-Modified")
+            if not (etag or last_modified):
+                return
+            body = rr.content
+            self.db.execute(
+                "INSERT OR REPLACE INTO responses (key, etag, last_modified, link, body, size, last_used)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (cache_key(url, params), etag, last_modified, rr.headers.get("Link"),
+                 body, len(body), time.time()),
+            )
+            self._evict()
+            self.db.commit()
+
+    def _evict(self) -> None:
+        total = self.db.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        for key, size in self.db.execute(
+                "SELECT key, size FROM responses ORDER BY last_used").fetchall():
+            self.db.execute("DELETE FROM responses WHERE key = ?", (key,))
+            self.evictions += 1
+            total -= size
+            if total <= self.max_bytes:
+                break
+
+    def stats_line(self) -> str:
+        total = self.hits + self.misses
+        rate = (100.0 * self.hits / total) if total else 0.0
+        return (f"[http-cache] hits={self.hits} misses={self.misses} "
+                f"evictions={self.evictions} hit-rate={rate:.1f}% ({self.path})")
@@ -0,0 +1,220 @@
+import argparse
+import bisect
+import contextlib
+import json
+import os
+import threading
+import time
+from typing import Any, Dict, Iterator, List, Optional
+
+# Instrumentation de la collecte : un registre global (METRICS), comme RATE_LIMITER.
+#
+# github_api y note chaque requête (latence, octets, statut, retries, attente de
+# rate limit, budget restant), commit_batch les lignes parsées, commit_store et
+# cleaner les lignes écrites. `stage(nom)` chronomètre une étape (fetch, parse,
+# write, clean) ; avec --profile, chaque étape a son propre cProfile, activé
+# seulement pendant l'étape (les étapes imbriquées suspendent l'étape englobante),
+# et les stats sont écrites dans <dossier>/<étape>.prof.
+# Sorties : rapport JSON (--metrics-json) et textfile Prometheus (--metrics-prom),
+# à faire lire par le textfile collector de node_exporter.
+# Le profilage ne suit que le thread qui l'a lancé (workers de scrap_git_project exclus).
+
+PREFIX = "gitdash"
+# bornes (secondes) de l'histogramme de latence des requêtes
+LATENCY_BUCKETS = [0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0]
+MAX_BUDGET_POINTS = 10_000   # points gardés pour la courbe du budget
+PROFILE_TOP = 15             # fonctions les plus coûteuses recopiées dans le rapport JSON
+
+COUNTERS = {
+    "http_bytes": "Bytes downloaded from the GitHub API.",
+    "http_retries": "Requests retried after a rate-limit response.",
+    "rate_limit_sleep_seconds": "Time spent waiting for the rate-limit reset.",
+    "rows_parsed": "Commits parsed from API responses.",
+    "rows_written": "Rows appended to an output.",
+}
+
+
+class Metrics:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        with self._lock:
+            self.started_at = time.time()
+            self.counters: Dict[str, float] = {name: 0 for name in COUNTERS}
+            self.statuses: Dict[str, int] = {}
+            self.latency_buckets = [0] * (len(LATENCY_BUCKETS) + 1)   # dernier = +Inf
+            self.latency_sum = 0.0
+            self.latency_count = 0
+            self.budget: List[List[Any]] = []   # [secondes depuis le début, restant, reset]
+            self.stages: Dict[str, Dict[str, float]] = {}
+            self.profile_dir: Optional[str] = None
+            self._profiles: Dict[str, Any] = {}
+            self._active: List[Any] = []
+
+    # --- compteurs ---
+
+    def add(self, name: str, value: float = 1) -> None:
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def observe_request(self, status: int, seconds: float, nbytes: int) -> None:
+        with self._lock:
+            self.latency_buckets[bisect.bisect_left(LATENCY_BUCKETS, seconds)] += 1
+            self.latency_sum += seconds
+            self.latency_count += 1
+            self.statuses[str(status)] = self.statuses.get(str(status), 0) + 1
+            self.counters["http_bytes"] += nbytes
+
+    def observe_budget(self, remaining: int, reset: int) -> None:
+        with self._lock:
+            if self.budget and self.budget[-1][1:] == [remaining, reset]:
+                return
+            if len(self.budget) >= MAX_BUDGET_POINTS:
+                del self.budget[::2]   # on garde la forme de la courbe en divisant la résolution par 2
+            self.budget.append([round(time.time() - self.started_at, 3), remaining, reset])
+
+    # --- étapes et profilage ---
+
+    def enable_profiling(self, directory: str) -> None:
+        os.makedirs(directory, exist_ok=True)
+        self.profile_dir = directory
+
+    @contextlib.contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        profiler = None
+        if self.profile_dir and threading.current_thread() is threading.main_thread():
+            import cProfile
+            profiler = self._profiles.setdefault(name, cProfile.Profile())
+            if self._active:
+                self._active[-1].disable()
+            self._active.append(profiler)
+            profiler.enable()
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            if profiler is not None:
+                profiler.disable()
+                self._active.pop()
+                if self._active:
+                    self._active[-1].enable()
+            with self._lock:
+                st = self.stages.setdefault(name, {"calls": 0, "seconds": 0.0})
+                st["calls"] += 1
+                st["seconds"] += elapsed
+
+    def dump_profiles(self) -> Dict[str, Dict[str, Any]]:
+        import pstats
+
+        out = {}
+        for name, profiler in self._profiles.items():
+            path = os.path.join(self.profile_dir, f"{name}.prof")
+            profiler.dump_stats(path)
+            stats = pstats.Stats(profiler)
+            top = sorted(stats.stats.items(), key=lambda kv: kv[1][3], reverse=True)[:PROFILE_TOP]
+            out[name] = {
+                "path": path,
+                "top_cumulative": [
+                    {"function": f"{os.path.basename(file)}:{line}({func})", "calls": nc,
+                     "tottime": round(tt, 6), "cumtime": round(ct, 6)}
+                    for (file, line, func), (_, nc, tt, ct, _) in top
+                ],
+            }
+        return out
+
+    # --- exports ---
+
+    def report(self) -> Dict[str, Any]:
+        profiles = self.dump_profiles() if self._profiles else {}
+        with self._lock:
+            cumulative, buckets = 0, {}
+            for bound, n in zip(LATENCY_BUCKETS + ["+Inf"], self.latency_buckets):
+                cumulative += n
+                buckets[str(bound)] = cumulative
+            stages = {name: dict(st, seconds=round(st["seconds"], 6)) for name, st in self.stages.items()}
+            for name, profile in profiles.items():
+                stages.setdefault(name, {"calls": 0, "seconds": 0.0})["profile"] = profile
+            return {
+                "started_at": self.started_at,
+                "duration_seconds": round(time.time() - self.started_at, 3),
+                "counters": {k: round(v, 6) for k, v in self.counters.items()},
+                "requests": {
+                    "count": self.latency_count,
+                    "by_status": dict(self.statuses),
+                    "latency_seconds": {"sum": round(self.latency_sum, 6), "buckets": buckets},
+                },
+                "rate_limit_budget": {"columns": ["t", "remaining", "reset"], "points": list(self.budget)},
+                "stages": stages,
+            }
+
+    def prometheus(self) -> str:
+        with self._lock:
+            lines = []
+
+            def metric(name: str, kind: str, help_text: str, samples: List[tuple]) -> None:
+                lines.append(f"# HELP {PREFIX}_{name} {help_text}")
+                lines.append(f"# TYPE {PREFIX}_{name} {kind}")
+                for suffix, labels, value in samples:
+                    label = "{" + ",".join(f'{k}="{v}"' for k, v in labels.items()) + "}" if labels else ""
+                    text = str(value) if isinstance(value, int) else repr(float(value))
+                    lines.append(f"{PREFIX}_{name}{suffix}{label} {text}")
+
+            cumulative, samples = 0, []
+            for bound, n in zip(LATENCY_BUCKETS + ["+Inf"], self.latency_buckets):
+                cumulative += n
+                samples.append(("_bucket", {"le": bound}, cumulative))
+            samples += [("_sum", {}, self.latency_sum), ("_count", {}, self.latency_count)]
+            metric("http_request_duration_seconds", "histogram", "GitHub API request latency.", samples)
+            metric("http_requests_total", "counter", "GitHub API responses by status.",
+                   [("", {"status": s}, n) for s, n in sorted(self.statuses.items())])
+            for name, help_text in COUNTERS.items():
+                metric(f"{name}_total", "counter", help_text, [("", {}, self.counters.get(name, 0))])
+            if self.budget:
+                metric("rate_limit_remaining", "gauge", "Last X-RateLimit-Remaining seen.",
+                       [("", {}, self.budget[-1][1])])
+            metric("stage_seconds_total", "counter", "Wall time spent in each stage.",
+                   [("", {"stage": s}, st["seconds"]) for s, st in sorted(self.stages.items())])
+            metric("stage_calls_total", "counter", "Calls of each stage.",
+                   [("", {"stage": s}, st["calls"]) for s, st in sorted(self.stages.items())])
+            metric("run_start_timestamp_seconds", "gauge", "Start of the run (Unix time).",
+                   [("", {}, self.started_at)])
+            return "\n".join(lines) + "\n"
+
+    def write(self, json_path: Optional[str] = None, prom_path: Optional[str] = None) -> None:
+        # écriture atomique : le textfile collector ne doit jamais lire un fichier à moitié écrit
+        for path, text in ((json_path, lambda: json.dumps(self.report(), indent=2) + "\n"),
+                           (prom_path, self.prometheus)):
+            if not path:
+                continue
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            tmp = path + ".tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                f.write(text())
+            os.replace(tmp, path)
+
+
+METRICS = Metrics()
+
+
+def add_arguments(parser: argparse.ArgumentParser) -> None:
+    """Options communes aux scripts instrumentés."""
+    parser.add_argument("--metrics-json", help="Write a JSON run report (latencies, bytes, rows, budget…) here.")
+    parser.add_argument("--metrics-prom", help="Write the run metrics as a Prometheus textfile here.")
+    parser.add_argument("--profile", metavar="DIR",
+                        help="Profile each stage (fetch, parse, write, clean) with cProfile into DIR/<stage>.prof.")
+
+
+def start(args: argparse.Namespace) -> None:
+    METRICS.reset()
+    if args.profile:
+        METRICS.enable_profiling(args.profile)
+
+
+def finish(args: argparse.Namespace) -> None:
+    if args.metrics_json or args.metrics_prom or args.profile:
+        METRICS.write(args.metrics_json, args.metrics_prom)
+        if args.profile and not args.metrics_json:
+            METRICS.dump_profiles()   # le rapport JSON les écrit sinon
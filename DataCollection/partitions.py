@@ -0,0 +1,372 @@
+import argparse
+import csv
+import json
+import os
+import re
+import time
+import uuid
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+from urllib.parse import quote, unquote
+
+# Jeu de données partitionné façon Hive : <racine>/repo=<owner%2Fname>/month=<AAAA-MM>/part-*.csv
+#
+# Un lecteur qui ne veut qu'un repo ou qu'une période ne parcourt que les dossiers
+# correspondants : l'élagage se fait sur les noms, sans ouvrir de fichier.
+# Chaque écrivain a son identifiant et n'écrit que ses propres parts, jamais
+# modifiées ensuite : plusieurs scrapers remplissent le même jeu de données en
+# parallèle sans partager de fichier. Une part est écrite sous un nom temporaire
+# puis renommée, donc une part visible est complète. À côté de chaque part, un
+# petit JSON (lignes, premier et dernier jour) ; _manifest.json, à la racine, en
+# fait la synthèse par partition (parts, lignes, plage de dates).
+# Ligne sans repo ou sans date : partition __HIVE_DEFAULT_PARTITION__.
+#
+# Un jeu de données est un dossier qui en a la forme (_manifest.json ou dossiers
+# repo=*), ou, pour en créer un, un chemin terminé par "/" (ex. data/commits_history_cleaned/) :
+# sortie de cleaner.py et du CommitStore, entrée de cleaner.py, dashboard_cubes.py
+# et commit_db.py. Le manifeste est écrit dès la création du dossier, qui reste donc
+# reconnu sans le "/". Un chemin sans extension qui n'est ni l'un ni l'autre est refusé
+# plutôt que deviné : `-o data/out` ne crée pas d'arborescence par erreur.
+
+MANIFEST = "_manifest.json"
+MANIFEST_VERSION = 1
+DEFAULT_PARTITION = "__HIVE_DEFAULT_PARTITION__"
+
+BUFFER_ROWS = 50_000          # lignes gardées par partition avant d'écrire une part
+MAX_BUFFERED_ROWS = 500_000   # toutes partitions confondues
+
+# première colonne renseignée qui donne le jour d'une ligne (nettoyée ou brute)
+DAY_COLUMNS = ["commit_day", "commit_date", "committer_date", "author_date"]
+DAY_RE = re.compile(r"\d{4}-\d{2}-\d{2}")
+
+Partition = Tuple[str, str]   # (repo, mois)
+
+
+def is_dataset_dir(path) -> bool:
+    root = Path(path)
+    return root.is_dir() and ((root / MANIFEST).exists() or any(root.glob("repo=*")))
+
+
+def is_partitioned(path) -> bool:
+    """Jeu de données existant ou chemin terminé par "/" ; ValueError pour un autre chemin sans extension."""
+    text = str(path)
+    if text.endswith(("/", os.sep)) or is_dataset_dir(text):
+        return True
+    if Path(text).suffix == "" and not os.path.isfile(text):
+        raise ValueError(f"{text}: no file extension and not a partitioned dataset; name a file "
+                         f"(.csv, .csv.gz, .parquet, …) or end the path with '/' for a partitioned dataset")
+    return False
+
+
+def init_dataset(root) -> Path:
+    """Crée le dossier et son manifeste (vide) s'il n'existe pas encore ; rend le chemin sans "/" final."""
+    root = Path(root)
+    root.mkdir(parents=True, exist_ok=True)
+    if not (root / MANIFEST).exists():
+        refresh_manifest(root)
+    return root
+
+
+def row_day(row: Dict[str, Any]) -> str:
+    """Jour AAAA-MM-JJ de la ligne (texte du CSV, date ou Timestamp pandas) ; "" si inconnu."""
+    for col in DAY_COLUMNS:
+        value = row.get(col)
+        if value is None:
+            continue
+        text = value.isoformat() if hasattr(value, "isoformat") else str(value)
+        if DAY_RE.match(text):
+            return text[:10]
+    return ""
+
+
+def partition_of(row: Dict[str, Any]) -> Partition:
+    repo = row.get("repo_full_name")
+    day = row_day(row)
+    return (repo if isinstance(repo, str) and repo else DEFAULT_PARTITION,
+            day[:7] if day else DEFAULT_PARTITION)
+
+
+def partition_path(root, partition: Partition) -> Path:
+    repo, month = partition
+    return Path(root) / f"repo={quote(repo, safe='')}" / f"month={month}"
+
+
+def day_bounds(since: Optional[str], until: Optional[str]) -> Tuple[str, str]:
+    """Bornes incluses AAAA-MM-JJ ("" : pas de borne) ; "AAAA-MM" va jusqu'à la fin du mois."""
+    return since or "", (until + "-31" if until and len(until) == 7 else until or "")
+
+
+def row_filter(repos: Optional[Iterable[str]] = None, since: Optional[str] = None,
+               until: Optional[str] = None) -> Optional[Callable[[Dict[str, Any]], bool]]:
+    """Test ligne à ligne des filtres repo / jour (bornes incluses) ; None sans filtre."""
+    if not (repos or since or until):
+        return None
+    wanted = set(repos) if repos else None
+    first, last = day_bounds(since, until)
+
+    def keep(row: Dict[str, Any]) -> bool:
+        if wanted is not None and row.get("repo_full_name") not in wanted:
+            return False
+        if first or last:
+            day = row_day(row)
+            return bool(day) and (not first or day >= first) and (not last or day <= last)
+        return True
+
+    return keep
+
+
+def partitions(root, repos: Optional[Iterable[str]] = None, since: Optional[str] = None,
+               until: Optional[str] = None) -> List[Tuple[Partition, Path]]:
+    """Partitions qui peuvent contenir des lignes du filtre, avec leur dossier."""
+    wanted = set(repos) if repos else None
+    found = []
+    for repo_dir in sorted(Path(root).glob("repo=*")):
+        repo = unquote(repo_dir.name[len("repo="):])
+        if wanted is not None and repo not in wanted:
+            continue
+        for month_dir in sorted(repo_dir.glob("month=*")):
+            month = month_dir.name[len("month="):]
+            if since or until:
+                if month == DEFAULT_PARTITION:
+                    continue
+                if (since and month < since[:7]) or (until and month > until[:7]):
+                    continue
+            found.append(((repo, month), month_dir))
+    return found
+
+
+def part_files(root, repos: Optional[Iterable[str]] = None, since: Optional[str] = None,
+               until: Optional[str] = None) -> List[Path]:
+    return [part for _, directory in partitions(root, repos, since, until)
+            for part in sorted(directory.glob("part-*.csv"))]
+
+
+def expand(paths: Iterable[Path]) -> List[Path]:
+    """Remplace chaque jeu de données partitionné par ses parts (les fichiers restent tels quels)."""
+    files: List[Path] = []
+    for path in paths:
+        files.extend(part_files(path) if path.is_dir() and is_partitioned(path) else [path])
+    return files
+
+
+def iter_rows(root, repos: Optional[Iterable[str]] = None, since: Optional[str] = None,
+              until: Optional[str] = None) -> Iterator[Dict[str, str]]:
+    """Lignes (texte du CSV) des partitions retenues, filtrées aussi ligne à ligne (jour exact)."""
+    keep = row_filter(None, since, until)
+    for part in part_files(root, repos, since, until):
+        with part.open("r", newline="", encoding="utf-8") as f:
+            rows = csv.DictReader(f)
+            yield from (filter(keep, rows) if keep else rows)
+
+
+def read_frame(root, repos: Optional[Iterable[str]] = None, since: Optional[str] = None,
+               until: Optional[str] = None):
+    """Comme iter_rows, dans un DataFrame (colonnes texte) : pour le notebook."""
+    import pandas as pd
+
+    return pd.DataFrame.from_records(iter_rows(root, repos, since, until))
+
+
+def _write_json(path: Path, data: Dict[str, Any]) -> None:
+    tmp = path.with_name(f".{path.name}.{uuid.uuid4().hex[:8]}.tmp")
+    with tmp.open("w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False, indent=1)
+    os.replace(tmp, path)
+
+
+def part_stats(part: Path) -> Dict[str, Any]:
+    """Lignes et plage de jours d'une part (JSON voisin, ou relecture de la part s'il manque)."""
+    try:
+        with part.with_suffix(".json").open("r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        pass
+    with part.open("r", newline="", encoding="utf-8") as f:
+        days = [row_day(row) for row in csv.DictReader(f)]
+    return _stats(days)
+
+
+def _stats(days: List[str]) -> Dict[str, Any]:
+    known = [d for d in days if d]
+    return {"rows": len(days), "min_day": min(known, default=None), "max_day": max(known, default=None)}
+
+
+def refresh_manifest(root) -> Dict[str, Any]:
+    """Reconstruit _manifest.json depuis les parts présentes (et leurs JSON)."""
+    entries = []
+    for (repo, month), directory in partitions(root):
+        stats = [part_stats(part) for part in sorted(directory.glob("part-*.csv"))]
+        if not stats:
+            continue
+        days = [d for s in stats for d in (s["min_day"], s["max_day"]) if d]
+        entries.append({
+            "repo": repo,
+            "month": month,
+            "path": partition_path("", (repo, month)).as_posix(),
+            "parts": len(stats),
+            "rows": sum(s["rows"] for s in stats),
+            "min_day": min(days, default=None),
+            "max_day": max(days, default=None),
+        })
+    manifest = {
+        "version": MANIFEST_VERSION,
+        "rows": sum(e["rows"] for e in entries),
+        "partitions": entries,
+    }
+    Path(root).mkdir(parents=True, exist_ok=True)
+    _write_json(Path(root) / MANIFEST, manifest)
+    return manifest
+
+
+def read_manifest(root) -> Dict[str, Any]:
+    try:
+        with (Path(root) / MANIFEST).open("r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return refresh_manifest(root)
+
+
+class PartitionWriter:
+    """Parts d'un écrivain, rendues visibles ensemble par commit() (cf. en-tête du module)."""
+
+    def __init__(self, root, columns: Optional[List[str]] = None):
+        self.root = Path(root)
+        self.columns = columns
+        # horodaté d'abord : l'ordre des noms de parts suit celui des écrivains
+        self.id = time.strftime("%Y%m%dT%H%M%S") + "-" + uuid.uuid4().hex[:8]
+        self.seq = 0
+        self.buffers: Dict[Partition, List[Dict[str, Any]]] = {}
+        self.buffered = 0
+        self.staged: List[Tuple[Path, Path, Dict[str, Any]]] = []   # (temporaire, part, stats)
+        init_dataset(self.root)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, *exc):
+        if exc_type is None:
+            self.commit()
+        else:
+            self.discard()
+
+    def _new_part(self, partition: Partition) -> Tuple[Path, Path]:
+        directory = partition_path(self.root, partition)
+        directory.mkdir(parents=True, exist_ok=True)
+        part = directory / f"part-{self.id}-{self.seq:05d}.csv"
+        self.seq += 1
+        return part.with_name(part.name + ".tmp"), part
+
+    def write_row(self, row: Dict[str, Any]) -> None:
+        partition = partition_of(row)
+        rows = self.buffers.setdefault(partition, [])
+        rows.append(row)
+        self.buffered += 1
+        if len(rows) >= BUFFER_ROWS:
+            self._flush(partition)
+        elif self.buffered >= MAX_BUFFERED_ROWS:
+            self.flush()
+
+    def write_rows(self, rows: Iterable[Dict[str, Any]]) -> None:
+        for row in rows:
+            self.write_row(row)
+
+    def _flush(self, partition: Partition) -> None:
+        rows = self.buffers.pop(partition)
+        self.buffered -= len(rows)
+        tmp, part = self._new_part(partition)
+        with tmp.open("w", newline="", encoding="utf-8") as f:
+            writer = csv.DictWriter(f, fieldnames=self.columns or list(rows[0]))
+            writer.writeheader()
+            writer.writerows(rows)
+        self.staged.append((tmp, part, _stats([row_day(row) for row in rows])))
+
+    def flush(self) -> None:
+        for partition in list(self.buffers):
+            self._flush(partition)
+
+    def write_frame(self, df) -> None:
+        """Une part par partition touchée, au format de DataFrame.to_csv (comme le CommitStore CSV)."""
+        records = df.to_dict("records")
+        groups: Dict[Partition, List[int]] = {}
+        days = []
+        for i, row in enumerate(records):
+            days.append(row_day(row))
+            groups.setdefault(partition_of(row), []).append(i)
+        for partition, positions in groups.items():
+            tmp, part = self._new_part(partition)
+            df.iloc[positions].to_csv(tmp, index=False, columns=self.columns)
+            self.staged.append((tmp, part, _stats([days[i] for i in positions])))
+
+    def commit(self, replace: bool = False, refresh: bool = True) -> int:
+        """Rend visibles les parts écrites ; `replace` retire ensuite toutes les parts plus anciennes."""
+        self.flush()
+        old = part_files(self.root) if replace else []
+        rows = 0
+        for tmp, part, stats in self.staged:
+            # le JSON d'abord : une part visible a toujours ses stats
+            _write_json(part.with_suffix(".json"), stats)
+            os.replace(tmp, part)
+            rows += stats["rows"]
+        self.staged = []
+        for part in old:
+            part.unlink()
+            part.with_suffix(".json").unlink(missing_ok=True)
+        if replace:
+            for _, directory in partitions(self.root):
+                if not any(directory.iterdir()):
+                    directory.rmdir()
+            for repo_dir in self.root.glob("repo=*"):
+                if not any(repo_dir.iterdir()):
+                    repo_dir.rmdir()
+        if refresh:
+            refresh_manifest(self.root)
+        return rows
+
+    def discard(self) -> None:
+        for tmp, _, _ in self.staged:
+            tmp.unlink(missing_ok=True)
+        self.staged = []
+        self.buffers = {}
+        self.buffered = 0
+
+
+def split(source: Path, root: Path) -> int:
+    """Répartit un CSV existant (brut ou nettoyé) en partitions ; les parts déjà là sont remplacées."""
+    with source.open("r", newline="", encoding="utf-8-sig") as f:
+        reader = csv.DictReader(f)
+        writer = PartitionWriter(root, columns=reader.fieldnames)
+        writer.write_rows(reader)
+    return writer.commit(replace=True)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Hive-style repo=/month= partitioned commit datasets.")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("manifest", help="Print (and rebuild) the manifest of a partitioned dataset.")
+    p.add_argument("root", help="Partitioned dataset directory (e.g. data/commits_history_cleaned/).")
+    p.add_argument("--repo", action="append", help="Only this repo_full_name (repeatable).")
+    p.add_argument("--since", help="First day or month (YYYY-MM-DD / YYYY-MM).")
+    p.add_argument("--until", help="Last day or month (YYYY-MM-DD / YYYY-MM).")
+
+    p = sub.add_parser("split", help="Split an existing CSV into a partitioned dataset.")
+    p.add_argument("source", help="CSV file (e.g. data/commits_history.csv).")
+    p.add_argument("root", help="Partitioned dataset directory to write.")
+    args = parser.parse_args()
+
+    if args.command == "split":
+        rows = split(Path(args.source), Path(args.root))
+        print(f"Split {rows} rows of {args.source} into {len(partitions(args.root))} partitions under {args.root}")
+        return
+
+    manifest = refresh_manifest(args.root)
+    kept = {partition for partition, _ in partitions(args.root, args.repo, args.since, args.until)}
+    entries = [e for e in manifest["partitions"] if (e["repo"], e["month"]) in kept]
+    for e in entries:
+        print(f"{e['repo']:40} {e['month']:8} {e['rows']:>9} rows  {e['parts']:>4} parts  "
+              f"{e['min_day'] or '-'} .. {e['max_day'] or '-'}")
+    print(f"{len(entries)} partitions, {sum(e['rows'] for e in entries)} rows")
+
+
+if __name__ == "__main__":
+    main()
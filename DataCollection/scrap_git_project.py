@@ -1,37 +1,19 @@
-import os
 import sys
-import time
-import importlib.util
+import argparse
+from concurrent.futures import ThreadPoolExecutor
 import requests
-import pandas as pd
-from typing import List, Dict, Any, Optional
-
-# ----------------- CONFIG -----------------
-secrets_path = os.path.join(os.path.dirname(__file__), ".secrets.py")
-spec = importlib.util.spec_from_file_location("project_secrets", secrets_path)
-project_secrets = importlib.util.module_from_spec(spec)
-spec.loader.exec_module(project_secrets)
-
-GITHUB_TOKEN = getattr(project_secrets, "GITHUB_TOKEN", None)
-GITHUB_LOGIN = getattr(project_secrets, "GITHUB_LOGIN", None)
-
-if not (GITHUB_TOKEN and GITHUB_LOGIN):
-    print("Error: GITHUB_TOKEN and GITHUB_LOGIN must be set in .secrets.py.")
-    sys.exit(1)
-
-SESSION = requests.Session()
-SESSION.headers.update({
-    "Authorization": f"Bearer {GITHUB_TOKEN}",
-    "Accept": "application/vnd.github.v3+json",
-    "User-Agent": GITHUB_LOGIN,
-})
-
-# Test token
-r = SESSION.get("https://api.github.com/user", timeout=30)
-if r.status_code != 200:
-    print("Error: Invalid GITHUB_TOKEN or GITHUB_LOGIN.")
-    print(r.status_code, r.text[:200])
-    sys.exit(1)
+from typing import TYPE_CHECKING, List, Dict, Any, Iterator, Optional, Set, Tuple
+from urllib.parse import quote
+
+import credentials
+import github_api
+import metrics
+from commit_batch import BRANCH_COLUMNS, commits_frame
+from scrape_state import (Checkpoint, ScrapeState, checkpoint_path_for, later,
+                          newest_commit_date, state_path_for)
+
+if TYPE_CHECKING:
+    import pandas as pd
 
 # ------------ PARAMS À ADAPTER ------------
 REPO_FULL_NAME = "Samuel-Chapuis/CS-NFTM-Fork"  # <-- ex: "Samuel-Chapuis/mon-repo"
@@ -42,192 +24,294 @@ END_DATE   = "2026-02-01T23:59:59Z"
 
 PER_PAGE = 100
 MAX_PAGES = 500
-RATE_LIMIT_THRESHOLD = 10
-SLEEP_ON_RATE_LIMIT = 10
+WORKERS = 1   # branches récupérées en parallèle (1 = séquentiel)
+HTTP_CACHE_PATH = "data/http_cache.sqlite"   # None pour désactiver le cache ETag
 
+# Session créée (et token vérifié, cf. credentials) au premier appel réseau, pas à l'import
+SESSION: Optional[requests.Session] = None
 
-def github_get_all(url: str, params: Optional[Dict[str, Any]] = None,
-                   max_pages: int = MAX_PAGES) -> List[Dict[str, Any]]:
-    out: List[Dict[str, Any]] = []
-    page = 1
-    params = dict(params or {})
-    params.setdefault("per_page", PER_PAGE)
-
-    while url and page <= max_pages:
-        rr = SESSION.get(url, params=params if page == 1 else None, timeout=60)
-
-        remaining = int(rr.headers.get("X-RateLimit-Remaining", "1000"))
-        reset = int(rr.headers.get("X-RateLimit-Reset", "0"))
-
-        # Gérer rate limit (y compris 403)
-        if rr.status_code == 403 and remaining == 0:
-            wait = max(SLEEP_ON_RATE_LIMIT, reset - int(time.time()) + 1)
-            print(f"[rate-limit] sleeping {wait}s…")
-            time.sleep(wait)
-            continue
-
-        if remaining <= RATE_LIMIT_THRESHOLD:
-            wait = max(SLEEP_ON_RATE_LIMIT, reset - int(time.time()) + 1)
-            print(f"[rate-limit] remaining={remaining}, sleeping {wait}s…")
-            time.sleep(wait)
-            continue
-
-        if rr.status_code != 200:
-            print(f"[warn] GET {url} page {page} -> {rr.status_code}; {rr.text[:200]}")
-            break
-
-        data = rr.json()
-        if isinstance(data, list):
-            out.extend(data)
-        else:
-            out.append(data)
-
-        # parse Link header for next page
-        link = rr.headers.get("Link", "")
-        next_url = None
-        if link:
-            for part in link.split(","):
-                if 'rel="next"' in part:
-                    next_url = part.split(";")[0].strip().lstrip("<").rstrip(">")
-        url = next_url
-        page += 1
-
-    return out
 
+def get_session() -> requests.Session:
+    global SESSION
+    if SESSION is None:
+        SESSION = credentials.github_session()
+    return SESSION
 
-def fetch_branches(full_name: str) -> List[str]:
-    url = f"https://api.github.com/repos/{full_name}/branches"
-    branches = github_get_all(url, params={"per_page": PER_PAGE}, max_pages=50)
-    return [b["name"] for b in branches if "name" in b]
+# `branch` = branche où le commit a été vu en premier (branche par défaut pour
+# l'historique commun) ; `branches` = toutes les branches qui le contiennent, séparées par ";".
+# La colonne est figée à la première écriture de la ligne : l'appartenance est aussi notée
+# dans l'index du CommitStore (tables `members` et `parents`), à chaque passage et pour
+# toutes les lignes vues, et la merge base d'une branche y marque ses ancêtres déjà
+# stockés. `commit_store.py compact` reporte ensuite ces branches dans la colonne.
+COLUMNS = BRANCH_COLUMNS + ["branches"]
 
 
-def fetch_commits_for_branch(full_name: str, branch: str) -> List[Dict[str, Any]]:
-    url = f"https://api.github.com/repos/{full_name}/commits"
-    params = {
-        "sha": branch,          # IMPORTANT: branche ciblée
-        "since": START_DATE,
-        "until": END_DATE,
-        "per_page": PER_PAGE
-        # PAS de filtre "author" => tous les membres
-    }
-    return github_get_all(url, params=params, max_pages=MAX_PAGES)
-
-
-def parse_commit(row: Dict[str, Any], repo_full_name: str, branch: str) -> Dict[str, Any]:
-    commit = row.get("commit") or {}
-    author_user = row.get("author") or {}      # compte GitHub (peut être None)
-    committer_user = row.get("committer") or {}
-    parents = row.get("parents") or []
-    is_merge = (len(parents) > 1)
-
-    author_block = commit.get("author") or {}
-    committer_block = commit.get("committer") or {}
-
-    author_date = author_block.get("date")
-    committer_date = committer_block.get("date")
-    commit_date = author_date or committer_date
-
-    commit_day = None
-    commit_hour = None
-    if commit_date:
-        try:
-            commit_day = commit_date.split("T")[0]
-        except Exception:
-            pass
-        try:
-            dt = pd.to_datetime(commit_date, utc=True, errors="coerce")
-            if not pd.isna(dt):
-                commit_hour = int(dt.hour)
-        except Exception:
-            pass
-
-    return {
-        "repo_full_name": repo_full_name,
-        "branch": branch,
-        "sha": row.get("sha"),  # <-- crucial pour dedup
-        "html_url": row.get("html_url"),
-        "message": commit.get("message"),
-
-        # Qui ?
-        "author_login": author_user.get("login"),
-        "author_name": author_block.get("name"),
-        "author_email": author_block.get("email"),
-        "committer_login": committer_user.get("login"),
-        "committer_name": committer_block.get("name"),
-        "committer_email": committer_block.get("email"),
-
-        # Quand ?
-        "author_date": author_date,
-        "committer_date": committer_date,
-        "commit_date": commit_date,
-        "commit_day": commit_day,
-        "commit_hour": commit_hour,
-
-        "is_merge": is_merge,
-    }
-
+def github_get_all(url: str, params: Optional[Dict[str, Any]] = None,
+                   max_pages: int = MAX_PAGES) -> List[Dict[str, Any]]:
+    # pagination, rate limit partagé entre workers (cf. --workers) et cache ETag : cf. github_api
+    return github_api.github_get_all(get_session(), url, params=params, max_pages=max_pages)
 
-from pandas.errors import EmptyDataError
 
-def append_dedup(df_new: pd.DataFrame, out_path: str, key: str = "sha") -> int:
-    os.makedirs(os.path.dirname(out_path), exist_ok=True)
+def github_iter_pages(url: str, params: Optional[Dict[str, Any]] = None,
+                      max_pages: int = MAX_PAGES, with_next: bool = False) -> Iterator[Any]:
+    return github_api.iter_pages(get_session(), url, params=params, max_pages=max_pages, with_next=with_next)
 
-    df_old = None
-    if os.path.exists(out_path) and os.path.getsize(out_path) > 0:
-        try:
-            df_old = pd.read_csv(out_path, low_memory=False)
-        except EmptyDataError:
-            # Fichier présent mais invalide/vidé -> on repart de zéro
-            df_old = None
-        except Exception as e:
-            print(f"[warn] Could not read existing CSV ({out_path}): {e}")
-            df_old = None
 
-    if df_old is not None and len(df_old.columns) > 0:
-        df_all = pd.concat([df_old, df_new], ignore_index=True)
-    else:
-        df_all = df_new.copy()
+def fetch_branch_heads(full_name: str) -> Dict[str, Optional[str]]:
+    url = f"{github_api.API_URL}/repos/{full_name}/branches"
+    branches = github_get_all(url, params={"per_page": PER_PAGE}, max_pages=50)
+    return {b["name"]: (b.get("commit") or {}).get("sha") for b in branches if "name" in b}
 
-    if key in df_all.columns:
-        df_all = df_all.drop_duplicates(subset=[key], keep="last")
 
-    for col in ["author_date", "committer_date", "commit_date"]:
-        if col in df_all.columns:
-            df_all[col] = pd.to_datetime(df_all[col], utc=True, errors="coerce")
+def fetch_branches(full_name: str) -> List[str]:
+    return list(fetch_branch_heads(full_name))
 
-    if "commit_day" in df_all.columns:
-        df_all["commit_day"] = pd.to_datetime(df_all["commit_day"], errors="coerce").dt.date
 
-    if "commit_hour" in df_all.columns:
-        df_all["commit_hour"] = pd.to_numeric(df_all["commit_hour"], errors="coerce").astype(pd.Int64Dtype())
+def fetch_default_branch(full_name: str) -> Optional[str]:
+    repo = github_get_all(f"{github_api.API_URL}/repos/{full_name}", max_pages=1)
+    return repo[0].get("default_branch") if repo else None
 
-    df_all.to_csv(out_path, index=False)
-    return len(df_all)
 
+def iter_branch_pages(full_name: str, branch: str, since: str = START_DATE,
+                      resume_url: Optional[str] = None, with_next: bool = False) -> Iterator[Any]:
+    if resume_url:
+        # URL "next" d'un checkpoint : elle contient déjà sha/since/until/page
+        return github_iter_pages(resume_url, max_pages=MAX_PAGES, with_next=with_next)
+    url = f"{github_api.API_URL}/repos/{full_name}/commits"
+    params = {
+        "sha": branch,          # IMPORTANT: branche ciblée
+        "since": since,
+        "until": END_DATE,
+        "per_page": PER_PAGE
+        # PAS de filtre "author" => tous les membres
+    }
+    return github_iter_pages(url, params=params, max_pages=MAX_PAGES, with_next=with_next)
+
+
+def fetch_commits_for_branch(full_name: str, branch: str,
+                             since: str = START_DATE) -> List[Dict[str, Any]]:
+    return [c for page in iter_branch_pages(full_name, branch, since=since) for c in page]
+
+
+def commit_date_of(c: Dict[str, Any]) -> Optional[str]:
+    commit = c.get("commit") or {}
+    return (commit.get("committer") or {}).get("date") or (commit.get("author") or {}).get("date")
+
+
+def page_frame(commits: List[Dict[str, Any]], branch: str) -> "pd.DataFrame":
+    return commits_frame(commits, columns=COLUMNS, repo_full_name=REPO_FULL_NAME, branch=branch)
+
+
+def parent_pairs(commits: List[Dict[str, Any]]) -> List[Tuple[str, str]]:
+    return [(c["sha"], p["sha"]) for c in commits if c.get("sha")
+            for p in c.get("parents") or [] if p.get("sha")]
+
+
+def record_members(store, df: "pd.DataFrame") -> int:
+    """Note dans l'index l'appartenance de toutes les lignes de `df` (avant l'append) ;
+    rend le nombre de paires nouvelles pour des lignes déjà écrites."""
+    pairs = [(sha, b) for sha, label in zip(df["sha"], df["branches"]) for b in label.split(";") if b]
+    stored = {sha for sha, _ in pairs if sha in store}
+    updated = store.add_members(pair for pair in pairs if pair[0] in stored)
+    store.add_members(pair for pair in pairs if pair[0] not in stored)
+    return updated
+
+
+def fetch_branch_unique(full_name: str, base: str, branch: str, since: str = START_DATE
+                        ) -> Optional[Tuple[List["pd.DataFrame"], Optional[str], Optional[str], List[Tuple[str, str]]]]:
+    """Commits de `branch` absents de `base` (endpoint compare) :
+    (lignes, merge base, date la plus récente, paires (SHA, parent)).
+
+    Chaque page est convertie en DataFrame dès réception. Retourne None si la
+    comparaison échoue (pas d'ancêtre commun…).
+    """
+    url = f"{github_api.API_URL}/repos/{full_name}/compare/{quote(base, safe='')}...{quote(branch, safe='')}"
+    frames: List["pd.DataFrame"] = []
+    parents: List[Tuple[str, str]] = []
+    merge_base = None
+    newest = None
+    ok = False
+    for page in github_iter_pages(url, params={"per_page": PER_PAGE}, max_pages=MAX_PAGES):
+        if "commits" not in page:
+            return None
+        ok = True
+        merge_base = merge_base or (page.get("merge_base_commit") or {}).get("sha")
+        # compare ne filtre pas par date : même fenêtre que /commits?since=&until=
+        commits = [c for c in page["commits"] if since <= (commit_date_of(c) or "") <= END_DATE]
+        if commits:
+            # compare liste du plus ancien au plus récent, /commits l'inverse
+            frames.append(page_frame(commits[::-1], branch))
+            parents.extend(parent_pairs(commits))
+            newest = later(newest, newest_commit_date(commits))
+    if not ok:
+        return None
+    frames.reverse()
+    return frames, merge_base, newest, parents
+
+
+def fetch_branch_rows(br: str, since: str, i: int, n: int,
+                      default: Optional[str] = None):
+    """Commits propres de `br` par rapport à la branche par défaut (None => branche à parcourir en entier)."""
+    print(f"[{i}/{n}] Compare '{default}...{br}' ({since} → {END_DATE})…")
+    unique = fetch_branch_unique(REPO_FULL_NAME, default, br, since=since)
+    if unique is None:
+        print(f"[warn] Compare {default}...{br} failed; paging the whole branch.")
+    return unique
+
+
+def main(workers: int = WORKERS, full: bool = False,
+         cache_path: Optional[str] = HTTP_CACHE_PATH, resume: bool = False, db: Optional[str] = None):
+    from commit_store import CommitStore   # pandas : seulement au lancement du scraping
+
+    state = ScrapeState(state_path_for(OUT_CSV))
+    checkpoint = Checkpoint(checkpoint_path_for(OUT_CSV), resume=resume)
+    github_api.use_cache(cache_path)
 
-def main():
     print(f"Repo: {REPO_FULL_NAME}")
     print("Listing branches…")
-    branches = fetch_branches(REPO_FULL_NAME)
-    print(f"Found {len(branches)} branches.")
-
-    total_rows = 0
-    all_rows = []
-
-    for i, br in enumerate(branches, 1):
-        print(f"[{i}/{len(branches)}] Fetch commits on branch '{br}' ({START_DATE} → {END_DATE})…")
-        commits = fetch_commits_for_branch(REPO_FULL_NAME, br)
-        if not commits:
-            continue
-        rows = [parse_commit(c, REPO_FULL_NAME, br) for c in commits]
-        all_rows.extend(rows)
-        total_rows += len(rows)
-
-    df = pd.DataFrame(all_rows)
-    print(f"Fetched {total_rows} rows (before dedup). Writing…")
-    total_now = append_dedup(df, OUT_CSV, key="sha")
-    print(f"Done. CSV rows after dedup: {total_now} -> {OUT_CSV}")
+    default = fetch_default_branch(REPO_FULL_NAME)
+    heads = fetch_branch_heads(REPO_FULL_NAME)
+    branches = [br for br in heads
+                if full or not state.is_unchanged(REPO_FULL_NAME, br, heads[br])]
+    print(f"Found {len(heads)} branches ({len(heads) - len(branches)} unchanged since last run), "
+          f"default: {default}.")
+    sinces = {br: START_DATE if full else state.since(REPO_FULL_NAME, br, START_DATE) for br in branches}
+    done = [br for br in branches if checkpoint.is_done(br)]
+    if done:
+        print(f"{len(done)} branches done before the interruption, skipping them.")
+
+    # 1) branches secondaires : seulement leurs commits propres (compare), peu volumineux
+    others = [br for br in branches if default and br != default]
+    todo = [br for br in others if br not in done]
+    n = len(todo)
+    if workers > 1:
+        adapter = requests.adapters.HTTPAdapter(pool_maxsize=workers)
+        get_session().mount("https://", adapter)
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            # map() rend les résultats dans l'ordre des branches => mêmes lignes qu'en séquentiel
+            results = list(pool.map(fetch_branch_rows, todo, [sinces[br] for br in todo],
+                                    range(1, n + 1), [n] * n, [default] * n))
+    else:
+        results = [fetch_branch_rows(br, sinces[br], i, n, default) for i, br in enumerate(todo, 1)]
+    unique = {br: r for br, r in zip(todo, results) if r is not None}
+
+    # 2) puis, page par page, l'historique de la branche par défaut (et des branches sans ancêtre commun)
+    streamed = [br for br in branches if br not in unique and br not in done]
+    streamed.sort(key=lambda br: br != default)
+
+    # appartenance : commits propres de chaque branche + historique commun jusqu'à sa merge base
+    members: Dict[str, List[str]] = {}
+    # SHA de la branche par défaut -> branches qui l'atteignent (front sauvegardé dans le checkpoint)
+    reach: Dict[str, Set[str]] = {sha: set(brs) for sha, brs in (checkpoint.data.get("reach") or {}).items()}
+    for br, (frames, merge_base, _, _) in unique.items():
+        for df in frames:
+            for sha in df["sha"]:
+                members.setdefault(sha, []).append(br)
+        if merge_base:
+            reach.setdefault(merge_base, set()).add(br)
+
+    def save_progress(br: str, since: str, next_url: Optional[str], newest: Optional[str]) -> None:
+        checkpoint.data["reach"] = {sha: sorted(brs) for sha, brs in reach.items()}
+        checkpoint.page(br, since, next_url, newest)
+
+    def finish(br: str, newest: Optional[str]) -> None:
+        # curseur enregistré seulement une fois toute la branche écrite
+        checkpoint.finish(br, newest)
+        state.record(REPO_FULL_NAME, br, heads[br], newest)
+        state.save()
+
+    fetched = 0
+    added = 0
+    updated = 0
+    with CommitStore(OUT_CSV, key="sha", db=db) as store:
+        for br, (frames, _, newest, parents) in unique.items():
+            store.add_parents(parents)
+            for df in frames:
+                # un commit partagé par plusieurs branches n'est écrit qu'une fois (dédup du store)
+                df["branches"] = [";".join(members[sha]) for sha in df["sha"]]
+                fetched += len(df)
+                updated += record_members(store, df)
+                added += store.append(df)
+            checkpoint.data["reach"] = {sha: sorted(brs) for sha, brs in reach.items()}
+            finish(br, newest)
+
+        for br in streamed:
+            current = checkpoint.current(br)
+            newest = checkpoint.newest(br)
+            if current:
+                since = current["since"]
+                print(f"Resume branch '{br}' at {current['next_url']}…")
+                pages = iter_branch_pages(REPO_FULL_NAME, br, resume_url=current["next_url"],
+                                          with_next=True) if current["next_url"] else iter(())
+            else:
+                since = sinces[br]
+                print(f"Stream commits on branch '{br}' ({since} → {END_DATE})…")
+                pages = iter_branch_pages(REPO_FULL_NAME, br, since=since, with_next=True)
+            for page, next_url in pages:
+                df = page_frame(page, br)
+                labels = []
+                for c in page:
+                    # /commits liste les enfants avant leurs parents : on propage vers les parents
+                    via = reach.pop(c.get("sha"), set()) if br == default else set()
+                    if via:
+                        for p in c.get("parents") or []:
+                            reach.setdefault(p.get("sha"), set()).update(via)
+                    labels.append(";".join([br] + [b for b in others if b in via]))
+                df["branches"] = labels
+                fetched += len(df)
+                store.add_parents(parent_pairs(page))
+                updated += record_members(store, df)
+                added += store.append(df)   # flush immédiat : un crash ne perd que la page en cours
+                newest = later(newest, newest_commit_date(page))
+                save_progress(br, since, next_url, newest)
+            finish(br, newest)
+
+        # historique commun déjà stocké lors d'un passage précédent (branche créée depuis,
+        # branche par défaut inchangée) : la merge base marque ses ancêtres via `parents`
+        for br, (_, merge_base, _, _) in unique.items():
+            if merge_base:
+                updated += store.add_reach(br, merge_base)
+        total_now = len(store)
+
+    if fetched:
+        print(f"Fetched {fetched} rows ({added} new, shared history fetched once). "
+              f"Rows: {total_now} -> {OUT_CSV}")
+    else:
+        print("Nothing new to write.")
+    if updated:
+        print(f"{updated} new branch memberships for stored commits; "
+              f"`python commit_store.py compact {OUT_CSV}` writes them to the branches column.")
+
+    checkpoint.clear()
+    github_api.print_cache_stats()
+
+
+def cli(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Scrape all commits of every branch of a repo.")
+    parser.add_argument("-w", "--workers", type=int, default=WORKERS,
+                        help="Number of branches fetched concurrently (default: %(default)s).")
+    parser.add_argument("--full", action="store_true",
+                        help="Ignore the saved cursors and refetch the whole START_DATE..END_DATE window.")
+    parser.add_argument("--no-cache", action="store_true",
+                        help="Disable the on-disk ETag cache (HTTP_CACHE_PATH).")
+    parser.add_argument("--resume", action="store_true",
+                        help="Continue an interrupted run from its checkpoint (skip finished branches, "
+                             "restart the current one at its next page).")
+    parser.add_argument("--db", help="Also insert the new commits into this commit_db.py SQLite database.")
+    metrics.add_arguments(parser)
+    args = parser.parse_args(argv)
+    metrics.start(args)
+    try:
+        get_session()   # identifiants et token vérifiés avant de commencer
+        main(workers=args.workers, full=args.full,
+             cache_path=None if args.no_cache else HTTP_CACHE_PATH, resume=args.resume, db=args.db)
+    except credentials.CredentialsError as e:
+        print(f"Error: {e}")
+        return 1
+    finally:
+        metrics.finish(args)
+    return 0
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    sys.exit(cli())
@@ -1,37 +1,15 @@
-import os
 import sys
-import time
-import importlib.util
+import argparse
 import requests
-import pandas as pd
-from typing import List, Dict, Any, Optional
-
-# ----------------- CONFIG -----------------
-secrets_path = os.path.join(os.path.dirname(__file__), ".secrets.py")
-spec = importlib.util.spec_from_file_location("project_secrets", secrets_path)
-project_secrets = importlib.util.module_from_spec(spec)
-spec.loader.exec_module(project_secrets)
-
-GITHUB_TOKEN = getattr(project_secrets, "GITHUB_TOKEN", None)
-GITHUB_LOGIN = getattr(project_secrets, "GITHUB_LOGIN", None)
-
-if not (GITHUB_TOKEN and GITHUB_LOGIN):
-    print("Error: GITHUB_TOKEN and GITHUB_LOGIN must be set in .secrets.py.")
-    sys.exit(1)
-
-SESSION = requests.Session()
-SESSION.headers.update({
-    "Authorization": f"Bearer {GITHUB_TOKEN}",
-    "Accept": "application/vnd.github.v3+json",
-    "User-Agent": GITHUB_LOGIN,
-})
-
-# Test token
-r = SESSION.get("https://api.github.com/user", timeout=30)
-if r.status_code != 200:
-    print("Error: Invalid GITHUB_TOKEN or GITHUB_LOGIN.")
-    print(r.status_code, r.text[:200])
-    sys.exit(1)
+from typing import List, Dict, Any, Iterator, Optional
+
+import credentials
+import github_api
+import metrics
+from commit_batch import commits_frame
+from scrape_state import (Checkpoint, ScrapeState, checkpoint_path_for, later,
+                          newest_commit_date, state_path_for)
+from time_windows import iter_windowed_pages
 
 # ------------ PARAMS À ADAPTER ------------
 REPO_FULL_NAME = "ML_Differential_Solver"  # <-- ex: "Samuel-Chapuis/mon-repo"
@@ -42,180 +20,165 @@ END_DATE   = "2025-10-14T23:59:59Z"
 
 PER_PAGE = 100
 MAX_PAGES = 500
-RATE_LIMIT_THRESHOLD = 10
-SLEEP_ON_RATE_LIMIT = 10
+HTTP_CACHE_PATH = "data/http_cache.sqlite"   # None pour désactiver le cache ETag
+WINDOWS = 1   # sous-fenêtres since/until d'une branche récupérées en parallèle (1 = pagination simple)
+
+# Session créée (et token vérifié, cf. credentials) au premier appel réseau, pas à l'import
+SESSION: Optional[requests.Session] = None
+
+
+def get_session() -> requests.Session:
+    global SESSION
+    if SESSION is None:
+        SESSION = credentials.github_session()
+    return SESSION
 
 
 def github_get_all(url: str, params: Optional[Dict[str, Any]] = None,
                    max_pages: int = MAX_PAGES) -> List[Dict[str, Any]]:
-    out: List[Dict[str, Any]] = []
-    page = 1
-    params = dict(params or {})
-    params.setdefault("per_page", PER_PAGE)
-
-    while url and page <= max_pages:
-        rr = SESSION.get(url, params=params if page == 1 else None, timeout=60)
-
-        remaining = int(rr.headers.get("X-RateLimit-Remaining", "1000"))
-        reset = int(rr.headers.get("X-RateLimit-Reset", "0"))
-
-        # Gérer rate limit (y compris 403)
-        if rr.status_code == 403 and remaining == 0:
-            wait = max(SLEEP_ON_RATE_LIMIT, reset - int(time.time()) + 1)
-            print(f"[rate-limit] sleeping {wait}s…")
-            time.sleep(wait)
-            continue
-
-        if remaining <= RATE_LIMIT_THRESHOLD:
-            wait = max(SLEEP_ON_RATE_LIMIT, reset - int(time.time()) + 1)
-            print(f"[rate-limit] remaining={remaining}, sleeping {wait}s…")
-            time.sleep(wait)
-            continue
-
-        if rr.status_code != 200:
-            print(f"[warn] GET {url} page {page} -> {rr.status_code}; {rr.text[:200]}")
-            break
-
-        data = rr.json()
-        if isinstance(data, list):
-            out.extend(data)
-        else:
-            out.append(data)
-
-        # parse Link header for next page
-        link = rr.headers.get("Link", "")
-        next_url = None
-        if link:
-            for part in link.split(","):
-                if 'rel="next"' in part:
-                    next_url = part.split(";")[0].strip().lstrip("<").rstrip(">")
-        url = next_url
-        page += 1
-
-    return out
+    # pagination, rate limit partagé et cache ETag : cf. github_api
+    return github_api.github_get_all(get_session(), url, params=params, max_pages=max_pages)
 
 
-def fetch_branches(full_name: str) -> List[str]:
-    url = f"https://api.github.com/repos/{full_name}/branches"
+def fetch_branch_heads(full_name: str) -> Dict[str, Optional[str]]:
+    url = f"{github_api.API_URL}/repos/{full_name}/branches"
     branches = github_get_all(url, params={"per_page": PER_PAGE}, max_pages=50)
-    return [b["name"] for b in branches if "name" in b]
+    return {b["name"]: (b.get("commit") or {}).get("sha") for b in branches if "name" in b}
+
+
+def fetch_branches(full_name: str) -> List[str]:
+    return list(fetch_branch_heads(full_name))
 
 
-def fetch_commits_for_branch(full_name: str, branch: str) -> List[Dict[str, Any]]:
-    url = f"https://api.github.com/repos/{full_name}/commits"
+def iter_branch_pages(full_name: str, branch: str, since: str = START_DATE,
+                      resume_url: Optional[str] = None, with_next: bool = False) -> Iterator[Any]:
+    if resume_url:
+        # URL "next" d'un checkpoint : elle contient déjà sha/since/until/page
+        return github_api.iter_pages(get_session(), resume_url, max_pages=MAX_PAGES, with_next=with_next)
+    url = f"{github_api.API_URL}/repos/{full_name}/commits"
     params = {
         "sha": branch,          # IMPORTANT: branche ciblée
-        "since": START_DATE,
+        "since": since,
         "until": END_DATE,
         "per_page": PER_PAGE
         # PAS de filtre "author" => tous les membres
     }
-    return github_get_all(url, params=params, max_pages=MAX_PAGES)
-
-
-def parse_commit(row: Dict[str, Any], repo_full_name: str, branch: str) -> Dict[str, Any]:
-    commit = row.get("commit") or {}
-    author_user = row.get("author") or {}      # compte GitHub (peut être None)
-    committer_user = row.get("committer") or {}
-    parents = row.get("parents") or []
-    is_merge = (len(parents) > 1)
-
-    author_block = commit.get("author") or {}
-    committer_block = commit.get("committer") or {}
-
-    author_date = author_block.get("date")
-    committer_date = committer_block.get("date")
-    commit_date = author_date or committer_date
-
-    commit_day = None
-    commit_hour = None
-    if commit_date:
-        try:
-            commit_day = commit_date.split("T")[0]
-        except Exception:
-            pass
-        try:
-            dt = pd.to_datetime(commit_date, utc=True, errors="coerce")
-            if not pd.isna(dt):
-                commit_hour = int(dt.hour)
-        except Exception:
-            pass
-
-    return {
-        "repo_full_name": repo_full_name,
-        "branch": branch,
-        "sha": row.get("sha"),  # <-- crucial pour dedup
-        "html_url": row.get("html_url"),
-        "message": commit.get("message"),
-
-        # Qui ?
-        "author_login": author_user.get("login"),
-        "author_name": author_block.get("name"),
-        "author_email": author_block.get("email"),
-        "committer_login": committer_user.get("login"),
-        "committer_name": committer_block.get("name"),
-        "committer_email": committer_block.get("email"),
-
-        # Quand ?
-        "author_date": author_date,
-        "committer_date": committer_date,
-        "commit_date": commit_date,
-        "commit_day": commit_day,
-        "commit_hour": commit_hour,
-
-        "is_merge": is_merge,
-    }
+    return github_api.iter_pages(get_session(), url, params=params, max_pages=MAX_PAGES, with_next=with_next)
 
 
-def append_dedup(df_new: pd.DataFrame, out_path: str, key: str = "sha") -> int:
-    os.makedirs(os.path.dirname(out_path), exist_ok=True)
+def iter_branch_windows(full_name: str, branch: str, since: str = START_DATE,
+                        workers: int = WINDOWS) -> Iterator[List[Dict[str, Any]]]:
+    """Pages de la branche, sous-fenêtres since/until récupérées par `workers` threads (cf. time_windows)."""
+    url = f"{github_api.API_URL}/repos/{full_name}/commits"
 
-    if os.path.exists(out_path) and os.path.getsize(out_path) > 0:
-        df_old = pd.read_csv(out_path, low_memory=False)
-        df_all = pd.concat([df_old, df_new], ignore_index=True)
-    else:
-        df_all = df_new.copy()
+    def count(a: str, b: str) -> Optional[int]:
+        return github_api.count_items(get_session(), url, {"sha": branch, "since": a, "until": b})
+
+    def fetch(a: str, b: str) -> Iterator[List[Dict[str, Any]]]:
+        params = {"sha": branch, "since": a, "until": b, "per_page": PER_PAGE}
+        return github_api.iter_pages(get_session(), url, params=params, max_pages=MAX_PAGES)
 
-    if key in df_all.columns:
-        df_all = df_all.drop_duplicates(subset=[key], keep="last")
+    return iter_windowed_pages(count, fetch, since, END_DATE, workers)
 
-    for col in ["author_date", "committer_date", "commit_date"]:
-        if col in df_all.columns:
-            df_all[col] = pd.to_datetime(df_all[col], utc=True, errors="coerce")
 
-    if "commit_day" in df_all.columns:
-        df_all["commit_day"] = pd.to_datetime(df_all["commit_day"], errors="coerce").dt.date
+def fetch_commits_for_branch(full_name: str, branch: str,
+                             since: str = START_DATE) -> List[Dict[str, Any]]:
+    return [c for page in iter_branch_pages(full_name, branch, since=since) for c in page]
 
-    if "commit_hour" in df_all.columns:
-        df_all["commit_hour"] = pd.to_numeric(df_all["commit_hour"], errors="coerce").astype(pd.Int64Dtype())
 
-    df_all.to_csv(out_path, index=False)
-    return len(df_all)
+def main(full: bool = False, cache_path: Optional[str] = HTTP_CACHE_PATH, resume: bool = False,
+         windows: int = WINDOWS, db: Optional[str] = None):
+    from commit_store import CommitStore   # pandas : seulement au lancement du scraping
 
+    state = ScrapeState(state_path_for(OUT_CSV))
+    checkpoint = Checkpoint(checkpoint_path_for(OUT_CSV), resume=resume)
+    github_api.use_cache(cache_path)
 
-def main():
     print(f"Repo: {REPO_FULL_NAME}")
     print("Listing branches…")
-    branches = fetch_branches(REPO_FULL_NAME)
-    print(f"Found {len(branches)} branches.")
+    heads = fetch_branch_heads(REPO_FULL_NAME)
+    print(f"Found {len(heads)} branches.")
 
     total_rows = 0
-    all_rows = []
-
-    for i, br in enumerate(branches, 1):
-        print(f"[{i}/{len(branches)}] Fetch commits on branch '{br}' ({START_DATE} → {END_DATE})…")
-        commits = fetch_commits_for_branch(REPO_FULL_NAME, br)
-        if not commits:
-            continue
-        rows = [parse_commit(c, REPO_FULL_NAME, br) for c in commits]
-        all_rows.extend(rows)
-        total_rows += len(rows)
-
-    df = pd.DataFrame(all_rows)
-    print(f"Fetched {total_rows} rows (before dedup). Writing…")
-    total_now = append_dedup(df, OUT_CSV, key="sha")
-    print(f"Done. CSV rows after dedup: {total_now} -> {OUT_CSV}")
+    added = 0
+    if windows > 1:
+        get_session().mount("https://", requests.adapters.HTTPAdapter(pool_maxsize=windows))
+
+    # chaque page est convertie puis ajoutée au store dès réception (mémoire bornée à une page),
+    # puis le checkpoint note l'URL de la page suivante
+    with CommitStore(OUT_CSV, key="sha", db=db) as store:
+        for i, (br, head_sha) in enumerate(heads.items(), 1):
+            if checkpoint.is_done(br):
+                print(f"[{i}/{len(heads)}] Branch '{br}' done before the interruption, skipping.")
+                continue
+            if not full and state.is_unchanged(REPO_FULL_NAME, br, head_sha):
+                print(f"[{i}/{len(heads)}] Branch '{br}' unchanged ({head_sha[:7]}), skipping.")
+                continue
+            current = checkpoint.current(br)
+            newest = checkpoint.newest(br)
+            windowed = False
+            if current:
+                since = current["since"]
+                print(f"[{i}/{len(heads)}] Resume branch '{br}' at {current['next_url']}…")
+                pages = iter_branch_pages(REPO_FULL_NAME, br, resume_url=current["next_url"],
+                                          with_next=True) if current["next_url"] else iter(())
+            else:
+                since = START_DATE if full else state.since(REPO_FULL_NAME, br, START_DATE)
+                print(f"[{i}/{len(heads)}] Fetch commits on branch '{br}' ({since} → {END_DATE})…")
+                if windows > 1:
+                    # pas d'URL "next" unique à reprendre : la branche repart de `since` après un crash
+                    windowed = True
+                    pages = ((page, None) for page in iter_branch_windows(REPO_FULL_NAME, br, since, windows))
+                else:
+                    pages = iter_branch_pages(REPO_FULL_NAME, br, since=since, with_next=True)
+            for page, next_url in pages:
+                newest = later(newest, newest_commit_date(page))
+                added += store.append(commits_frame(page, repo_full_name=REPO_FULL_NAME, branch=br))
+                total_rows += len(page)
+                if not windowed:
+                    checkpoint.page(br, since, next_url, newest)
+            checkpoint.finish(br, newest)
+            # curseur enregistré seulement une fois toute la branche écrite
+            state.record(REPO_FULL_NAME, br, head_sha, newest)
+            state.save()
+        total_now = len(store)
+
+    if total_rows:
+        print(f"Fetched {total_rows} rows ({added} new). CSV rows after dedup: {total_now} -> {OUT_CSV}")
+    else:
+        print("Nothing new to write.")
+
+    checkpoint.clear()
+    github_api.print_cache_stats()
+
+
+def cli(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Scrape all commits of every branch of a repo.")
+    parser.add_argument("--full", action="store_true",
+                        help="Ignore the saved cursors and refetch the whole START_DATE..END_DATE window.")
+    parser.add_argument("--no-cache", action="store_true",
+                        help="Disable the on-disk ETag cache (HTTP_CACHE_PATH).")
+    parser.add_argument("--resume", action="store_true",
+                        help="Continue an interrupted run from its checkpoint (skip finished branches, "
+                             "restart the current one at its next page).")
+    parser.add_argument("--windows", type=int, default=WINDOWS,
+                        help="Split each branch into since/until windows sized by commit density and fetch "
+                             "them with this many threads (default: %(default)s, plain pagination).")
+    parser.add_argument("--db", help="Also insert the new commits into this commit_db.py SQLite database.")
+    metrics.add_arguments(parser)
+    args = parser.parse_args(argv)
+    metrics.start(args)
+    try:
+        get_session()   # identifiants et token vérifiés avant de commencer
+        main(full=args.full, cache_path=None if args.no_cache else HTTP_CACHE_PATH, resume=args.resume,
+             windows=args.windows, db=args.db)
+    except credentials.CredentialsError as e:
+        print(f"Error: {e}")
+        return 1
+    finally:
+        metrics.finish(args)
+    return 0
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    sys.exit(cli())
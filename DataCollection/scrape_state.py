@@ -0,0 +1,138 @@
+import json
+import os
+from typing import Any, Dict, Iterable, Optional
+
+# Fichier d'état (JSON) posé à côté du CSV de sortie :
+# {
+#   "owner/repo": {
+#     "main": {"head_sha": "...", "last_commit_date": "2025-10-01T12:00:00Z"},
+#     ...
+#   }
+# }
+
+
+def state_path_for(out_csv: str) -> str:
+    # un état par CSV : les curseurs dépendent des filtres du scraper qui l'alimente
+    return os.path.splitext(out_csv)[0] + ".state.json"
+
+
+def newest_commit_date(commits: Iterable[Dict[str, Any]]) -> Optional[str]:
+    # `since` filtre sur la date du committer : c'est elle qui sert de curseur
+    newest = None
+    for c in commits:
+        commit = c.get("commit") or {}
+        date = (commit.get("committer") or {}).get("date") or (commit.get("author") or {}).get("date")
+        if date and (newest is None or date > newest):
+            newest = date
+    return newest
+
+
+def later(a: Optional[str], b: Optional[str]) -> Optional[str]:
+    # la plus récente de deux dates ISO 8601 UTC, None ignoré
+    return max(a, b) if a and b else (a or b)
+
+
+class ScrapeState:
+    """Curseurs par repo/branche : dernier head SHA vu et date du commit le plus récent ingéré."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.repos: Dict[str, Dict[str, Dict[str, Optional[str]]]] = {}
+        if os.path.exists(path) and os.path.getsize(path) > 0:
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    self.repos = json.load(f)
+            except (OSError, ValueError) as e:
+                print(f"[warn] Could not read scrape state ({path}): {e}; starting from scratch")
+
+    def get(self, repo: str, branch: str) -> Dict[str, Optional[str]]:
+        return self.repos.get(repo, {}).get(branch, {})
+
+    def is_unchanged(self, repo: str, branch: str, head_sha: Optional[str]) -> bool:
+        return bool(head_sha) and self.get(repo, branch).get("head_sha") == head_sha
+
+    def since(self, repo: str, branch: str, start_date: str) -> str:
+        cursor = self.get(repo, branch).get("last_commit_date")
+        # dates ISO 8601 UTC ("...Z") => comparables en tant que chaînes
+        return max(start_date, cursor) if cursor else start_date
+
+    def record(self, repo: str, branch: str, head_sha: Optional[str],
+               newest: Optional[str]) -> None:
+        entry = self.repos.setdefault(repo, {}).setdefault(branch, {})
+        if newest and (not entry.get("last_commit_date") or newest > entry["last_commit_date"]):
+            entry["last_commit_date"] = newest
+        if head_sha:
+            entry["head_sha"] = head_sha
+
+    def save(self) -> None:
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp = self.path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self.repos, f, indent=2, sort_keys=True)
+        os.replace(tmp, self.path)
+
+
+def checkpoint_path_for(out_csv: str) -> str:
+    return os.path.splitext(out_csv)[0] + ".checkpoint.json"
+
+
+class Checkpoint:
+    """Progression du run en cours, sauvegardée après chaque page écrite.
+
+    {"done": {branche: date la plus récente}, "current": {"branch", "since",
+    "next_url", "newest"}, …} ; supprimé à la fin d'un run complet. Avec
+    `resume=True` on repart de là : branches terminées sautées, branche en cours
+    reprise à `next_url`.
+    """
+
+    def __init__(self, path: str, resume: bool = False):
+        self.path = path
+        self.data: Dict[str, Any] = {"done": {}, "current": None}
+        if not os.path.exists(path):
+            if resume:
+                print(f"[warn] No checkpoint at {path}; starting a new run.")
+            return
+        if not resume:
+            print(f"[warn] Ignoring the checkpoint of an interrupted run ({path}); use --resume to continue it.")
+            return
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                self.data = json.load(f)
+            print(f"Resuming from {path}: {len(self.data['done'])} branches done"
+                  + (f", '{self.data['current']['branch']}' in progress." if self.data.get("current") else "."))
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            print(f"[warn] Could not read checkpoint ({path}): {e}; starting a new run")
+            self.data = {"done": {}, "current": None}
+
+    def is_done(self, branch: str) -> bool:
+        return branch in self.data["done"]
+
+    def newest(self, branch: str) -> Optional[str]:
+        if branch in self.data["done"]:
+            return self.data["done"][branch]
+        current = self.current(branch)
+        return current.get("newest") if current else None
+
+    def current(self, branch: str) -> Optional[Dict[str, Any]]:
+        current = self.data.get("current")
+        return current if current and current.get("branch") == branch else None
+
+    def page(self, branch: str, since: str, next_url: Optional[str], newest: Optional[str]) -> None:
+        self.data["current"] = {"branch": branch, "since": since, "next_url": next_url, "newest": newest}
+        self.save()
+
+    def finish(self, branch: str, newest: Optional[str]) -> None:
+        self.data["done"][branch] = newest
+        self.data["current"] = None
+        self.save()
+
+    def save(self) -> None:
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp = self.path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self.data, f, indent=2, sort_keys=True)
+        os.replace(tmp, self.path)
+
+    def clear(self) -> None:
+        if os.path.exists(self.path):
+            os.remove(self.path)
@@ -0,0 +1,83 @@
+"""Colonne `branches` de scrap_git_project après un passage incrémental.
+
+Premier passage complet contre benchmarks/github_replay.py, puis une branche est
+créée sur un commit ancien de main (historique déjà stocké, main inchangée donc
+sautée) : le second passage n'écrit aucune ligne, mais l'index du CommitStore note
+la nouvelle branche sur ce commit et ses ancêtres, et `compact` la reporte dans la
+colonne `branches`.
+
+    python -m pytest DataCollection/tests
+"""
+import csv
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+import requests
+
+HERE = os.path.dirname(__file__)
+sys.path.insert(0, os.path.join(HERE, ".."))
+sys.path.insert(0, os.path.join(HERE, "..", "benchmarks"))
+
+import commit_store  # noqa: E402
+import github_api  # noqa: E402
+import github_replay  # noqa: E402
+import scrap_git_project as sgp  # noqa: E402
+
+
+class BranchMembersTest(unittest.TestCase):
+    def setUp(self):
+        self.server = github_replay.ReplayServer(github_replay.Fixtures(600, seed=3, repos=1, branches=3))
+        self.server.start()
+        self.tmp = tempfile.mkdtemp()
+        self.saved = {name: getattr(sgp, name) for name in ("SESSION", "REPO_FULL_NAME", "OUT_CSV",
+                                                            "START_DATE", "END_DATE")}
+        self.saved_api = (github_api.API_URL, github_api.RATE_LIMITER)
+        github_api.API_URL = self.server.url
+        github_api.RATE_LIMITER = github_api.RateLimiter(min_sleep=1)
+        self.repo = next(iter(self.server.fixtures.repos))
+        sgp.SESSION = requests.Session()
+        sgp.REPO_FULL_NAME = self.repo
+        sgp.OUT_CSV = os.path.join(self.tmp, "commits.csv")
+        sgp.START_DATE, sgp.END_DATE = "2000-01-01T00:00:00Z", "2100-01-01T00:00:00Z"
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        for name, value in self.saved.items():
+            setattr(sgp, name, value)
+        github_api.API_URL, github_api.RATE_LIMITER = self.saved_api
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+    def branches(self):
+        with open(sgp.OUT_CSV, newline="", encoding="utf-8") as f:
+            return {row["sha"]: row["branches"].split(";") for row in csv.DictReader(f)}
+
+    def test_new_branch_on_stored_history(self):
+        fx = self.server.fixtures
+        sgp.main(cache_path=None)
+        rows = len(self.branches())
+
+        main_history = fx.history(self.repo, fx.heads[self.repo]["main"])
+        base = main_history[len(main_history) // 2]
+        fx.heads[self.repo]["late"] = base
+        sgp.main(cache_path=None)
+
+        stored = self.branches()
+        self.assertEqual(len(stored), rows)   # aucune ligne ajoutée, colonne inchangée
+        self.assertFalse(any("late" in brs for brs in stored.values()))
+
+        commit_store.compact(sgp.OUT_CSV)
+        compacted = self.branches()
+        self.assertEqual(len(compacted), rows)
+        reached = set(fx.ancestors(self.repo, base))
+        self.assertEqual({sha for sha, brs in compacted.items() if "late" in brs}, reached)
+        # valeurs écrites gardées en tête, branche notée ensuite
+        for sha in reached:
+            self.assertEqual(compacted[sha][:-1], stored[sha])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,119 @@
+"""git_mirror.py contre un petit dépôt temporaire.
+
+Dépôt source : main avec un merge --no-ff d'une branche `feature`, un commit
+resté sur `feature` et un commit daté en +02:00 (jour UTC différent du jour local).
+On vérifie les colonnes branch / branches / is_merge, le jour et l'heure UTC, puis
+qu'un second passage après `git fetch` n'ajoute que les nouveaux commits, et
+qu'une branche créée ensuite sur un commit stocké arrive dans `branches` via compact.
+
+    python -m pytest DataCollection/tests
+"""
+import csv
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import unittest
+
+HERE = os.path.dirname(__file__)
+sys.path.insert(0, os.path.join(HERE, ".."))
+
+import commit_store  # noqa: E402
+import git_mirror  # noqa: E402
+
+SINCE = "2025-01-01T00:00:00Z"
+UNTIL = "2026-01-01T00:00:00Z"
+
+
+class GitMirrorTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.src = os.path.join(self.tmp, "src")
+        self.mirror = os.path.join(self.tmp, "mirror.git")
+        self.out = os.path.join(self.tmp, "commits.csv")
+        os.makedirs(self.src)
+        self.git("init", "-q")
+        self.git("checkout", "-q", "-b", "main")
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+    def git(self, *args, date=None):
+        env = dict(os.environ, GIT_AUTHOR_NAME="Alice", GIT_AUTHOR_EMAIL="alice@example.com",
+                   GIT_COMMITTER_NAME="Alice", GIT_COMMITTER_EMAIL="alice@example.com",
+                   GIT_CONFIG_GLOBAL=os.devnull, GIT_CONFIG_NOSYSTEM="1")
+        if date:
+            env.update(GIT_AUTHOR_DATE=date, GIT_COMMITTER_DATE=date)
+        out = subprocess.run(["git"] + list(args), cwd=self.src, env=env, check=True,
+                             stdout=subprocess.PIPE, text=True)
+        return out.stdout.strip()
+
+    def commit(self, message, date):
+        self.git("commit", "-q", "--allow-empty", "-m", message, date=date)
+        return self.git("rev-parse", "HEAD")
+
+    def ingest(self):
+        return git_mirror.main("owner/repo", url=self.src, mirror=self.mirror, out_csv=self.out,
+                               since=SINCE, until=UNTIL)
+
+    def rows(self):
+        with open(self.out, newline="", encoding="utf-8") as f:
+            return {row["sha"]: row for row in csv.DictReader(f)}
+
+    def test_branches_merges_utc_and_rerun(self):
+        base = self.commit("feat: base", "2025-09-01T10:00:00Z")
+        self.git("checkout", "-q", "-b", "feature")
+        merged = self.commit("feat: on feature", "2025-09-02T10:00:00Z")
+        self.git("checkout", "-q", "main")
+        local = self.commit("fix: late evening in Paris", "2025-09-04T01:30:00+02:00")
+        self.git("merge", "-q", "--no-ff", "-m", "Merge branch 'feature'", "feature",
+                 date="2025-09-05T12:00:00Z")
+        merge = self.git("rev-parse", "HEAD")
+        self.git("checkout", "-q", "feature")
+        only_feature = self.commit("feat: after the merge", "2025-09-06T08:00:00Z")
+        self.git("checkout", "-q", "main")
+
+        self.assertEqual(self.ingest(), 5)
+        rows = self.rows()
+        self.assertEqual(set(rows), {base, merged, local, merge, only_feature})
+
+        self.assertEqual(rows[merge]["is_merge"], "True")
+        self.assertEqual({sha for sha, row in rows.items() if row["is_merge"] == "True"}, {merge})
+
+        self.assertEqual(rows[merge]["branch"], "main")
+        self.assertEqual(rows[only_feature]["branch"], "feature")
+        self.assertEqual(rows[only_feature]["branches"], "feature")
+        # contenu dans les deux branches : branche d'arrivée d'abord, puis l'autre
+        for sha in (base, merged):
+            self.assertEqual(sorted(rows[sha]["branches"].split(";")), ["feature", "main"])
+            self.assertEqual(rows[sha]["branches"].split(";")[0], rows[sha]["branch"])
+
+        # 01:30 à Paris (+02:00) = 23:30 UTC la veille
+        self.assertEqual(rows[local]["commit_day"], "2025-09-03")
+        self.assertEqual(rows[local]["commit_hour"], "23")
+        self.assertEqual(rows[base]["commit_day"], "2025-09-01")
+        self.assertEqual(rows[base]["commit_hour"], "10")
+
+        # second passage : fetch du miroir, seul le nouveau commit est ajouté
+        new = self.commit("docs: readme", "2025-09-07T09:00:00Z")
+        self.assertEqual(self.ingest(), 1)
+        rows = self.rows()
+        self.assertEqual(len(rows), 6)
+        self.assertEqual(rows[new]["branch"], "main")
+        with open(self.out, encoding="utf-8") as f:
+            self.assertEqual(sum(1 for _ in f), 7)   # en-tête + 6 lignes, sans doublon
+
+        # branche créée sur un historique déjà stocké : notée dans l'index, reportée par compact
+        self.git("branch", "late", base)
+        self.assertEqual(self.ingest(), 0)
+        self.assertNotIn("late", self.rows()[base]["branches"].split(";"))
+        commit_store.compact(self.out)
+        rows = self.rows()
+        self.assertEqual(len(rows), 6)
+        self.assertEqual(rows[base]["branches"].split(";")[-1], "late")
+        self.assertEqual([sha for sha, row in rows.items() if "late" in row["branches"].split(";")], [base])
+
+
+if __name__ == "__main__":
+    unittest.main()
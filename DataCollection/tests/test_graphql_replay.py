@@ -0,0 +1,122 @@
+"""Mode GraphQL de build_commits_graphql contre le serveur local benchmarks/github_replay.py.
+
+Les lignes obtenues par les requêtes `history` aliasées doivent être celles du
+mode REST (/commits), page par page, y compris avec filtre auteur, erreur
+partielle sur un repo et réponse 403 de rate limit.
+
+    python -m pytest DataCollection/tests
+"""
+import os
+import sys
+import time
+import unittest
+
+import requests
+
+HERE = os.path.dirname(__file__)
+sys.path.insert(0, os.path.join(HERE, ".."))
+sys.path.insert(0, os.path.join(HERE, "..", "benchmarks"))
+
+import build_commits_graphql as bcg  # noqa: E402
+import github_api  # noqa: E402
+import github_replay  # noqa: E402
+from metrics import METRICS  # noqa: E402
+
+SINCE = "2000-01-01T00:00:00Z"
+
+
+class GraphQLReplayTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.server = github_replay.ReplayServer(github_replay.Fixtures(1500, seed=7, repos=3))
+        cls.server.start()
+        cls.saved = {name: getattr(bcg, name) for name in ("SESSION", "GRAPHQL_URL", "GRAPHQL_BATCH",
+                                                           "AUTHOR_LOGIN", "END_DATE")}
+        cls.saved_api = (github_api.API_URL, github_api.RATE_LIMITER)
+        github_api.API_URL = cls.server.url
+        github_api.use_cache(None)
+        bcg.SESSION = requests.Session()
+        bcg.GRAPHQL_URL = f"{cls.server.url}/graphql"
+        bcg.GRAPHQL_BATCH = 2   # moins de places que de repos : les alias sont réutilisés
+        bcg.END_DATE = "2100-01-01T00:00:00Z"
+        cls.repos = bcg.fetch_accessible_repos()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+        for name, value in cls.saved.items():
+            setattr(bcg, name, value)
+        github_api.API_URL, github_api.RATE_LIMITER = cls.saved_api
+
+    def setUp(self):
+        github_api.RATE_LIMITER = github_api.RateLimiter(min_sleep=1)
+        bcg.AUTHOR_LOGIN = None
+
+    def rows(self, results):
+        return {r["full_name"]: None if commits is None else bcg.parse_commits(commits, r)
+                for r, commits in results}
+
+    def assert_same_rows(self, graphql, rest):
+        self.assertEqual(set(graphql), set(rest))
+        for name, df in graphql.items():
+            self.assertIsNotNone(df, name)
+            self.assertEqual(df.to_dict("records"), rest[name].to_dict("records"), name)
+
+    def test_histories_match_rest(self):
+        jobs = [(r, SINCE) for r in self.repos]
+        graphql = self.rows(bcg.graphql_fetch_histories(jobs))
+        rest = self.rows(bcg.rest_fetch_histories(jobs))
+        self.assert_same_rows(graphql, rest)
+        # au moins un repo tient sur plusieurs pages (curseur endCursor)
+        self.assertTrue(any(len(df) > bcg.PER_PAGE for df in graphql.values()))
+
+    def test_rows_parsed_metric(self):
+        # compté par commits_frame sur le chemin réel (parse_commits), une fois par ligne
+        METRICS.reset()
+        graphql = self.rows(bcg.graphql_fetch_histories([(r, SINCE) for r in self.repos]))
+        self.assertEqual(METRICS.counters["rows_parsed"], sum(len(df) for df in graphql.values()))
+        self.assertGreater(METRICS.counters["rows_parsed"], 0)
+
+    def test_author_filter(self):
+        login = sorted(self.server.fixtures.logins)[0]
+        bcg.AUTHOR_LOGIN = login
+        author_id = bcg.graphql_author_id(login)
+        self.assertIsNotNone(author_id)
+        jobs = [(r, SINCE) for r in self.repos]
+        graphql = self.rows(bcg.graphql_fetch_histories(jobs, author_id=author_id))
+        rest = self.rows(bcg.rest_fetch_histories(jobs))
+        self.assert_same_rows(graphql, rest)
+        self.assertTrue(all(len(df) for df in graphql.values()))
+        # auteur renseigné (author_login / author_name), comme en REST : utilisé par commit_db
+        self.assertTrue(all((df["author_login"] == login).all() for df in graphql.values()))
+
+    def test_partial_errors(self):
+        missing = {"full_name": "nobody/missing"}
+        jobs = [(r, SINCE) for r in self.repos[:1]] + [(missing, SINCE)] + [(r, SINCE) for r in self.repos[1:]]
+        graphql = self.rows(bcg.graphql_fetch_histories(jobs))
+        # repo en erreur rendu avec None (curseur inchangé), les autres complets
+        self.assertIsNone(graphql.pop("nobody/missing"))
+        rest = self.rows(bcg.rest_fetch_histories([(r, SINCE) for r in self.repos]))
+        self.assert_same_rows(graphql, rest)
+
+    def test_rate_limited_403(self):
+        jobs = [(r, SINCE) for r in self.repos]
+        rest = self.rows(bcg.rest_fetch_histories(jobs))
+        with self.server.lock:
+            # budget épuisé jusqu'à la prochaine seconde : la première requête reçoit un 403
+            self.server.remaining = 0
+            self.server.reset = int(time.time()) + 1
+        limited = self.server.stats()["rate_limited"]
+        graphql = self.rows(bcg.graphql_fetch_histories(jobs))
+        self.assertGreater(self.server.stats()["rate_limited"], limited)
+        self.assert_same_rows(graphql, rest)
+
+    def test_heads_match_rest(self):
+        heads = bcg.graphql_fetch_heads(self.repos)
+        for r in self.repos:
+            self.assertEqual(heads[r["full_name"]], bcg.fetch_head_sha(r["full_name"], r["default_branch"]))
+
+
+if __name__ == "__main__":
+    unittest.main()
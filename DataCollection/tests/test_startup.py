@@ -0,0 +1,73 @@
+"""Import des scrapers sans identifiants : ni réseau, ni sys.exit, ni pandas, et rapide.
+
+Chaque module est importé dans un interpréteur neuf, sans GITHUB_TOKEN / GITHUB_LOGIN
+(HOME et dossier de travail temporaires) ; toute connexion socket est refusée et
+notée : l'import ne doit ni lire les identifiants ni appeler GET /user.
+Le détail des temps : benchmarks/bench_startup.py.
+
+    python -m pytest DataCollection/tests
+"""
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+
+HERE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+
+MODULES = ["scrap_github", "scrap_git_project", "build_commits_graphql", "git_mirror", "cleaner"]
+# git_mirror importe le CommitStore (donc pandas) : seul le réseau et sys.exit sont vérifiés
+# cleaner : columnar (pandas + pyarrow) importé seulement pour une sortie Parquet / Arrow
+PANDAS_FREE = {"scrap_github", "scrap_git_project", "build_commits_graphql", "cleaner"}
+MAX_SECONDS = 1.0
+
+PROBE = """
+import json, socket, sys, time
+sys.path.insert(0, {here!r})
+calls = []
+
+def refuse(self, address, *args, **kwargs):
+    calls.append(repr(address))
+    raise OSError("network disabled during import")
+
+socket.socket.connect = refuse
+socket.socket.connect_ex = refuse
+exit_code = None
+t = time.perf_counter()
+try:
+    import {module}
+except SystemExit as exc:
+    exit_code = exc.code if exc.code is not None else 0
+seconds = time.perf_counter() - t
+print(json.dumps({{"seconds": seconds, "pandas": "pandas" in sys.modules,
+                  "network": calls, "exit": exit_code}}))
+"""
+
+
+class StartupTest(unittest.TestCase):
+    def probe(self, module):
+        with tempfile.TemporaryDirectory() as tmp:
+            env = dict(os.environ, HOME=tmp, PYTHONDONTWRITEBYTECODE="1")
+            for name in ("GITHUB_TOKEN", "GITHUB_LOGIN"):
+                env.pop(name, None)
+            out = subprocess.run([sys.executable, "-c", PROBE.format(here=HERE, module=module)], cwd=tmp,
+                                 env=env, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True, timeout=60)
+        self.assertEqual(out.returncode, 0, out.stderr)
+        return json.loads(out.stdout.strip().splitlines()[-1])
+
+    def test_import_without_credentials(self):
+        for module in MODULES:
+            with self.subTest(module=module):
+                result = self.probe(module)
+                self.assertEqual(result["network"], [])
+                self.assertIsNone(result["exit"])
+                if module in PANDAS_FREE:
+                    self.assertFalse(result["pandas"])
+                    # meilleur de trois essais : un interpréteur froid peut être lent une fois
+                    best = min([result["seconds"]] + [self.probe(module)["seconds"] for _ in range(2)])
+                    self.assertLess(best, MAX_SECONDS)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,152 @@
+import math
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Dict, Iterator, List, Optional, Set, Tuple
+
+# Découpage d'une branche en sous-fenêtres since/until récupérées en parallèle.
+#
+# La pagination rel="next" est forcément séquentielle : une grosse branche = une
+# longue chaîne de requêtes. On coupe donc START_DATE..END_DATE en fenêtres
+# disjointes (until d'une fenêtre = since de la suivante - 1 s), de taille
+# adaptée à la densité de commits : chaque fenêtre est comptée en une requête
+# (per_page=1, cf. github_api.count_items) et coupée en deux tant qu'elle dépasse
+# la cible, puis les fenêtres voisines trop petites sont regroupées.
+# Les pages sont rendues fenêtre par fenêtre, de la plus récente à la plus
+# ancienne (même ordre que /commits), et un SHA déjà rendu est ignoré.
+# Chaque fenêtre en cours passe ses pages par une file bornée (WINDOW_PAGES) : un
+# worker en avance attend que ses pages soient consommées, la mémoire reste bornée
+# à quelques pages par worker, comme en mode séquentiel.
+
+Window = Tuple[str, str]
+
+MIN_WINDOW = timedelta(minutes=1)
+MAX_WINDOWS = 256
+# en dessous, compter et recouper coûte plus de requêtes que ça n'en parallélise
+MIN_WINDOW_ROWS = 1000
+# pages d'avance par fenêtre : au plus workers * (WINDOW_PAGES + 1) pages en mémoire
+WINDOW_PAGES = 4
+
+_DONE = object()
+
+
+def parse_date(value: str) -> datetime:
+    return datetime.fromisoformat(value.replace("Z", "+00:00")).astimezone(timezone.utc)
+
+
+def format_date(value: datetime) -> str:
+    return value.astimezone(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+def split_window(window: Window, parts: int = 2) -> List[Window]:
+    """Parts de durées égales, disjointes à la seconde près."""
+    start, end = parse_date(window[0]), parse_date(window[1])
+    step = (end - start) / parts
+    bounds = [start + step * i for i in range(parts)] + [end + timedelta(seconds=1)]
+    bounds = [b.replace(microsecond=0) for b in bounds]
+    return [(format_date(a), format_date(b - timedelta(seconds=1)))
+            for a, b in zip(bounds, bounds[1:]) if b > a]
+
+
+def plan_windows(count: Callable[[str, str], Optional[int]], since: str, until: str,
+                 workers: int, target_rows: Optional[int] = None,
+                 pool: Optional[ThreadPoolExecutor] = None) -> List[Tuple[Window, Optional[int]]]:
+    """Fenêtres (plus ancienne d'abord) et leur nombre de commits, chacune d'environ `target_rows` commits.
+
+    Par défaut la cible vaut total / (2 * workers), au moins MIN_WINDOW_ROWS : assez de
+    fenêtres pour que les workers restent occupés même si les dernières sont plus
+    lentes, sans multiplier les petites fenêtres. Si le comptage
+    échoue, une seule fenêtre au nombre inconnu (None).
+    """
+    total = count(since, until)
+    if total is None:
+        return [((since, until), None)]
+    target = target_rows or max(MIN_WINDOW_ROWS, math.ceil(total / (2 * workers)))
+    counted = [((since, until), total)]
+
+    # découpe : les fenêtres trop denses sont coupées en deux et recomptées (en parallèle)
+    while len(counted) < MAX_WINDOWS:
+        dense = [i for i, ((a, b), n) in enumerate(counted)
+                 if n > target and parse_date(b) - parse_date(a) > MIN_WINDOW]
+        if not dense:
+            break
+        halves = {i: split_window(counted[i][0]) for i in dense}
+        todo = [w for i in dense for w in halves[i]]
+        results = list(pool.map(lambda w: count(*w), todo) if pool else map(lambda w: count(*w), todo))
+        if any(n is None for n in results):
+            break
+        found = iter(results)
+        nxt: List[Tuple[Window, int]] = []
+        for i, item in enumerate(counted):
+            if i in halves:
+                nxt.extend((w, next(found)) for w in halves[i])
+            else:
+                nxt.append(item)
+        counted = nxt
+
+    # regroupement : voisines (vides comprises) fusionnées tant que la somme reste sous la cible
+    merged: List[Tuple[Window, int]] = []
+    for (a, b), n in counted:
+        if merged and merged[-1][1] + n <= target:
+            (a0, _), n0 = merged[-1]
+            merged[-1] = ((a0, b), n0 + n)
+        else:
+            merged.append(((a, b), n))
+    return merged
+
+
+def iter_windowed_pages(count: Callable[[str, str], Optional[int]],
+                        fetch: Callable[[str, str], Iterator[List[Dict[str, Any]]]],
+                        since: str, until: str, workers: int,
+                        target_rows: Optional[int] = None) -> Iterator[List[Dict[str, Any]]]:
+    """Pages de commits de since..until, du plus récent au plus ancien, sans doublon.
+
+    `count(since, until)` compte les commits d'une fenêtre, `fetch(since, until)`
+    en rend les pages. Les fenêtres sont récupérées par `workers` threads ; chacune
+    n'a que WINDOW_PAGES pages d'avance sur la consommation (file bornée).
+    """
+    seen: Set[str] = set()
+    stop = threading.Event()
+
+    def put(pages: "queue.Queue[Any]", item: Any) -> bool:
+        # attente par petits pas : s'arrête si le consommateur a abandonné le générateur
+        while not stop.is_set():
+            try:
+                pages.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    def pump(window: Window, pages: "queue.Queue[Any]") -> None:
+        try:
+            for page in fetch(*window):
+                if not put(pages, page):
+                    return
+        finally:
+            put(pages, _DONE)   # erreur éventuelle relevée par future.result()
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        windows = plan_windows(count, since, until, workers, target_rows=target_rows, pool=pool)
+        print(f"  {len(windows)} windows: " + ", ".join(f"{a[:10]}..{b[:10]} ({n})" for (a, b), n in windows[::-1][:8])
+              + (" …" if len(windows) > 8 else ""))
+        # fenêtres soumises de la plus récente à la plus ancienne : les `workers` en cours
+        # sont toujours les prochaines consommées ; fenêtres vides déjà connues : aucune requête
+        streams = []
+        for w, n in reversed(windows):
+            if n != 0:
+                pages: "queue.Queue[Any]" = queue.Queue(maxsize=WINDOW_PAGES)
+                streams.append((pool.submit(pump, w, pages), pages))
+        try:
+            for future, pages in streams:
+                for page in iter(pages.get, _DONE):
+                    fresh = [c for c in page if c.get("sha") not in seen]
+                    seen.update(c.get("sha") for c in fresh)
+                    if fresh:
+                        yield fresh
+                future.result()
+        finally:
+            stop.set()
+            for future, _ in streams:
+                future.cancel()
@@ -4,11 +4,8 @@
     PERSONS,
     PERSON_COLORS,
     readCSVUrl,
-    heatmapMatrix,
-    languageCounts,
-    nomenclatureCounts,
-    projectCounts,
-    commitsPerDay,
+    readCubesUrl,
+    cubesFromRows,
     clearSVG,
     drawGitGraph,
     drawCommitsPerDayBars,
@@ -18,6 +15,8 @@
   } = GitDash;
 
   const DATA_URL = "./data/commits_history_cleaned.csv";
+  // Pre-aggregated rollups (DataCollection/dashboard_cubes.py); the CSV is only a fallback.
+  const CUBES_URL = "./data/commits_cubes.json";
 
   function getPersonKey(row){
     if(row.person) return row.person;
@@ -29,9 +28,8 @@
     return "Unknown";
   }
 
-  function buildPersonsFromRows(rows){
-    const unique = Array.from(new Set(rows.map(getPersonKey)));
-    return unique.map((name, i) => ({
+  function buildPersons(names){
+    return names.map((name, i) => ({
       id: `p${i + 1}`,
       name,
       color: PERSON_COLORS[i % PERSON_COLORS.length]
@@ -52,8 +50,13 @@
       });
   }
 
-  async function loadAll(){
-    const loaded = [];
+  async function loadData(){
+    // the Pages deploy rebuilds commits_cubes.json from the CSV, so the bundle is never stale there
+    try {
+      return { data: await readCubesUrl(CUBES_URL), source: "commits_cubes.json" };
+    } catch (err) {
+      // no bundle yet: aggregate the raw rows in the browser
+    }
     let rows = [];
     try {
       rows = await readCSVUrl(DATA_URL);
@@ -66,11 +69,17 @@
         console.error("Failed to load CSV:", err);
       }
     }
+    return { data: cubesFromRows(rows, getPersonKey), source: "commits_history_cleaned.csv" };
+  }
+
+  async function loadAll(){
+    const loaded = [];
+    const { data, source } = await loadData();
 
     const statusEl = document.getElementById("fn1");
     if (statusEl) {
-      statusEl.textContent = rows.length
-        ? `✓ commits_history_cleaned.csv · ${rows.length} rows`
+      statusEl.textContent = data.rows
+        ? `✓ ${source} · ${data.rows} rows`
         : "⚠️ Impossible de charger le CSV (utilisez un serveur local ou cliquez pour sélectionner le fichier)";
     }
 
@@ -90,7 +99,7 @@
         "message_message",
         "nomenclature"
       ];
-      const sample = rows.slice(0, 6);
+      const sample = data.sample;
       if (sample.length === 0) {
         rawSample.innerHTML = "<p class=\"hint\">No data loaded.</p>";
       } else {
@@ -113,35 +122,22 @@
         `;
       }
     }
-    const persons = buildPersonsFromRows(rows);
+    const persons = buildPersons(data.persons.map(p => p.name));
     GitDash.PERSONS = persons;
 
-    const groups = new Map();
-    for(const row of rows){
-      const key = getPersonKey(row);
-      if(!groups.has(key)) groups.set(key, []);
-      groups.get(key).push(row);
-    }
-
-    for(const person of persons){
-      const personRows = groups.get(person.name) || [];
-      const heat = heatmapMatrix(personRows);
-      const langs = languageCounts(personRows);
-      const nomenclature = nomenclatureCounts(personRows);
-      const projects = projectCounts ? projectCounts(personRows) : [];
-
+    data.persons.forEach((p, i) => {
       loaded.push({
-        person,
-        rows: personRows,
-        heatmap: heat,
-        languages: langs,
-        nomenclature,
-        projects: projects,
-        uniqueRepos: new Set(personRows.map(r=>r.repo_full_name)).size,
-        topLanguage: (langs[0] && langs[0].key) || null,
-        perDay: commitsPerDay(personRows)
+        person: persons[i],
+        count: p.count,
+        heatmap: p.heatmap,
+        languages: p.languages,
+        nomenclature: p.nomenclature,
+        projects: p.projects,
+        uniqueRepos: p.uniqueRepos,
+        topLanguage: (p.languages[0] && p.languages[0].key) || null,
+        perDay: p.perDay
       });
-    }
+    });
 
     // People panels
     document.getElementById("peopleEmpty").style.display = loaded.length > 0 ? "none" : "block";
@@ -169,12 +165,7 @@
       return acc;
     }, {});
 
-    const repos = new Map();
-    rows.forEach(r => {
-      const repo = r.repo_full_name || "unknown-repo";
-      if(!repos.has(repo)) repos.set(repo, []);
-      repos.get(repo).push(r);
-    });
+    const repos = data.repos;
 
     const showGit = rightView === "git";
     if(repoContainer) repoContainer.style.display = showGit ? "grid" : "none";
@@ -193,6 +184,14 @@
           title.textContent = repo;
           block.appendChild(title);
 
+          const total = data.repoTotals?.get(repo);
+          if(total > commits.length){
+            const note = document.createElement("p");
+            note.className = "hint";
+            note.textContent = `Most recent ${commits.length} of ${total} commits (dashboard_cubes.py --graph-limit 0 keeps all).`;
+            block.appendChild(note);
+          }
+
           const svg = document.createElementNS("http://www.w3.org/2000/svg", "svg");
           svg.setAttribute("width", "100%");
           block.appendChild(svg);
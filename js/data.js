@@ -31,6 +31,11 @@
     nomenclature: d.nomenclature === "1" || d.nomenclature === 1
   });
 
+  const nomenclaturePie = (ok, ko) => [
+    { key: "Respecte", value: ok },
+    { key: "Non conforme", value: ko }
+  ];
+
   GitDash.readCSVFile = async function readCSVFile(file){
     const text = await file.text();
     return d3.csvParse(text, parseRow);
@@ -69,10 +74,7 @@
       if(r.nomenclature) ok += 1;
       else ko += 1;
     }
-    return [
-      { key: "Respecte", value: ok },
-      { key: "Non conforme", value: ko }
-    ];
+    return nomenclaturePie(ok, ko);
   };
 
   GitDash.projectCounts = function projectCounts(rows){
@@ -96,4 +98,67 @@
       count
     })).sort((a,b)=>a.date - b.date);
   };
+
+  /**
+   * Dataset used by app.js, built either from the pre-aggregated bundle
+   * (DataCollection/dashboard_cubes.py) or from raw rows:
+   * { rows, sample, persons: [{name, count, heatmap, languages, projects,
+   *   uniqueRepos, nomenclature, perDay}], repos: Map(repo -> commits) }
+   */
+  GitDash.cubesFromRows = function cubesFromRows(rows, personKey){
+    const groups = new Map();
+    const repos = new Map();
+    for(const r of rows){
+      const key = personKey(r);
+      if(!groups.has(key)) groups.set(key, []);
+      groups.get(key).push(r);
+      const repo = r.repo_full_name || "unknown-repo";
+      if(!repos.has(repo)) repos.set(repo, []);
+      repos.get(repo).push(r);
+    }
+    const persons = Array.from(groups, ([name, personRows]) => ({
+      name,
+      count: personRows.length,
+      heatmap: GitDash.heatmapMatrix(personRows),
+      languages: GitDash.languageCounts(personRows),
+      projects: GitDash.projectCounts(personRows),
+      uniqueRepos: new Set(personRows.map(r=>r.repo_full_name)).size,
+      nomenclature: GitDash.nomenclatureCounts(personRows),
+      perDay: GitDash.commitsPerDay(personRows)
+    }));
+    return { rows: rows.length, sample: rows.slice(0, 6), persons, repos };
+  };
+
+  GitDash.readCubesUrl = async function readCubesUrl(url){
+    const b = await d3.json(url);
+    const toObjects = (cols, values) => values.map(v => {
+      const o = {};
+      cols.forEach((c, i) => { o[c] = v[i]; });
+      return o;
+    });
+    const counts = list => list.map(([key, value]) => ({key, value}));
+
+    const persons = b.persons.map(p => ({
+      name: p.name,
+      count: p.count,
+      heatmap: p.heatmap,
+      languages: counts(p.languages),
+      projects: counts(p.projects),
+      uniqueRepos: p.uniqueRepos,
+      nomenclature: nomenclaturePie(p.nomenclature[0], p.nomenclature[1]),
+      perDay: p.perDay.map(([day, count]) => ({ day, date: parseISODate(day), count }))
+    }));
+    const repos = new Map(Object.entries(b.repos).map(([repo, g]) =>
+      [repo, toObjects(b.graphColumns, g.commits)]
+    ));
+    // commits per repo before the --graph-limit cut
+    const repoTotals = new Map(Object.entries(b.repos).map(([repo, g]) => [repo, g.total]));
+    return {
+      rows: b.rows,
+      sample: toObjects(b.sampleColumns, b.sample),
+      persons,
+      repos,
+      repoTotals
+    };
+  };
 })();
@@ -36,7 +36,7 @@
       meta.className = "pmeta";
       meta.innerHTML = `
         <h3 style="color:${person.color}">${person.name}</h3>
-        <p class="hint">${p.rows.length} commits · ${p.uniqueRepos} repos · top language: ${p.topLanguage || "Unknown"}</p>
+        <p class="hint">${p.count} commits · ${p.uniqueRepos} repos · top language: ${p.topLanguage || "Unknown"}</p>
       `;
 
       profileCol.appendChild(avatar);